@@ -0,0 +1,86 @@
+"""Compare the spawn latency of direct exec and the shell for the Developer Tools catalog
+
+Catalog commands install packages and create projects, so they are not run
+as such: each simple command is run with its program replaced by `true`,
+which exits at once, once directly and once through `sh -c`. The difference
+is the cost of the shell. Commands that need the shell are only listed.
+
+    python benchmark_spawn.py [runs]
+"""
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+from ui.widgets.dev_tools_widget import DeveloperToolsWidget
+from utils.command_line import split_simple, find_executable
+
+
+def catalog_commands():
+    """Every command in the Developer Tools catalog, in catalog order"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = DeveloperToolsWidget()
+    commands = []
+    for categories in widget.dev_commands.values():
+        for entries in categories.values():
+            commands.extend(entry["command"] for entry in entries)
+    return commands
+
+
+def spawn_time(runs, **popen_args):
+    """Median seconds to start a process and collect its exit status"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       **popen_args)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    true = find_executable("true")
+    if true is None:
+        sys.exit("No 'true' on the PATH to stand in for the catalog programs")
+
+    direct_total = shell_total = 0.0
+    simple = 0
+    shell_only = []
+    print(f"{'command':<50} {'direct':>9} {'shell':>9}")
+    for command in catalog_commands():
+        argv = split_simple(command)
+        if argv is None:
+            shell_only.append(command)
+            continue
+        stand_in = [true] + argv[1:]
+        direct = spawn_time(runs, args=stand_in)
+        shell = spawn_time(runs, args=shlex.join(stand_in), shell=True)
+        direct_total += direct
+        shell_total += shell
+        simple += 1
+        print(f"{command[:50]:<50} {direct * 1000:>7.2f}ms {shell * 1000:>7.2f}ms")
+
+    if simple:
+        print(f"\n{simple} simple commands: {direct_total / simple * 1000:.2f} ms direct, "
+              f"{shell_total / simple * 1000:.2f} ms through the shell on average")
+
+    lookups = 10000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        find_executable("true")
+    print(f"Cached PATH lookup: {(time.perf_counter() - start) / lookups * 1e6:.1f} us")
+
+    print(f"\n{len(shell_only)} commands need the shell:")
+    for command in shell_only:
+        print(f"  {command}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import json
+import asyncio
+
+import aiohttp
+
+from services.gemini_client import StreamError
+from services.resilience import CircuitOpenError, RateLimitExceeded, parse_retry_after
+
+class AsyncGeminiAPIClient:
+    """asyncio client for Google's Gemini API
+
+    Shares the API key, endpoints, payload format and response cache of the
+    GeminiAPIClient it wraps, so both clients stay configured the same way.
+    """
+    def __init__(self, client, total_timeout=90):
+        self.client = client
+        self.total_timeout = total_timeout  # Upper bound for a whole request, in seconds
+        self.session = None
+
+    def get_session(self):
+        """Return the pooled aiohttp session, creating it on the running loop"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=16, limit_per_host=8, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                connect=self.client.connect_timeout,
+                sock_read=self.client.read_timeout
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    async def close(self):
+        """Close the pooled connections"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def send(self, url, payload):
+        """POST with the shared rate limiter, retry policy and circuit breaker
+
+        Returns the response; the caller checks the final status and releases it.
+        """
+        client = self.client
+        attempt = 0
+        while True:
+            client.circuit_breaker.check()
+            wait = client.rate_limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                response = await self.get_session().post(url, json=payload)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                client.circuit_breaker.record_failure()
+                if attempt >= client.retry_policy.max_retries:
+                    raise
+                await asyncio.sleep(client.retry_policy.delay(attempt))
+                attempt += 1
+                continue
+
+            if not client.retry_policy.should_retry(response.status):
+                # Anything but a transient error means the endpoint itself is healthy
+                client.circuit_breaker.record_success()
+                return response
+
+            client.circuit_breaker.record_failure()
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                client.rate_limiter.penalize(retry_after)
+            if attempt >= client.retry_policy.max_retries or (retry_after or 0) > client.rate_limiter.max_wait:
+                return response
+            response.release()
+            await asyncio.sleep(client.retry_policy.delay(attempt, retry_after))
+            attempt += 1
+
+    async def get_response(self, prompt, system_context=None, use_cache=True, timeout=None, history=None):
+        """Return the full response text; cancelling the awaiting task aborts the request"""
+        client = self.client
+        if not client.api_key:
+            return "No API key provided. Please add your Gemini API key in the settings."
+
+        key = client.cache_key(prompt, system_context, history)
+        if use_cache:
+            cached = client.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            result = await asyncio.wait_for(
+                self._post_json(prompt, system_context, history),
+                timeout or self.total_timeout
+            )
+            text = client.extract_text(result)
+            if not text:
+                return "No response generated. Please try again."
+            client.cache.put(key, text)
+            return text
+
+        except asyncio.TimeoutError:
+            return "API error: the request timed out."
+        except (aiohttp.ClientError, CircuitOpenError, RateLimitExceeded) as e:
+            return f"API error: {str(e)}"
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    async def stream_response(self, prompt, system_context=None, use_cache=True, timeout=None, history=None):
+        """Yield the response text in pieces as the server generates it (SSE)
+
+        A failure is yielded as a StreamError, possibly after some of the text.
+        """
+        client = self.client
+        if not client.api_key:
+            yield "No API key provided. Please add your Gemini API key in the settings."
+            return
+
+        key = client.cache_key(prompt, system_context, history)
+        if use_cache:
+            cached = client.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.total_timeout)
+        text_parts = []
+        try:
+            url = f"{client.stream_url}?alt=sse&key={client.api_key}"
+            payload = client.build_payload(prompt, system_context, history)
+            # Retries and their backoff count against the deadline too, not only the body
+            response = await asyncio.wait_for(self.send(url, payload), max(0.0, deadline - loop.time()))
+            async with response:
+                response.raise_for_status()
+
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    line = await asyncio.wait_for(response.content.readline(), remaining)
+                    if not line:
+                        break
+                    # SSE frames look like "data: {...}"; blank lines separate events
+                    line = line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    text = client.extract_text(json.loads(line[len("data:"):].strip()))
+                    if text:
+                        text_parts.append(text)
+                        yield text
+
+            if text_parts:
+                # Only complete answers are cached
+                client.cache.put(key, "".join(text_parts))
+            else:
+                yield "No response generated. Please try again."
+
+        except asyncio.TimeoutError:
+            yield StreamError("API error: the request timed out.")
+        except (aiohttp.ClientError, CircuitOpenError, RateLimitExceeded) as e:
+            yield StreamError(f"API error: {str(e)}")
+        except Exception as e:
+            yield StreamError(f"Error: {str(e)}")
+
+    async def collect_stream(self, prompt, system_context=None, on_partial=None, **options):
+        """Stream a response through on_partial(text) and return it whole
+
+        If the stream fails, on_partial gets the error after whatever text
+        arrived, and only the error is returned, so a broken-off answer is
+        never taken for a complete one.
+        """
+        parts = []
+        error = None
+        async for piece in self.stream_response(prompt, system_context, **options):
+            if isinstance(piece, StreamError):
+                error = piece
+                piece = f"\n\n{piece}" if parts else piece
+            else:
+                parts.append(piece)
+            if on_partial is not None:
+                on_partial(piece)
+        return error if error is not None else "".join(parts)
+
+    async def _post_json(self, prompt, system_context, history):
+        url = f"{self.client.base_url}?key={self.client.api_key}"
+        payload = self.client.build_payload(prompt, system_context, history)
+        async with await self.send(url, payload) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
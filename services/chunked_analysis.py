@@ -0,0 +1,147 @@
+import asyncio
+
+from services.token_estimator import estimate_tokens
+
+def split_into_chunks(text, max_tokens):
+    """Split text into pieces of at most max_tokens, breaking between lines where possible"""
+    chunks = []
+    current = []
+    used = 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if cost > max_tokens:
+            # A single line too long for a chunk (minified output, base64) is cut into slices
+            if current:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            step = max_tokens * 4 if line.isascii() else max_tokens
+            chunks.extend(line[start:start + step] for start in range(0, len(line), step))
+            continue
+        if used + cost > max_tokens and current:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class MapReduceAnalyzer:
+    """Analyzes output too large for one request by summarizing chunks and combining the findings
+
+    Chunks are analyzed concurrently through the async client, at most
+    max_concurrency at a time so the shared rate limiter is not flooded.
+    Findings that do not fit one reduce request are combined in rounds
+    until they do, and the final answer is streamed. If a round combines
+    nothing, the findings are returned as they are.
+    """
+    def __init__(self, async_client, chunk_tokens=3000, max_concurrency=4, reduce_tokens=6000):
+        self.async_client = async_client
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.reduce_tokens = reduce_tokens  # Largest batch of findings combined in one request
+
+    def count_chunks(self, text):
+        return len(split_into_chunks(text, self.chunk_tokens))
+
+    async def analyze(self, text, subject, system_context=None, use_cache=True, on_progress=None, on_partial=None):
+        """Return the combined analysis of text; on_progress(done, total) and on_partial(text) report progress
+
+        Cancelling the awaiting task cancels every request still in flight.
+        """
+        # Splitting megabytes of output takes a while; keep it off the event loop
+        chunks = await asyncio.get_running_loop().run_in_executor(None, split_into_chunks, text, self.chunk_tokens)
+        # Every chunk is mapped once plus one final reduce; intermediate rounds extend the total
+        progress = {"done": 0, "total": len(chunks) + 1}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        def report():
+            if on_progress is not None:
+                on_progress(progress["done"], progress["total"])
+
+        async def ask(prompt):
+            async with semaphore:
+                answer = await self.async_client.get_response(prompt, system_context, use_cache=use_cache)
+            progress["done"] += 1
+            report()
+            return answer
+
+        report()
+        findings = await asyncio.gather(*(
+            ask(self.map_prompt(subject, index, len(chunks), chunk))
+            for index, chunk in enumerate(chunks, start=1)
+        ))
+
+        usable = [finding for finding in findings if not self.is_error(finding)]
+        if not usable:
+            return findings[0] if findings else "No output to analyze."
+        if len(usable) < len(findings):
+            usable.append(f"(Note: {len(findings) - len(usable)} of {len(findings)} parts could not be analyzed.)")
+
+        # Combine in rounds until the findings fit a single request
+        while estimate_tokens("\n\n".join(usable)) > self.reduce_tokens and len(usable) > 1:
+            batches = self.batch(usable)
+            if len(batches) == len(usable):
+                break  # Every finding is already as large as a batch; combining further will not help
+            progress["total"] += len(batches)
+            report()
+            combined = await asyncio.gather(*(ask(self.combine_prompt(subject, batch)) for batch in batches))
+            # A batch whose combine failed is carried forward as it was, so none of its findings are lost
+            merged = []
+            for batch, result in zip(batches, combined):
+                if self.is_error(result):
+                    merged.extend(batch)
+                else:
+                    merged.append(result)
+            if len(merged) >= len(usable):
+                # No combine succeeded (API down, circuit open): another round would fail the same way
+                error = next(result for result in combined if self.is_error(result))
+                return (f"(Note: the findings of the {len(chunks)} parts could not be combined: {error})\n\n"
+                        + "\n\n".join(usable))
+            usable = merged
+
+        answer = await self.async_client.collect_stream(self.reduce_prompt(subject, usable), system_context,
+                                                        on_partial=on_partial, use_cache=use_cache)
+        progress["done"] += 1
+        report()
+        return answer
+
+    def is_error(self, text):
+        return self.async_client.client.is_error_response(text)
+
+    def batch(self, findings):
+        """Group findings into batches of at most reduce_tokens each"""
+        batches = []
+        current = []
+        used = 0
+        for finding in findings:
+            cost = estimate_tokens(finding)
+            if used + cost > self.reduce_tokens and current:
+                batches.append(current)
+                current, used = [], 0
+            current.append(finding)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def map_prompt(subject, index, total, chunk):
+        return (f"This is part {index} of {total} of {subject}.\n\n{chunk}\n\n"
+                "List only the errors, warnings, failed steps and facts needed to diagnose problems "
+                "in this part, as short bullet points. Say 'Nothing notable' if there are none.")
+
+    @staticmethod
+    def combine_prompt(subject, findings):
+        notes = "\n\n".join(findings)
+        return (f"These are notes taken from consecutive parts of {subject}:\n\n{notes}\n\n"
+                "Merge them into one short bullet list, removing duplicates and keeping every distinct problem.")
+
+    @staticmethod
+    def reduce_prompt(subject, findings):
+        notes = "\n\n".join(findings)
+        return (f"{subject[0].upper() + subject[1:]} was too long to read at once, so it was analyzed in parts. "
+                f"These are the notes from each part, in order:\n\n{notes}\n\n"
+                "Please provide a brief analysis of this output only. "
+                "Do not suggest additional commands unless I specifically ask for them.")
@@ -0,0 +1,126 @@
+import re
+from collections import deque
+
+from services.token_estimator import estimate_tokens
+
+class ConversationHistory:
+    """Multi-turn chat memory packed into each request under a token budget
+
+    Each request gets the newest turns that fit beside its prompt; the
+    stored turns are not touched, so one large prompt does not cost the
+    rest of the conversation. Stored history is capped on its own, by
+    max_stored_tokens and max_turns, and turns past the cap are evicted
+    oldest first. When summarization is enabled, turns that are evicted or
+    left out of a request are condensed into a short running summary so
+    the model keeps the gist of the earlier conversation.
+    """
+    def __init__(self, token_budget=4000, summarize=True, summary_budget=300, turn_snippet_chars=200,
+                 max_stored_tokens=16000, max_turns=100):
+        self.token_budget = token_budget      # Tokens available for history plus the new prompt
+        self.summarize = summarize
+        self.summary_budget = summary_budget  # Upper bound for the running summary
+        self.turn_snippet_chars = turn_snippet_chars
+        self.max_stored_tokens = max_stored_tokens
+        self.max_turns = max_turns
+        self.turns = deque()  # {"role": "user" | "model", "text": str, "tokens": int}
+        self.stored_tokens = 0
+        self.summary_lines = deque()
+
+    def add_turn(self, role, text):
+        """Record a user or model turn, evicting the oldest ones past the storage cap"""
+        turn = {"role": role, "text": text, "tokens": estimate_tokens(text)}
+        self.turns.append(turn)
+        self.stored_tokens += turn["tokens"]
+        while self.turns and (self.stored_tokens > self.max_stored_tokens or len(self.turns) > self.max_turns):
+            self._evict()
+        # Stored history has to start with a user turn
+        while self.turns and self.turns[0]["role"] != "user":
+            self._evict()
+
+    def add_exchange(self, prompt, response):
+        """Record a question and the answer it got"""
+        self.add_turn("user", prompt)
+        self.add_turn("model", response)
+
+    def clear(self):
+        """Forget the whole conversation"""
+        self.turns.clear()
+        self.stored_tokens = 0
+        self.summary_lines.clear()
+
+    def _select(self, prompt, token_budget):
+        """(summary lines, turns) to send beside prompt, leaving the stored turns as they are"""
+        if token_budget is None:
+            token_budget = self.token_budget
+        else:
+            token_budget = min(token_budget, self.token_budget)
+        room = token_budget - estimate_tokens(prompt)
+        available = room - self.summary_budget if self.summarize else room
+
+        # Walk back from the newest turn until the budget is spent
+        kept = 0
+        for turn in reversed(self.turns):
+            if turn["tokens"] > available:
+                break
+            available -= turn["tokens"]
+            kept += 1
+        first = len(self.turns) - kept
+        # What is sent has to start with a user turn
+        while first < len(self.turns) and self.turns[first]["role"] != "user":
+            first += 1
+        selected = list(self.turns)[first:]
+
+        if not self.summarize:
+            return [], selected
+        # Turns left out of this request only, summed up after the evicted ones
+        lines = list(self.summary_lines) + [self._snippet(turn) for turn in list(self.turns)[:first]]
+        while lines and summary_tokens(lines) > self.summary_budget:
+            lines.pop(0)
+        if summary_tokens(lines) > room:
+            lines = []
+        return lines, selected
+
+    def build_contents(self, prompt, token_budget=None):
+        """Return the previous turns as Gemini contents that fit beside prompt in the budget
+
+        token_budget can tighten the configured budget for a single request.
+        """
+        lines, turns = self._select(prompt, token_budget)
+        contents = []
+        if lines:
+            contents.append({"role": "user", "parts": [{"text": "Summary of our earlier conversation:\n" + "\n".join(lines)}]})
+            contents.append({"role": "model", "parts": [{"text": "Understood, I will keep that in mind."}]})
+        for turn in turns:
+            contents.append({"role": turn["role"], "parts": [{"text": turn["text"]}]})
+        return contents
+
+    def history_tokens(self, prompt, token_budget=None):
+        """Estimate the tokens build_contents would send"""
+        lines, turns = self._select(prompt, token_budget)
+        return sum(turn["tokens"] for turn in turns) + summary_tokens(lines)
+
+    def summary_tokens(self):
+        return summary_tokens(self.summary_lines)
+
+    def _snippet(self, turn):
+        """The first sentence of a turn, a cheap extractive summary of it"""
+        text = " ".join(turn["text"].split())
+        snippet = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0][:self.turn_snippet_chars]
+        speaker = "User" if turn["role"] == "user" else "Assistant"
+        return f"- {speaker}: {snippet}"
+
+    def _evict(self):
+        turn = self.turns.popleft()
+        self.stored_tokens -= turn["tokens"]
+        if not self.summarize:
+            return
+        self.summary_lines.append(self._snippet(turn))
+        while self.summary_lines and self.summary_tokens() > self.summary_budget:
+            self.summary_lines.popleft()
+
+
+def summary_tokens(lines):
+    """Tokens of a summary made of lines, with its framing"""
+    if not lines:
+        return 0
+    return sum(estimate_tokens(line) for line in lines) + 20
@@ -1,57 +1,189 @@
 import os
+import time
+import threading
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from services.response_cache import ResponseCache
+from services.resilience import (TokenBucket, RetryPolicy, CircuitBreaker, CircuitOpenError,
+                                 RateLimitExceeded, parse_retry_after)
+
+class StreamError(str):
+    """The error message the async client's stream_response yields when the answer cannot be completed
+
+    It may come after part of the answer, so consumers tell it apart from
+    text by its type rather than by its wording.
+    """
+
 
 class GeminiAPIClient:
     """Simple client for Google's Gemini API"""
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache=None, rate_limiter=None, retry_policy=None, circuit_breaker=None):
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY", "")
         self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-        
-    def get_response(self, prompt, system_context=None):
-        if not self.api_key:
-            return "No API key provided. Please add your Gemini API key in the settings."
-            
-        headers = {
-            "Content-Type": "application/json"
+        self.stream_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent"
+        self.generation_config = {
+            "temperature": 0.7,
+            "maxOutputTokens": 1024
         }
         
-        # Building the request payload according to Gemini API requirements
+        # Per-request timeouts in seconds: (connect, read)
+        self.connect_timeout = 5
+        self.read_timeout = 60
+        
+        # One long-lived session so requests reuse pooled keep-alive connections
+        # instead of paying DNS, TCP and TLS setup on every question
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Repeated questions are answered from the response cache
+        self.cache = cache if cache is not None else ResponseCache()
+        
+        # Protection against overload: client-side rate limit, retries and a circuit breaker
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def prewarm(self):
+        """Open a connection to the API host in the background so the first question skips the handshake"""
+        parts = urlsplit(self.base_url)
+        host_url = f"{parts.scheme}://{parts.netloc}/"
+
+        def connect():
+            try:
+                # Any response leaves a keep-alive connection in the session's pool
+                self.session.head(host_url, timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                pass
+
+        thread = threading.Thread(target=connect, name="gemini-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+
+    def build_payload(self, prompt, system_context=None, history=None):
+        """Build the request payload according to Gemini API requirements"""
         data = {
             "contents": [],
-            "generationConfig": {
-                "temperature": 0.7,
-                "maxOutputTokens": 1024
-            }
+            "generationConfig": dict(self.generation_config)
         }
-        
+
         # Add system instruction if provided
         if system_context:
             data["systemInstruction"] = {
                 "parts": [{"text": system_context}]
             }
-        
+
+        # Add earlier conversation turns
+        if history:
+            data["contents"].extend(history)
+
         # Add user message
         data["contents"].append({
             "role": "user",
             "parts": [{"text": prompt}]
         })
-            
+        return data
+
+    def extract_text(self, result):
+        """Pull the text parts out of a (possibly partial) generateContent result"""
+        if "candidates" in result and result["candidates"]:
+            content = result["candidates"][0].get("content", {})
+            return "".join(part["text"] for part in content.get("parts", []) if "text" in part)
+        return ""
+
+    def cache_key(self, prompt, system_context=None, history=None):
+        """Cache key for a request; depends on everything that shapes the answer"""
+        return self.cache.make_key(prompt, system_context, self.generation_config, history)
+
+    def is_error_response(self, text):
+        """True for the error/status strings the client returns instead of an answer"""
+        return text.startswith(("API error:", "Error:", "Error getting response:",
+                                "No API key provided.", "No response generated."))
+
+    def send(self, url, data):
+        """POST with rate limiting, jittered retries for transient errors and a circuit breaker
+
+        Returns the streamed response; the caller checks the final status.
+        """
+        headers = {
+            "Content-Type": "application/json"
+        }
+        attempt = 0
+        while True:
+            self.circuit_breaker.check()
+            self._sleep(self.rate_limiter.reserve())
+            try:
+                # Streamed so SSE responses can be read as they arrive
+                response = self.session.post(url, headers=headers, json=data, stream=True, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.circuit_breaker.record_failure()
+                if attempt >= self.retry_policy.max_retries:
+                    raise
+                self._sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+                continue
+
+            if not self.retry_policy.should_retry(response.status_code):
+                # Anything but a transient error means the endpoint itself is healthy
+                self.circuit_breaker.record_success()
+                return response
+
+            self.circuit_breaker.record_failure()
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                self.rate_limiter.penalize(retry_after)
+            if attempt >= self.retry_policy.max_retries or (retry_after or 0) > self.rate_limiter.max_wait:
+                return response
+            response.close()
+            self._sleep(self.retry_policy.delay(attempt, retry_after))
+            attempt += 1
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def get_response(self, prompt, system_context=None, use_cache=True, history=None):
+        if not self.api_key:
+            return "No API key provided. Please add your Gemini API key in the settings."
+
+        key = self.cache_key(prompt, system_context, history)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        data = self.build_payload(prompt, system_context, history)
+
         try:
             url = f"{self.base_url}?key={self.api_key}"
-            response = requests.post(url, headers=headers, json=data)
+            response = self.send(url, data)
             response.raise_for_status()
-            
+
             result = response.json()
             if "candidates" in result and result["candidates"]:
                 text_parts = []
                 for part in result["candidates"][0]["content"]["parts"]:
                     if "text" in part:
                         text_parts.append(part["text"])
-                return "\n".join(text_parts)
+                text = "\n".join(text_parts)
+                self.cache.put(key, text)
+                return text
             else:
                 return "No response generated. Please try again."
-                
-        except requests.exceptions.RequestException as e:
+
+        except (requests.exceptions.RequestException, CircuitOpenError, RateLimitExceeded) as e:
             return f"API error: {str(e)}"
         except Exception as e:
-            return f"Error: {str(e)}"
\ No newline at end of file
+            return f"Error: {str(e)}"
@@ -0,0 +1,98 @@
+from services.token_estimator import estimate_tokens
+
+class RequestBudget:
+    """Size and cost checks applied to every outgoing AI request before any network I/O
+
+    Prompts over max_prompt_tokens, or requests that would exceed
+    max_request_tokens together with the system context and history, are
+    trimmed to their head and tail so oversized command output never reaches
+    the API as-is. Prices are per million tokens.
+    """
+    def __init__(self, max_prompt_tokens=6000, max_request_tokens=12000,
+                 input_cost_per_million=0.10, output_cost_per_million=0.40, expected_output_tokens=1024):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_request_tokens = max_request_tokens
+        self.input_cost_per_million = input_cost_per_million
+        self.output_cost_per_million = output_cost_per_million
+        self.expected_output_tokens = expected_output_tokens  # Upper bound charged for the answer
+
+    def estimate(self, prompt, system_context=None, history_tokens=0):
+        """Return the estimated input tokens and worst-case cost of a request"""
+        tokens = estimate_tokens(prompt) + estimate_tokens(system_context) + history_tokens
+        cost = (tokens * self.input_cost_per_million +
+                self.expected_output_tokens * self.output_cost_per_million) / 1_000_000
+        return {"tokens": tokens, "cost": cost}
+
+    def prompt_limit(self, system_context=None):
+        """Largest prompt allowed next to system_context"""
+        return max(0, min(self.max_prompt_tokens, self.max_request_tokens - estimate_tokens(system_context)))
+
+    def enforce(self, prompt, system_context=None):
+        """Return (prompt, trimmed) with prompt cut down to the configured limits"""
+        limit = self.prompt_limit(system_context)
+        if estimate_tokens(prompt) <= limit:
+            return prompt, False
+        return trim_to_tokens(prompt, limit), True
+
+    def history_budget(self, system_context=None):
+        """Tokens left for the prompt plus conversation history once the system context is counted"""
+        return max(0, self.max_request_tokens - estimate_tokens(system_context))
+
+
+def trim_to_tokens(text, max_tokens, head_share=0.6):
+    """Keep the first and last lines of text that fit in max_tokens, marking what was cut
+
+    The head usually holds the command and first errors, the tail the final
+    status, so both are kept and the middle is dropped.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    lines = text.splitlines()
+    head_budget = int(max_tokens * head_share)
+    tail_budget = max_tokens - head_budget - 20  # Room for the marker line
+
+    head = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > head_budget:
+            break
+        head.append(line)
+        used += cost
+
+    tail = []
+    used = 0
+    for line in reversed(lines[len(head):]):
+        cost = estimate_tokens(line) + 1
+        if used + cost > tail_budget:
+            break
+        tail.append(line)
+        used += cost
+    tail.reverse()
+
+    omitted = len(lines) - len(head) - len(tail)
+    if not head and not tail:
+        # A single huge line: keep the longest start that still fits once the marker is added,
+        # searching up from nothing and down from four characters a token (all-ASCII text)
+        marker = "\n... [truncated to fit the request size limit] ..."
+        low, high = 0, min(len(text), max(0, max_tokens) * 4)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(text[:middle] + marker) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low] + marker
+    return "\n".join(head + [f"... [{omitted} lines omitted to fit the request size limit] ..."] + tail)
+
+
+def budget_from_config(config, expected_output_tokens=1024):
+    """Build a RequestBudget from the user's config.json settings"""
+    return RequestBudget(
+        max_prompt_tokens=config.get("max_prompt_tokens", 6000),
+        max_request_tokens=config.get("max_request_tokens", 12000),
+        input_cost_per_million=config.get("gemini_input_cost_per_million", 0.10),
+        output_cost_per_million=config.get("gemini_output_cost_per_million", 0.40),
+        expected_output_tokens=expected_output_tokens
+    )
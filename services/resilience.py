@@ -0,0 +1,146 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and requests fail fast"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would have to wait longer than the limiter allows"""
+
+
+class TokenBucket:
+    """Client-side token-bucket rate limiter that also honours server Retry-After hints"""
+    def __init__(self, rate=1.0, capacity=5, max_wait=30.0):
+        self.rate = rate          # Tokens added per second
+        self.capacity = capacity  # Burst size
+        self.max_wait = max_wait  # Longest a request may be held back before failing, in seconds
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait before sending"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= 1
+
+            wait = max(0.0, self.blocked_until - now)
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            if wait > self.max_wait:
+                self.tokens += 1  # Give the token back, this request is not sent
+                raise RateLimitExceeded(f"rate limited, try again in {round(wait)}s")
+            return wait
+
+    def penalize(self, seconds):
+        """Hold back all requests for the given time (from a Retry-After header)"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient failures"""
+    def __init__(self, max_retries=3, base_delay=0.5, max_delay=20.0,
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = set(retry_statuses)
+
+    def should_retry(self, status_code):
+        return status_code in self.retry_statuses
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt + 1"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            return max(retry_after, backoff)
+        return backoff
+
+
+class CircuitBreaker:
+    """Fails fast after repeated failures and probes again after a cool-down"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a request may be sent now"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            # Cool-down is over: let one trial request through (and another after each cool-down)
+            self.state = self.HALF_OPEN
+            self.opened_at = now
+            return True
+
+    def check(self):
+        """Raise CircuitOpenError if requests are currently blocked"""
+        if not self.allow():
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(
+                f"the Gemini API looks unhealthy, not sending requests for another {max(0, round(remaining))}s"
+            )
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def resilience_from_config(config):
+    """Build the rate limiter, retry policy and circuit breaker from settings"""
+    rate_limiter = TokenBucket(
+        rate=config.get("gemini_rate_limit_per_second", 1.0),
+        capacity=config.get("gemini_rate_limit_burst", 5),
+        max_wait=config.get("gemini_rate_limit_max_wait", 30.0)
+    )
+    retry_policy = RetryPolicy(
+        max_retries=config.get("gemini_max_retries", 3),
+        base_delay=config.get("gemini_retry_base_delay", 0.5),
+        max_delay=config.get("gemini_retry_max_delay", 20.0)
+    )
+    circuit_breaker = CircuitBreaker(
+        failure_threshold=config.get("gemini_circuit_failure_threshold", 5),
+        reset_timeout=config.get("gemini_circuit_reset_timeout", 30.0)
+    )
+    return rate_limiter, retry_policy, circuit_breaker
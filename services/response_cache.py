@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    """Two-level cache for AI responses: an in-memory LRU that spills to SQLite under ~/.rapture/"""
+    def __init__(self, path=None, max_memory_entries=128, max_disk_bytes=20 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.path = path or os.path.join(os.path.expanduser("~"), ".rapture", "response_cache.db")
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+
+        self.memory = OrderedDict()  # key -> (response, created_at), most recently used last
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = None
+
+    @staticmethod
+    def normalize_prompt(prompt):
+        """Collapse whitespace and case so trivially different prompts share an entry"""
+        return " ".join(prompt.split()).lower()
+
+    def make_key(self, prompt, system_context=None, generation_config=None, history=None):
+        """Build the cache key from the normalized prompt, system context, generation config and history"""
+        material = json.dumps(
+            [self.normalize_prompt(prompt), system_context or "", generation_config or {}, history or []],
+            sort_keys=True
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for key, or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if now - entry[1] < self.ttl:
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self.memory[key]
+
+            row = self._disk_get(key, now)
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        """Store a response in both levels"""
+        now = time.time()
+        with self.lock:
+            self._remember(key, response, now)
+            self._disk_put(key, response, now)
+
+    def clear(self):
+        """Drop every cached response"""
+        with self.lock:
+            self.memory.clear()
+            db = self._connect()
+            if db is not None:
+                try:
+                    with db:
+                        db.execute("DELETE FROM responses")
+                except sqlite3.Error as e:
+                    print(f"Response cache error: {e}")
+
+    def stats(self):
+        """Return hit/miss counters for display"""
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self.memory)}
+
+    def _remember(self, key, response, created_at):
+        self.memory[key] = (response, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _connect(self):
+        """Open the on-disk store lazily; the cache keeps working in memory if this fails"""
+        if self.db is None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.db = sqlite3.connect(self.path, check_same_thread=False)
+                with self.db:
+                    self.db.execute(
+                        "CREATE TABLE IF NOT EXISTS responses ("
+                        "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                        "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                    )
+                    self.db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            except (OSError, sqlite3.Error) as e:
+                print(f"Response cache unavailable on disk: {e}")
+                self.db = None
+        return self.db
+
+    def _disk_get(self, key, now):
+        db = self._connect()
+        if db is None:
+            return None
+        try:
+            row = db.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with db:
+                if now - row[1] >= self.ttl:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return row
+        except sqlite3.Error as e:
+            print(f"Response cache error: {e}")
+            return None
+
+    def _disk_put(self, key, response, now):
+        db = self._connect()
+        if db is None:
+            return
+        try:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, response, len(response.encode("utf-8")), now, now)
+                )
+                self._evict(db, now)
+        except sqlite3.Error as e:
+            print(f"Response cache error: {e}")
+
+    def _evict(self, db, now):
+        """Drop expired entries, then least recently used ones until under the size limit"""
+        db.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
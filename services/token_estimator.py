@@ -0,0 +1,13 @@
+import math
+
+def estimate_tokens(text):
+    """Fast local estimate of how many tokens the API will count for text
+
+    English prose and code average about four characters per token, while
+    non-ASCII characters (accents, CJK, emoji) tend to cost about one each.
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 4) + other_chars
@@ -0,0 +1,50 @@
+import asyncio
+
+from services.chunked_analysis import MapReduceAnalyzer
+from services.gemini_client import GeminiAPIClient
+
+
+class StubClient:
+    """Stands in for AsyncGeminiAPIClient: answers map prompts, fails combine prompts as told"""
+    def __init__(self, fail_combine):
+        self.client = GeminiAPIClient(api_key="test")
+        self.fail_combine = fail_combine
+        self.combines = 0
+        self.reduce_prompt = None
+
+    async def get_response(self, prompt, system_context=None, use_cache=True):
+        if prompt.startswith("This is part"):
+            part = prompt.split()[3]
+            return f"- finding of part {part} " + "detail " * 200
+        self.combines += 1
+        if self.fail_combine(self.combines):
+            return "API error: circuit open"
+        return "- merged findings"
+
+    async def collect_stream(self, prompt, system_context=None, on_partial=None, **options):
+        self.reduce_prompt = prompt
+        return "final analysis"
+
+
+def analyze(client, parts=20):
+    analyzer = MapReduceAnalyzer(client, chunk_tokens=100, reduce_tokens=1000)
+    text = "\n".join(f"line {i} " + "x" * 300 for i in range(parts))
+    return asyncio.run(asyncio.wait_for(analyzer.analyze(text, "the output"), 10))
+
+
+def test_analysis_stops_when_no_combine_succeeds():
+    client = StubClient(fail_combine=lambda n: True)
+    answer = analyze(client)
+    assert "could not be combined: API error: circuit open" in answer
+    # Every part's findings are returned, and only one round, of fewer batches than parts, was tried
+    assert all(f"finding of part {part} " in answer for part in range(1, 21))
+    assert 0 < client.combines < 20
+    assert client.reduce_prompt is None
+
+
+def test_failed_combines_carry_their_findings_forward():
+    # The first combine of the first round fails; the rest succeed
+    client = StubClient(fail_combine=lambda n: n == 1)
+    assert analyze(client) == "final analysis"
+    assert "finding of part 1 " in client.reduce_prompt
+    assert "merged findings" in client.reduce_prompt
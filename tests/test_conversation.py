@@ -0,0 +1,58 @@
+from services.conversation import ConversationHistory
+from services.token_estimator import estimate_tokens
+
+
+def texts(contents):
+    return [part["text"] for content in contents for part in content["parts"]]
+
+
+def filled(**options):
+    history = ConversationHistory(token_budget=4000, **options)
+    for i in range(5):
+        history.add_exchange(f"Question {i}. " + "word " * 100, f"Answer {i}. " + "word " * 100)
+    return history
+
+
+def test_a_large_prompt_does_not_wipe_the_stored_conversation():
+    history = filled()
+    big_prompt = "log line " * 1700
+    assert estimate_tokens(big_prompt) > 3700
+    history.build_contents(big_prompt)
+    assert len(history.turns) == 10
+
+    # The next ordinary question gets the whole conversation back
+    contents = history.build_contents("And now?")
+    assert texts(contents)[0].startswith("Question 0.")
+    assert len(contents) == 10
+
+
+def test_turns_left_out_of_a_request_are_summarized_for_it():
+    history = filled()
+    contents = history.build_contents("word " * 3000)
+    sent = texts(contents)
+    assert sent[0].startswith("Summary of our earlier conversation:")
+    assert "- User: Question 0." in sent[0]
+    assert not history.summary_lines  # Nothing was evicted for good
+
+
+def test_selection_starts_with_a_user_turn():
+    history = filled(summarize=False)
+    for budget in range(50, 1500, 37):
+        contents = history.build_contents("hi", token_budget=budget)
+        assert not contents or contents[0]["role"] == "user"
+        assert history.history_tokens("hi", budget) == sum(estimate_tokens(text) for text in texts(contents))
+
+
+def test_stored_history_is_capped_separately():
+    history = ConversationHistory(max_stored_tokens=1000, max_turns=6)
+    for i in range(20):
+        history.add_exchange(f"Question {i}.", f"Answer {i}.")
+    assert len(history.turns) == 6
+    assert history.turns[0]["role"] == "user"
+    assert "- User: Question 13." in history.summary_lines
+
+    history = ConversationHistory(max_stored_tokens=500)
+    for i in range(20):
+        history.add_exchange(f"Question {i}. " + "word " * 50, f"Answer {i}.")
+    assert history.stored_tokens <= 500
+    assert history.stored_tokens == sum(turn["tokens"] for turn in history.turns)
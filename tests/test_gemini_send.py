@@ -0,0 +1,215 @@
+"""Both Gemini clients' send() against a local stand-in server that injects faults"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.async_gemini_client import AsyncGeminiAPIClient
+from services.gemini_client import GeminiAPIClient, StreamError
+from services.resilience import TokenBucket, RetryPolicy, CircuitBreaker, CircuitOpenError
+
+OK_BODY = b'{"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}'
+SSE_BODY = b'data: {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}\n\n'
+BREAK = {}
+
+
+class FaultServer(ThreadingHTTPServer):
+    """Answers POSTs from a script of (status, headers) and records when each one arrived
+
+    The last entry of the script repeats once it runs out.
+    """
+    def __init__(self, script):
+        super().__init__(("127.0.0.1", 0), FaultHandler)
+        self.script = list(script)
+        self.arrivals = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/generate"
+
+    def next_reply(self):
+        with self.lock:
+            self.arrivals.append(time.monotonic())
+            return self.script.pop(0) if len(self.script) > 1 else self.script[0]
+
+
+class FaultHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, headers = self.server.next_reply()
+        body = (SSE_BODY if "alt=sse" in self.path else OK_BODY) if status == 200 else b"{}"
+        # BREAK stands for a connection lost halfway through the body
+        length = len(body) + (100 if headers is BREAK else 0)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+        self.wfile.write(body)
+        if headers is BREAK:
+            # Let the client read the first event before the connection goes
+            self.wfile.flush()
+            time.sleep(0.2)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(script):
+        server = FaultServer(script)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_client(failure_threshold=10, max_retries=3, max_wait=30.0):
+    client = GeminiAPIClient(
+        api_key="test",
+        rate_limiter=TokenBucket(rate=1000.0, capacity=100, max_wait=max_wait),
+        retry_policy=RetryPolicy(max_retries=max_retries, base_delay=0.01, max_delay=0.05),
+        circuit_breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=60.0),
+    )
+    client.connect_timeout = 2
+    client.read_timeout = 5
+    return client
+
+
+RECOVERING = [(429, {"Retry-After": "1"}), (503, {}), (200, {})]
+
+
+def check_recovery(server, status):
+    assert status == 200
+    assert len(server.arrivals) == 3
+    # Retry-After was honoured before the second attempt; the 503 only cost a short backoff
+    assert server.arrivals[1] - server.arrivals[0] >= 0.95
+    assert server.arrivals[2] - server.arrivals[1] < 0.5
+
+
+def test_sync_send_retries_through_429_and_503(serve):
+    server = serve(RECOVERING)
+    client = make_client()
+    with client.send(server.url, {"contents": []}) as response:
+        check_recovery(server, response.status_code)
+    assert client.circuit_breaker.state == CircuitBreaker.CLOSED
+    client.close()
+
+
+def test_async_send_retries_through_429_and_503(serve):
+    server = serve(RECOVERING)
+    client = make_client()
+
+    async def run():
+        async_client = AsyncGeminiAPIClient(client)
+        try:
+            async with await async_client.send(server.url, {"contents": []}) as response:
+                return response.status
+        finally:
+            await async_client.close()
+
+    check_recovery(server, asyncio.run(run()))
+    assert client.circuit_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_sync_send_gives_up_after_max_retries(serve):
+    server = serve([(503, {})])
+    client = make_client(max_retries=2)
+    with client.send(server.url, {"contents": []}) as response:
+        assert response.status_code == 503
+    assert len(server.arrivals) == 3
+
+
+def test_sync_send_stops_when_the_breaker_opens(serve):
+    server = serve([(503, {})])
+    client = make_client(failure_threshold=2)
+    with pytest.raises(CircuitOpenError):
+        client.send(server.url, {"contents": []})
+    assert len(server.arrivals) == 2
+    assert client.circuit_breaker.state == CircuitBreaker.OPEN
+    # Later requests fail fast without reaching the server
+    with pytest.raises(CircuitOpenError):
+        client.send(server.url, {"contents": []})
+    assert len(server.arrivals) == 2
+
+
+def test_async_send_stops_when_the_breaker_opens(serve):
+    server = serve([(503, {})])
+    client = make_client(failure_threshold=2)
+
+    async def run():
+        async_client = AsyncGeminiAPIClient(client)
+        try:
+            await async_client.send(server.url, {"contents": []})
+        finally:
+            await async_client.close()
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(run())
+    assert len(server.arrivals) == 2
+    assert client.circuit_breaker.state == CircuitBreaker.OPEN
+
+
+def test_sync_get_response_returns_the_answer_after_retries(serve, tmp_path):
+    server = serve(RECOVERING)
+    client = make_client()
+    client.cache.path = str(tmp_path / "cache.db")
+    client.base_url = server.url
+    assert client.get_response("hello", use_cache=False) == "ok"
+    assert len(server.arrivals) == 3
+
+
+def test_async_stream_deadline_covers_retry_backoff(serve, tmp_path):
+    server = serve([(429, {"Retry-After": "5"}), (200, {})])
+    client = make_client()
+    client.cache.path = str(tmp_path / "cache.db")
+    client.stream_url = server.url
+
+    async def run():
+        async_client = AsyncGeminiAPIClient(client)
+        try:
+            return [part async for part in async_client.stream_response("hello", use_cache=False, timeout=0.5)]
+        finally:
+            await async_client.close()
+
+    start = time.monotonic()
+    parts = asyncio.run(run())
+    assert time.monotonic() - start < 2.0
+    assert parts == ["API error: the request timed out."]
+    assert len(server.arrivals) == 1
+
+
+def test_async_stream_failure_is_reported_apart_from_the_text(serve, tmp_path):
+    server = serve([(200, BREAK)])
+    client = make_client()
+    client.cache.path = str(tmp_path / "cache.db")
+    client.stream_url = server.url
+    shown = []
+
+    async def run():
+        async_client = AsyncGeminiAPIClient(client)
+        try:
+            return await async_client.collect_stream("hello", on_partial=shown.append, use_cache=False)
+        finally:
+            await async_client.close()
+
+    response = asyncio.run(run())
+    assert isinstance(response, StreamError)
+    assert client.is_error_response(response)
+    # The text that did arrive is still shown, followed by the error
+    assert shown[0] == "ok"
+    assert shown[1] == f"\n\n{response}"
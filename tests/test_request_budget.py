@@ -0,0 +1,27 @@
+import pytest
+
+from services.request_budget import trim_to_tokens
+from services.token_estimator import estimate_tokens
+
+
+@pytest.mark.parametrize("text", [
+    "x" * 100000,
+    "é" * 100000,
+    "日本語のログ" * 20000,
+    ("a" * 3 + "ü") * 30000,
+])
+def test_trim_single_line_fits_the_budget(text):
+    trimmed = trim_to_tokens(text, 500)
+    assert estimate_tokens(trimmed) <= 500
+    assert trimmed.endswith("[truncated to fit the request size limit] ...")
+    assert text.startswith(trimmed.split("\n")[0])
+
+
+def test_trim_keeps_head_and_tail_lines():
+    text = "\n".join(f"line {i}" for i in range(10000))
+    trimmed = trim_to_tokens(text, 300)
+    assert estimate_tokens(trimmed) <= 300
+    lines = trimmed.splitlines()
+    assert lines[0] == "line 0"
+    assert lines[-1] == "line 9999"
+    assert "lines omitted" in trimmed
@@ -0,0 +1,103 @@
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.resilience import (TokenBucket, RetryPolicy, CircuitBreaker, CircuitOpenError,
+                                 RateLimitExceeded, parse_retry_after)
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=10.0, capacity=3, max_wait=5.0)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+
+
+def test_token_bucket_refuses_a_wait_past_max_wait_and_returns_the_token():
+    bucket = TokenBucket(rate=1.0, capacity=1, max_wait=0.5)
+    assert bucket.reserve() == 0.0
+    tokens = bucket.tokens
+    with pytest.raises(RateLimitExceeded):
+        bucket.reserve()
+    assert bucket.tokens == pytest.approx(tokens, abs=0.01)
+
+
+def test_token_bucket_penalty_holds_back_requests():
+    bucket = TokenBucket(rate=100.0, capacity=10, max_wait=5.0)
+    bucket.penalize(2.0)
+    assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+def test_retry_policy_retries_transient_statuses_only():
+    policy = RetryPolicy()
+    assert all(policy.should_retry(status) for status in (429, 500, 502, 503, 504))
+    assert not any(policy.should_retry(status) for status in (200, 400, 401, 404))
+
+
+def test_retry_policy_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=0.5, max_delay=3.0)
+    for attempt in range(8):
+        for _ in range(50):
+            assert 0.0 <= policy.delay(attempt) <= min(3.0, 0.5 * 2 ** attempt)
+
+
+def test_retry_policy_honours_retry_after():
+    policy = RetryPolicy(base_delay=0.01, max_delay=0.01)
+    assert policy.delay(0, retry_after=7.0) == 7.0
+
+
+def test_circuit_breaker_opens_after_the_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60.0)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_circuit_breaker_half_opens_after_the_cool_down():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial request per cool-down
+    assert not breaker.allow()
+
+
+def test_circuit_breaker_trial_result_decides_the_state():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("120", 120.0),
+    ("1.5", 1.5),
+    ("-5", 0.0),
+    (None, None),
+    ("", None),
+    ("soon", None),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    later = datetime.now(timezone.utc) + timedelta(seconds=60)
+    assert parse_retry_after(format_datetime(later, usegmt=True)) == pytest.approx(60, abs=2)
+    earlier = datetime.now(timezone.utc) - timedelta(seconds=60)
+    assert parse_retry_after(format_datetime(earlier, usegmt=True)) == 0.0
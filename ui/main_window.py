@@ -6,6 +6,11 @@ from ui.widgets.profile_widget import ProfileWidget
 from ui.widgets.dev_tools_widget import DeveloperToolsWidget
 from ui.widgets.ai_chat_widget import AIChatWidget
 from ui.widgets.settings_widget import SettingsWidget, get_theme_stylesheet, get_font_size
+from ui.widgets.jobs_widget import JobsWidget
+from ui.widgets.history_widget import HistoryWidget
+from utils.async_runner import shared_runner
+from utils.job_scheduler import shared_scheduler
+from utils.shell_session import shared_sessions
 
 class MainWindow(QMainWindow):
     """Main application window"""
@@ -62,6 +67,8 @@ class MainWindow(QMainWindow):
         self.dev_tools_tab = DeveloperToolsWidget()
         self.ai_chat_tab = AIChatWidget()
         self.settings_tab = SettingsWidget()
+        self.jobs_tab = JobsWidget()
+        self.history_tab = HistoryWidget()
         
         # Connect ProfileWidget's context_updated signal to AIChatWidget's update_command_context method
         self.profile_tab.context_updated.connect(self.ai_chat_tab.update_command_context)
@@ -78,6 +85,8 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(self.profile_tab, "System Profile")
         self.tab_widget.addTab(self.dev_tools_tab, "Developer Tools")
         self.tab_widget.addTab(self.ai_chat_tab, "AI Assistant")
+        self.tab_widget.addTab(self.jobs_tab, "Jobs")
+        self.tab_widget.addTab(self.history_tab, "History")
         self.tab_widget.addTab(self.settings_tab, "Settings")
         main_layout.addWidget(self.tab_widget)
         
@@ -90,8 +99,10 @@ class MainWindow(QMainWindow):
     def connect_widgets(self):
         """Connect widgets to share data between them"""
         # Pass system information from profile widget to AI chat widget
+        # The profile is collected in the background; the AI context follows it as parts arrive
         system_info = self.profile_tab.get_system_info_dict()
         self.ai_chat_tab.update_system_context_with_system_info(system_info)
+        self.profile_tab.system_info_updated.connect(self.ai_chat_tab.update_system_context_with_system_info)
         
         # Add this line to directly connect the profile widget's context_updated signal
         # to the AI chat widget's update_command_context method
@@ -99,6 +110,15 @@ class MainWindow(QMainWindow):
         # Debug message to confirm connection
         print("Connected widgets and shared system information")
     
+    def closeEvent(self, event):
+        """Stop background work before the window goes away"""
+        self.ai_chat_tab.shutdown()
+        shared_runner().stop()
+        shared_scheduler().shutdown()
+        shared_sessions().close_all()
+        self.profile_tab.monitor_widget.stop()
+        super().closeEvent(event)
+    
     def load_settings(self):
         """Load application settings"""
         try:
@@ -159,7 +179,7 @@ class MainWindow(QMainWindow):
         self.app_subtitle.setStyleSheet(f"color: {colors['secondary_text']};")
         
         # Notify all widgets of theme change
-        for widget in [self.profile_tab, self.dev_tools_tab, self.ai_chat_tab, self.settings_tab]:
+        for widget in [self.profile_tab, self.dev_tools_tab, self.ai_chat_tab, self.jobs_tab, self.history_tab, self.settings_tab]:
             if hasattr(widget, 'update_theme'):
                 widget.update_theme(theme_name)
     
@@ -178,6 +198,6 @@ class MainWindow(QMainWindow):
         self.app_subtitle.setFont(QFont("Arial", font_sizes["small"]))
         
         # Notify all widgets of font size change
-        for widget in [self.profile_tab, self.dev_tools_tab, self.ai_chat_tab, self.settings_tab]:
+        for widget in [self.profile_tab, self.dev_tools_tab, self.ai_chat_tab, self.jobs_tab, self.history_tab, self.settings_tab]:
             if hasattr(widget, 'update_font_size'):
                 widget.update_font_size(font_size_name)
\ No newline at end of file
@@ -1,20 +1,35 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QFrame, QHBoxLayout, 
-                          QTextEdit, QPushButton, QLineEdit, QMessageBox, QScrollArea)
-from PyQt5.QtGui import QFont, QTextCursor
-from PyQt5.QtCore import Qt, pyqtSignal
+                          QTextEdit, QPushButton, QLineEdit, QMessageBox, QScrollArea, QCheckBox,
+                          QProgressBar, QFileDialog)
+from PyQt5.QtGui import QFont, QTextCursor, QTextCharFormat
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 
 from services.gemini_client import GeminiAPIClient
-from utils.response_thread import ResponseThread
-from utils.command_worker import CommandWorker
+from services.async_gemini_client import AsyncGeminiAPIClient
+from services.resilience import resilience_from_config
+from services.conversation import ConversationHistory
+from services.chunked_analysis import MapReduceAnalyzer
+from services.request_budget import budget_from_config
+from services.token_estimator import estimate_tokens
+from utils.output_compactor import compactor_from_config
+from utils.output_buffer import buffer_options_from_config
+from utils.async_runner import ResponseTask, MapReduceTask, CompactionTask, shared_runner
+from utils.command_worker import CommandWorker, STATUS_CANCELLED, STATUS_TIMED_OUT
+from utils.job_scheduler import shared_scheduler, PRIORITY_HIGH
+from utils.shell_session import shared_sessions, sessions_supported
+from utils.config import load_config
+from utils.metrics_store import shared_metrics
+from ui.widgets.output_view import OutputView
 import os
 import json
 import re
+import time
 
 class EnhancedGeminiAPIClient(GeminiAPIClient):
     """Enhanced Gemini API Client with issue detection and solution recommendation"""
     
-    def __init__(self, api_key=""):
-        super().__init__(api_key)
+    def __init__(self, api_key="", **kwargs):
+        super().__init__(api_key, **kwargs)
         
     def detect_command_intent(self, response_text):
         """Detect if the AI is suggesting a command to run"""
@@ -51,21 +66,63 @@ class AIChatWidget(QWidget):
         self.current_font_size = "Medium (Default)"
         
         self.system_info = {}
+        self.buffer_options = buffer_options_from_config(load_config())  # Needed by the output view
         self.setup_ui()
         self.current_command_context = {
           "name": "Current Directory",
           "path": os.getcwd()
         }
-        self.command_workers = []  # Add a list to track command workers
-        self.response_thread = None  # Initialize response thread to None
-        # Rest of initialization remains the same
+        self.last_exit_code = None  # Exit code of the last executed command
+        self.last_command_status = None
+        self.last_command_usage = None
+        self.command_job = None  # Job of the suggested command currently running
+        self.response_task = None  # AI request currently in flight
+        
+        # Streaming state: partial text is buffered and flushed at most once per frame
+        self.max_response_length = 2000
+        self.stream_buffer = []
+        self.streamed_length = 0
+        self.stream_started = False
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setSingleShot(True)
+        self.stream_timer.setInterval(16)  # ~60 fps
+        self.stream_timer.timeout.connect(self.flush_stream_buffer)
         
         # Initialize with saved API key or empty string
         saved_key = self.load_api_key()
-        self.gemini_client = EnhancedGeminiAPIClient(api_key=saved_key)
+        config = load_config()
+        rate_limiter, retry_policy, circuit_breaker = resilience_from_config(config)
+        self.gemini_client = EnhancedGeminiAPIClient(api_key=saved_key, rate_limiter=rate_limiter,
+                                                     retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+        self.async_client = AsyncGeminiAPIClient(self.gemini_client)
+        shared_runner().add_cleanup(self.async_client.close)
+        
+        # Previous turns are sent along with each question, within a token budget
+        self.conversation = ConversationHistory(
+            token_budget=config.get("conversation_token_budget", 4000),
+            summarize=config.get("conversation_summarize", True),
+            max_stored_tokens=config.get("conversation_max_stored_tokens", 16000),
+            max_turns=config.get("conversation_max_turns", 100)
+        )
+        self.pending_prompt = ""
+        self.pending_subject = ""  # What the output being prepared for analysis is
+        
+        # Hard limits on request size, checked locally before anything is sent
+        self.request_budget = budget_from_config(config, self.gemini_client.generation_config["maxOutputTokens"])
+        self.chat_input.textChanged.connect(self.update_token_estimate)
+        self.output_compactor = compactor_from_config(config)
+        self.command_timeout = config.get("command_timeout", 300)  # Seconds, 0 for no limit
+        
+        # Outputs too large for one request are analyzed in chunks
+        self.analyzer = MapReduceAnalyzer(
+            self.async_client,
+            chunk_tokens=config.get("analysis_chunk_tokens", 3000),
+            max_concurrency=config.get("analysis_max_concurrency", 4)
+        )
         
         # If we have a saved key, show it masked in the input field
         if saved_key:
+            self.gemini_client.prewarm()  # Warm up the API connection in the background
             self.api_key_input.setText("*" * 10)  # Mask the actual key
             self.chat_display.append("<span style='color:#A3BE8C;'><b>System:</b></span> API key loaded from settings.")
         
@@ -163,6 +220,15 @@ class AIChatWidget(QWidget):
         self.chat_input.setMaximumHeight(100)
         self.chat_input.setPlaceholderText("Type your question here...")
         
+        # Live size/cost estimate for what is typed
+        self.token_estimate_label = QLabel("~0 tokens")
+        self.token_estimate_label.setFont(QFont("Arial", 8))
+        self.token_estimate_label.setStyleSheet("color: #D8DEE9;")
+        self.token_estimate_label.setAlignment(Qt.AlignRight)
+        self.token_estimate_label.setToolTip("Estimated request size, including context and conversation history, "
+                                             "and the worst-case cost of the answer")
+        self.token_label_color = "#D8DEE9"
+        
         self.send_button = QPushButton("Send")
         self.send_button.setFont(QFont("Arial", 11))
         self.send_button.setCursor(Qt.PointingHandCursor)
@@ -183,10 +249,95 @@ class AIChatWidget(QWidget):
         """)
         self.send_button.clicked.connect(self.send_message)
         
-        input_layout.addWidget(self.chat_input)
+        self.stop_button = QPushButton("Stop generating")
+        self.stop_button.setFont(QFont("Arial", 11))
+        self.stop_button.setCursor(Qt.PointingHandCursor)
+        self.stop_button.setStyleSheet("""
+            QPushButton {
+                background-color: #BF616A;
+                color: #ECEFF4;
+                border-radius: 5px;
+                padding: 10px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #D08770;
+            }
+            QPushButton:pressed {
+                background-color: #4C566A;
+            }
+        """)
+        self.stop_button.clicked.connect(self.stop_generation)
+        self.stop_button.setVisible(False)  # Only shown while a response is being generated
+        
+        input_column = QVBoxLayout()
+        input_column.setSpacing(2)
+        input_column.addWidget(self.chat_input)
+        input_column.addWidget(self.token_estimate_label)
+        
+        input_layout.addLayout(input_column)
         input_layout.addWidget(self.send_button)
+        input_layout.addWidget(self.stop_button)
         chat_layout.addLayout(input_layout)
         
+        # Progress of chunked analyses of large outputs
+        self.analysis_progress = QProgressBar()
+        self.analysis_progress.setFormat("Analyzing: %v of %m requests")
+        self.analysis_progress.setMaximumHeight(16)
+        self.analysis_progress.setStyleSheet("""
+            QProgressBar {
+                background-color: #2E3440;
+                color: #E5E9F0;
+                border-radius: 3px;
+                text-align: center;
+            }
+            QProgressBar::chunk {
+                background-color: #88C0D0;
+                border-radius: 3px;
+            }
+        """)
+        self.analysis_progress.setVisible(False)
+        chat_layout.addWidget(self.analysis_progress)
+        
+        # Response cache controls
+        cache_layout = QHBoxLayout()
+        
+        self.bypass_cache_checkbox = QCheckBox("Bypass cache")
+        self.bypass_cache_checkbox.setToolTip("Always ask the API, even if this question was answered before")
+        self.bypass_cache_checkbox.setStyleSheet("color: #D8DEE9;")
+        
+        self.cache_stats_label = QLabel("Cache: 0 hits / 0 misses")
+        self.cache_stats_label.setStyleSheet("color: #D8DEE9;")
+        
+        self.clear_history_button = QPushButton("New conversation")
+        self.clear_history_button.setCursor(Qt.PointingHandCursor)
+        self.clear_history_button.setToolTip("Forget earlier questions and answers")
+        self.clear_history_button.setStyleSheet("""
+            QPushButton {
+                background-color: #4C566A;
+                color: #E5E9F0;
+                border-radius: 3px;
+                padding: 4px 8px;
+            }
+            QPushButton:hover {
+                background-color: #5E81AC;
+            }
+        """)
+        self.clear_history_button.clicked.connect(self.clear_conversation)
+        
+        self.analyze_log_button = QPushButton("Analyze log file...")
+        self.analyze_log_button.setCursor(Qt.PointingHandCursor)
+        self.analyze_log_button.setToolTip("Have the AI analyze a log file, in chunks if it is large")
+        self.analyze_log_button.setStyleSheet(self.clear_history_button.styleSheet())
+        self.analyze_log_button.clicked.connect(self.analyze_log_file)
+        
+        cache_layout.addWidget(self.bypass_cache_checkbox)
+        cache_layout.addWidget(self.clear_history_button)
+        cache_layout.addWidget(self.analyze_log_button)
+        cache_layout.addStretch()
+        cache_layout.addWidget(self.cache_stats_label)
+        chat_layout.addLayout(cache_layout)
+        
         # Command execution area
         self.command_frame = QFrame()
         self.command_frame.setStyleSheet("background-color: #3B4252; border-radius: 5px; margin-top: 10px;")
@@ -256,26 +407,34 @@ class AIChatWidget(QWidget):
         """)
         self.dismiss_command_button.clicked.connect(self.dismiss_command)
         
+        self.cancel_command_button = QPushButton("Cancel Command")
+        self.cancel_command_button.setFont(QFont("Arial", 11))
+        self.cancel_command_button.setCursor(Qt.PointingHandCursor)
+        self.cancel_command_button.setStyleSheet("""
+            QPushButton {
+                background-color: #BF616A;
+                color: #ECEFF4;
+                border-radius: 5px;
+                padding: 8px;
+                min-width: 120px;
+            }
+            QPushButton:hover {
+                background-color: #D08770;
+            }
+        """)
+        self.cancel_command_button.clicked.connect(self.cancel_command)
+        self.cancel_command_button.setVisible(False)  # Only while the command runs
+        
         command_buttons_layout.addWidget(self.execute_command_button)
         command_buttons_layout.addWidget(self.dismiss_command_button)
+        command_buttons_layout.addWidget(self.cancel_command_button)
         command_layout.addLayout(command_buttons_layout)
         
         # Command output
-        self.command_output = QTextEdit()
-        self.command_output.setReadOnly(True)
+        self.command_output = OutputView(self.buffer_options)
         self.command_output.setFont(QFont("Consolas", 9))
-        self.command_output.setStyleSheet("""
-            QTextEdit {
-                background-color: #2E3440;
-                color: #D8DEE9;
-                border-radius: 3px;
-                padding: 8px;
-                selection-background-color: #5E81AC;
-                max-height: 200px;
-            }
-        """)
         self.command_output.setVisible(False)  # Initially hidden
-        self.command_output.setMaximumHeight(200)
+        self.command_output.setMaximumHeight(240)
         command_layout.addWidget(self.command_output)
         
         chat_layout.addWidget(self.command_frame)
@@ -332,16 +491,18 @@ class AIChatWidget(QWidget):
 
     # Add this function to AIChatWidget class in AIChatWidget.py
     def update_system_context_with_system_info(self, system_info):
-       """Updates the system context with system information"""
+       """Updates the system context with system information
+
+       Called again as each part of the profile is collected, so any part may still be missing.
+       """
        # Create a simplified version of the system info for the context
        self.system_info = system_info
-       simplified_info = {
-          "os": system_info["System"]["OS"],
-          "architecture": system_info["System"]["Architecture"],
-          "cpu_cores": system_info["Hardware"]["CPU Cores"],
-          "ram": system_info["Hardware"]["RAM"],
-          "python_version": system_info["Python Environment"]["Python Version"]
-        }
+       simplified_info = {}
+       for key, category, item in (("os", "System", "OS"), ("architecture", "System", "Architecture"),
+                                   ("cpu_cores", "Hardware", "CPU Cores"), ("ram", "Hardware", "RAM"),
+                                   ("python_version", "Python Environment", "Python Version")):
+          if item in system_info.get(category, {}):
+             simplified_info[key] = system_info[category][item]
     
         # Add storage info if available
        if "Storage" in system_info:
@@ -376,11 +537,19 @@ class AIChatWidget(QWidget):
              unless explicitly asked by the user.
           4. Keep your responses focused and brief - no more than 3-4 paragraphs.
           5. Don't overexplain or provide additional information unless requested.
-          6. Always consider the user's specific operating system ({simplified_info["os"]}) when 
+          6. Always consider the user's specific operating system ({simplified_info.get("os", "see above")}) when 
              suggesting commands or solutions.
           
           Be direct and to the point while remaining helpful."""
 
+       # The context is rebuilt from scratch, so carry the command context over
+       context = self.current_command_context
+       self.system_context += f"""
+
+          Commands should be executed in the following context:
+          - Context: {context['name']}
+          - Directory: {context['path']}
+          """
        
 
 
@@ -405,50 +574,275 @@ class AIChatWidget(QWidget):
             return
             
         self.chat_display.append("<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> <i>Thinking...</i>")
-        # Stop any existing thread before creating a new one
-        if self.response_thread is not None and self.response_thread.isRunning():
-            self.response_thread.stop()
-            self.response_thread.wait()
+        self.start_response_task(user_message)
+        
+    def start_response_task(self, prompt):
+        """Start a streaming AI request, replacing any request still in flight"""
+        # Cancel any existing request; this does not block the UI thread
+        if self.response_task is not None and self.response_task.isRunning():
+            self.response_task.stop()
+        
+        self.reset_stream_state()
+        
+        # Enforce the size limits before any network I/O
+        prompt, trimmed = self.request_budget.enforce(prompt, self.system_context)
+        if trimmed:
+            self.chat_display.append("<span style='color:#EBCB8B;'><b>System:</b></span> "
+                                     "The message was too long and was trimmed to its beginning and end "
+                                     f"(~{self.request_budget.prompt_limit(self.system_context):,} tokens).")
+        
+        # Requests run on the shared event loop instead of a thread each
+        use_cache = not self.bypass_cache_checkbox.isChecked()
+        history = self.conversation.build_contents(prompt, self.request_budget.history_budget(self.system_context))
+        self.pending_prompt = prompt
+        self.response_task = ResponseTask(self.async_client, prompt, self.system_context,
+                                          stream=True, use_cache=use_cache, history=history)
+        self.response_task.partial_received.connect(self.handle_partial_response)
+        self.response_task.response_received.connect(self.handle_response)
+        self.response_task.start()
+        self.stop_button.setVisible(True)
+    
+    def start_analysis_task(self, text, subject, chunks):
+        """Analyze output too large for one request in its chunks, replacing any request still in flight"""
+        if self.response_task is not None and self.response_task.isRunning():
+            self.response_task.stop()
+        
+        self.reset_stream_state()
+        
+        use_cache = not self.bypass_cache_checkbox.isChecked()
+        self.pending_prompt = f"Please analyze {subject}."
+        self.response_task = MapReduceTask(self.analyzer, text, subject, self.system_context, use_cache=use_cache)
+        self.response_task.progress.connect(self.handle_analysis_progress)
+        self.response_task.partial_received.connect(self.handle_partial_response)
+        self.response_task.response_received.connect(self.handle_response)
+        self.response_task.start()
+        self.stop_button.setVisible(True)
+        
+        self.analysis_progress.setRange(0, chunks + 1)
+        self.analysis_progress.setValue(0)
+        self.analysis_progress.setVisible(True)
+    
+    def handle_analysis_progress(self, done, total):
+        """Update the progress bar of a chunked analysis"""
+        if self.sender() is not self.response_task:
+            return
+        self.analysis_progress.setRange(0, total)
+        self.analysis_progress.setValue(done)
+    
+    def analyze_output(self, text, subject):
+        """Send output to the AI for analysis, compacted, and in chunks when it is still too large"""
+        self.start_compaction_task(subject, text=text)
+    
+    def start_compaction_task(self, subject, text=None, path=None):
+        """Read and compact output on the shared loop's executor, replacing any request still in flight"""
+        if self.response_task is not None and self.response_task.isRunning():
+            self.response_task.stop()
+        
+        self.reset_stream_state()
+        
+        self.pending_subject = subject
+        self.response_task = CompactionTask(self.output_compactor, self.analyzer, text=text, path=path)
+        self.response_task.prepared.connect(self.handle_output_prepared)
+        self.response_task.failed.connect(self.handle_preparation_failed)
+        self.chat_display.append("<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> <i>Preparing the output for analysis...</i>")
+        self.response_task.start()
+        self.stop_button.setVisible(True)
+    
+    def handle_output_prepared(self, compacted, stats, chunks):
+        """Send compacted output for analysis, in one request or in chunks"""
+        if self.sender() is not self.response_task:
+            return  # Preparation that has been replaced or stopped
+        self.remove_pending_message()
+        subject = self.pending_subject
+        if stats["original_chars"] > len(compacted):
+            self.chat_display.append(f"<span style='color:#A3BE8C;'><b>System:</b></span> Output compacted for analysis: "
+                                     f"{stats['original_chars']:,} → {len(compacted):,} characters ({stats['ratio']:.1f}x smaller).")
+        
+        if chunks:
+            self.chat_display.append(f"<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> "
+                                     f"<i>Analyzing the output in {chunks} parts...</i>")
+            self.start_analysis_task(compacted, subject, chunks)
+            return
         
-        # Create response thread
-        self.response_thread = ResponseThread(self.gemini_client, user_message, self.system_context)
-        self.response_thread.response_received.connect(self.handle_response)
-        self.response_thread.start()
+        result_message = f"""Here's {subject}:\n\n{compacted}\n\n
+           Please provide a brief analysis of this output only. Do not suggest additional commands unless I specifically ask for them."""
+        self.chat_display.append("<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> <i>Analyzing results...</i>")
+        self.start_response_task(result_message)
+    
+    def handle_preparation_failed(self, message):
+        """Report output that could not be read for analysis"""
+        if self.sender() is not self.response_task:
+            return
+        self.remove_pending_message()
+        self.stop_button.setVisible(False)
+        self.chat_display.append(f"<span style='color:#BF616A;'><b>System:</b></span> {message}")
+    
+    def analyze_log_file(self):
+        """Pick a log file and have the AI analyze it"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Select Log File", self.current_command_context.get("path", os.path.expanduser("~")),
+            "Log files (*.log *.txt *.out);;All files (*)"
+        )
+        if not path:
+            return
+        if not self.gemini_client.api_key:
+            self.chat_display.append("<span style='color:#BF616A;'><b>System:</b></span> Please enter a Gemini API key to use the AI chat feature.")
+            return
         
-    def handle_response(self, response):
-        """Handle the AI response"""
-        # Remove the "thinking" message
+        # The file is read on the shared loop's executor; logs can be large
+        self.chat_display.append(f"<span style='color:#EBCB8B;'><b>You:</b></span> Please analyze the log file {os.path.basename(path)}.")
+        self.start_compaction_task(f"the log file '{path}'", path=path)
+    
+    def stop_generation(self):
+        """Abort the request in flight and keep whatever has been shown so far"""
+        if self.response_task is None or not self.response_task.isRunning():
+            return
+        self.response_task.stop()
+        self.stop_button.setVisible(False)
+        self.analysis_progress.setVisible(False)
+        
+        if self.stream_started:
+            self.stream_timer.stop()
+            self.flush_stream_buffer()
+            cursor = self.chat_display.textCursor()
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(" [Stopped]", QTextCharFormat())
+        else:
+            self.remove_pending_message()
+            self.chat_display.append("<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> <i>Generation stopped.</i>")
+        self.reset_stream_state()
+    
+    def reset_stream_state(self):
+        """Forget any partially streamed response"""
+        self.stream_timer.stop()
+        self.stream_buffer = []
+        self.streamed_length = 0
+        self.stream_started = False
+    
+    def remove_pending_message(self):
+        """Remove the last block of the chat (the "Thinking..." placeholder)"""
         cursor = self.chat_display.textCursor()
         cursor.movePosition(QTextCursor.End)
         cursor.movePosition(QTextCursor.StartOfBlock, QTextCursor.KeepAnchor)
         cursor.removeSelectedText()
         cursor.deletePreviousChar()  # Delete the newline
+    
+    def handle_partial_response(self, chunk):
+        """Buffer a streamed piece of the response; the UI is updated once per frame"""
+        if self.sender() is not self.response_task:
+            return  # Late chunk from a request that has been replaced
+        self.stream_buffer.append(chunk)
+        if not self.stream_timer.isActive():
+            self.stream_timer.start()
+    
+    def flush_stream_buffer(self):
+        """Append all buffered partial text to the chat display"""
+        if not self.stream_buffer:
+            return
+        text = "".join(self.stream_buffer)
+        self.stream_buffer = []
+        
+        if not self.stream_started:
+            # Replace the "thinking" message with the response header
+            self.remove_pending_message()
+            self.chat_display.append("<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> ")
+            self.stream_started = True
+        
+        # Stop rendering once the display limit is reached
+        remaining = self.max_response_length - self.streamed_length
+        if remaining <= 0:
+            return
         
-        # Truncate response if it's too long to prevent UI glitches
-        max_response_length = 2000  # Adjust this value based on your UI needs
-        truncated_response = response
-        if len(response) > max_response_length:
-            # Find the last period before the max length to make a clean cutoff
-            last_period = response[:max_response_length].rfind('.')
-            if last_period > max_response_length // 2:  # Make sure we have a substantial amount of text
-                truncated_response = response[:last_period + 1] + " [Response truncated for display...]"
-            else:
-                truncated_response = response[:max_response_length] + "... [Response truncated for display...]"
+        cursor = self.chat_display.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text[:remaining], QTextCharFormat())
+        self.streamed_length += len(text[:remaining])
+        if len(text) > remaining:
+            cursor.insertText(" [Response truncated for display...]", QTextCharFormat())
         
-        # Add the actual response
-        self.chat_display.append(f"<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> {truncated_response}")
+        self.chat_display.verticalScrollBar().setValue(
+            self.chat_display.verticalScrollBar().maximum()
+        )
         
+    def handle_response(self, response):
+        """Handle the AI response"""
+        sender = self.sender()
+        if sender is not None and sender is not self.response_task:
+            return  # Late response from a request that has been replaced
+        
+        if self.stream_started:
+            # The text has already been rendered incrementally; flush whatever is left
+            self.stream_timer.stop()
+            self.flush_stream_buffer()
+        else:
+            # Remove the "thinking" message
+            self.remove_pending_message()
+            
+            # Truncate response if it's too long to prevent UI glitches
+            max_response_length = self.max_response_length
+            truncated_response = response
+            if len(response) > max_response_length:
+                # Find the last period before the max length to make a clean cutoff
+                last_period = response[:max_response_length].rfind('.')
+                if last_period > max_response_length // 2:  # Make sure we have a substantial amount of text
+                    truncated_response = response[:last_period + 1] + " [Response truncated for display...]"
+                else:
+                    truncated_response = response[:max_response_length] + "... [Response truncated for display...]"
+            
+            # Add the actual response
+            self.chat_display.append(f"<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> {truncated_response}")
+        self.reset_stream_state()
+        self.stop_button.setVisible(False)
+        self.analysis_progress.setVisible(False)
+        
+        # Remember the exchange so follow-up questions keep their context
+        if not self.gemini_client.is_error_response(response):
+            self.conversation.add_exchange(self.pending_prompt, response)
+        
+        # Command intent detection runs on the final assembled text
         # Check if the response contains command suggestions
         suggested_commands = self.gemini_client.detect_command_intent(response)
         if suggested_commands:
             # Use the first suggested command
             self.show_command_suggestion(suggested_commands[0])
         
+        self.update_cache_stats()
+        
         # Scroll to the bottom after adding content
         self.chat_display.verticalScrollBar().setValue(
             self.chat_display.verticalScrollBar().maximum()
         )
     
+    def update_token_estimate(self):
+        """Show the estimated size and cost of the request being typed"""
+        prompt = self.chat_input.toPlainText().strip()
+        if not prompt:
+            self.token_estimate_label.setText("~0 tokens")
+            self.token_estimate_label.setStyleSheet(f"color: {self.token_label_color};")
+            return
+        
+        limit = self.request_budget.prompt_limit(self.system_context)
+        history_tokens = self.conversation.history_tokens(prompt, self.request_budget.history_budget(self.system_context))
+        estimate = self.request_budget.estimate(prompt, self.system_context, history_tokens)
+        text = f"~{estimate['tokens']:,} tokens · ≤ ${estimate['cost']:.4f}"
+        
+        if estimate_tokens(prompt) > limit:
+            self.token_estimate_label.setText(text + f" · over the {limit:,}-token limit, will be trimmed")
+            self.token_estimate_label.setStyleSheet("color: #BF616A;")
+        else:
+            self.token_estimate_label.setText(text)
+            self.token_estimate_label.setStyleSheet(f"color: {self.token_label_color};")
+    
+    def clear_conversation(self):
+        """Start a fresh conversation without earlier turns"""
+        self.conversation.clear()
+        self.chat_display.append("<span style='color:#A3BE8C;'><b>System:</b></span> Started a new conversation.")
+    
+    def update_cache_stats(self):
+        """Show the response cache hit/miss counters"""
+        stats = self.gemini_client.cache.stats()
+        self.cache_stats_label.setText(f"Cache: {stats['hits']} hits / {stats['misses']} misses")
+    
     def show_command_suggestion(self, command):
         """Show the command suggestion UI"""
         self.command_display.setText(command)
@@ -478,7 +872,7 @@ class AIChatWidget(QWidget):
        if not os.path.exists(working_dir):
            self.command_output.setVisible(True)
            self.command_output.clear()
-           self.command_output.append(f"Error: The directory '{working_dir}' does not exist.")
+           self.command_output.append_line(f"Error: The directory '{working_dir}' does not exist.")
            return
     
        # Ask for confirmation
@@ -494,58 +888,86 @@ class AIChatWidget(QWidget):
            # Show the output area
            self.command_output.setVisible(True)
            self.command_output.clear()
-           self.command_output.append(f"Executing: {command}")
-           self.command_output.append(f"Working directory: {working_dir}")
-           self.command_output.append(f"Context: {context_name}\n")
-           self.command_output.append("Please wait...\n\n")
-        
-           # Create worker thread for command execution
+           self.command_output.append_line(f"Executing: {command}")
+           self.command_output.append_line(f"Working directory: {working_dir}")
+           session = self.command_session()
+           if session is not None:
+               self.command_output.append_line("Shell session: directory and variables carry over between commands")
+           self.command_output.append_line(f"Context: {context_name}\n")
+        
+           # Run the command on the shared job pool
            # Make sure we're passing the current context path explicitly
-           worker = CommandWorker(command, working_dir=working_dir)
-           self.command_workers.append(worker)  # Keep a reference
+           # The worker writes its output straight into the view
+           worker = CommandWorker(command, working_dir=working_dir, timeout=self.command_timeout or None,
+                                  buffer_options=self.buffer_options, display_buffer=self.command_output.buffer,
+                                  session=session)
+           worker.completed.connect(self.handle_command_completed)
            worker.finished.connect(self.handle_command_result)
-           worker.start()
+           # The user is waiting on this one, so it goes ahead of background work
+           self.command_job = shared_scheduler().submit(worker, command, PRIORITY_HIGH)
+           self.execute_command_button.setEnabled(False)
+           self.dismiss_command_button.setEnabled(False)
+           self.cancel_command_button.setVisible(True)
     
-    def handle_command_result(self, stdout, stderr):
-         """Handle the result of command execution"""
-         if stdout:
-           self.command_output.append("Output:\n")
-           self.command_output.append(stdout)
+    def cancel_command(self):
+        """Stop the running command and everything it started"""
+        if self.command_job is not None:
+            shared_scheduler().cancel(self.command_job)
+            self.command_output.append_line("Cancelling...", "#D08770")
     
-         if stderr:
-           self.command_output.append("\nErrors:\n")
-           self.command_output.append(stderr)
-        
-         self.command_output.append("\nCommand execution completed.")
+    def handle_command_completed(self, exit_code, elapsed, status):
+        """Report how the command ended"""
+        self.last_exit_code = exit_code
+        self.last_command_status = (status, elapsed)
+        self.last_command_usage = getattr(self.sender(), "usage", None)
+        self.command_job = None
+        self.execute_command_button.setEnabled(True)
+        self.dismiss_command_button.setEnabled(True)
+        self.cancel_command_button.setVisible(False)
+        
+        if status == STATUS_TIMED_OUT:
+            self.command_output.append_line(f"\nCommand timed out after {elapsed:.1f} s and was stopped.", "#BF616A")
+        elif status == STATUS_CANCELLED:
+            self.command_output.append_line(f"\nCommand cancelled after {elapsed:.1f} s.", "#D08770")
+        else:
+            color = "#A3BE8C" if exit_code == 0 else "#BF616A"
+            self.command_output.append_line(f"\nCommand execution completed (exit code {exit_code}, {elapsed:.2f} s).",
+                                            color)
+        if self.last_command_usage is not None:
+            self.command_output.append_line(self.last_command_usage.summary(), "#81A1C1")
     
+    def handle_command_result(self, stdout, stderr):
+         """Send the complete output of an executed command to the AI for analysis"""
+         status, elapsed = self.last_command_status or (None, 0.0)
+         if status == STATUS_CANCELLED:
+            # The user stopped it on purpose; keep the partial output on screen for them
+            self.chat_display.append("<span style='color:#D08770;'><b>System:</b></span> Command cancelled.")
+            return
+        
          # Send the result to the AI
          output_text = ""
+         if status == STATUS_TIMED_OUT:
+            output_text += f"The command did not finish within {elapsed:.0f} seconds and was stopped.\n"
+         elif self.last_exit_code is not None:
+            output_text += f"Exit code: {self.last_exit_code}\n"
+         if self.last_command_usage is not None:
+            output_text += f"Resources used: {self.last_command_usage.summary()}\n"
+         metrics = shared_metrics()
+         # Only when the sampling thread has opened the store; opening it here would block the interface
+         machine_load = (metrics.describe(time.time() - elapsed, time.time())
+                         if metrics is not None and metrics.is_open() else None)
+         if machine_load:
+            # Recorded while live monitoring is on; tells a slow command from a busy machine
+            output_text += f"Machine load while it ran: {machine_load}\n"
          if stdout:
             output_text += f"Command output:\n{stdout}\n"
          if stderr:
             output_text += f"Command errors:\n{stderr}\n"
         
-         if output_text:
-            # Truncate output if it's too long
-           max_output_length = 1500  # Adjust as needed
-           if len(output_text) > max_output_length:
-            output_text = output_text[:max_output_length] + "... [Output truncated for analysis]"
-        
-            # Automatically send the result to the AI for analysis, but be more specific
-           result_message = f"""Here's the result of executing the command '{self.command_display.text()}':\n\n{output_text}\n\n
-           Please provide a brief analysis of this output only. Do not suggest additional commands unless I specifically ask for them."""
-        
+         if stdout or stderr:
            self.chat_display.append(f"<span style='color:#EBCB8B;'><b>You:</b></span> Command executed. Please analyze the results.")
-        
-           # Create response thread for analysis
-           if self.response_thread is not None and self.response_thread.isRunning():
-              self.response_thread.stop()
-              self.response_thread.wait()
-            
-           self.chat_display.append("<span style='color:#88C0D0;'><b>DevAssist AI:</b></span> <i>Analyzing results...</i>")
-           self.response_thread = ResponseThread(self.gemini_client, result_message, self.system_context)
-           self.response_thread.response_received.connect(self.handle_response)
-           self.response_thread.start()
+           # Compacted first, then analyzed in one request or in chunks depending on what is left
+           self.analyze_output(output_text, f"the result of executing the command '{self.command_display.text()}'")
         
          # Automatically hide the command frame after execution
          self.command_frame.setVisible(False)
@@ -564,6 +986,7 @@ class AIChatWidget(QWidget):
         if api_key and api_key != "*" * 10:  # Only save if it's not the masked placeholder
             # Save to the client
             self.gemini_client.api_key = api_key
+            self.gemini_client.prewarm()
             
             # Save to config file
             config_file = self.get_config_file_path()
@@ -606,11 +1029,19 @@ class AIChatWidget(QWidget):
     def execute_command(self, command):
        """Execute a command with the current command context"""
        # Create a command worker with the current context path
-       self.command_worker = CommandWorker(command, self.current_command_context['path'])
+       worker = CommandWorker(command, self.current_command_context['path'], timeout=self.command_timeout or None,
+                              buffer_options=self.buffer_options, session=self.command_session())
        # Connect signals
-       self.command_worker.finished.connect(self.on_command_finished)
-       # Start the worker
-       self.command_worker.start()
+       worker.finished.connect(self.on_command_finished)
+       # Queue it on the shared job pool
+       shared_scheduler().submit(worker, command)
+
+    def command_session(self):
+       """The context's persistent shell session, or None when commands run one-shot"""
+       context = self.current_command_context
+       if not context.get('persistent') or not sessions_supported():
+           return None
+       return shared_sessions().get(context['name'], context['path'])
 
     def on_command_finished(self, stdout, stderr):
         """Handle command execution completion"""
@@ -778,6 +1209,52 @@ class AIChatWidget(QWidget):
             }}
         """)
         
+        self.stop_button.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {colors['error']};
+                color: {colors['main_bg']};
+                border-radius: 5px;
+                padding: 10px;
+                min-width: 80px;
+            }}
+            QPushButton:hover {{
+                background-color: {colors['warning']};
+            }}
+            QPushButton:pressed {{
+                background-color: {colors['secondary_bg']};
+            }}
+        """)
+        
+        # Apply styles to cache controls
+        self.bypass_cache_checkbox.setStyleSheet(f"color: {colors['secondary_text']};")
+        self.cache_stats_label.setStyleSheet(f"color: {colors['secondary_text']};")
+        self.token_label_color = colors['secondary_text']
+        self.analysis_progress.setStyleSheet(f"""
+            QProgressBar {{
+                background-color: {colors['main_bg']};
+                color: {colors['text']};
+                border-radius: 3px;
+                text-align: center;
+            }}
+            QProgressBar::chunk {{
+                background-color: {colors['accent']};
+                border-radius: 3px;
+            }}
+        """)
+        self.update_token_estimate()
+        self.clear_history_button.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {colors['highlight_bg']};
+                color: {colors['text']};
+                border-radius: 3px;
+                padding: 4px 8px;
+            }}
+            QPushButton:hover {{
+                background-color: {colors['accent']};
+            }}
+        """)
+        self.analyze_log_button.setStyleSheet(self.clear_history_button.styleSheet())
+        
         # Apply styles to command frame
         self.command_frame.setStyleSheet(f"background-color: {colors['secondary_bg']}; border-radius: 5px; margin-top: 10px;")
         
@@ -829,15 +1306,7 @@ class AIChatWidget(QWidget):
         """)
         
         # Apply styles to command output
-        self.command_output.setStyleSheet(f"""
-            QTextEdit {{
-                background-color: {colors['main_bg']};
-                color: {colors['text']};
-                border-radius: 3px;
-                padding: 8px;
-                selection-background-color: {colors['highlight_bg']};
-            }}
-        """)
+        self.command_output.set_colors(colors['main_bg'], colors['text'], colors['highlight_bg'], colors['accent'])
         
         # Apply styles to API key input
         self.api_key_input.setStyleSheet(f"""
@@ -917,6 +1386,16 @@ class AIChatWidget(QWidget):
         
         # Update send button font
         self.send_button.setFont(QFont("Arial", sizes["normal"]))
+        self.stop_button.setFont(QFont("Arial", sizes["normal"]))
+        
+        # Update cache controls font
+        self.bypass_cache_checkbox.setFont(QFont("Arial", sizes["small"]))
+        self.cache_stats_label.setFont(QFont("Arial", sizes["small"]))
+        self.clear_history_button.setFont(QFont("Arial", sizes["small"]))
+        self.cancel_command_button.setFont(QFont("Arial", sizes["normal"]))
+        self.token_estimate_label.setFont(QFont("Arial", sizes["small"]))
+        self.analyze_log_button.setFont(QFont("Arial", sizes["small"]))
+        self.analysis_progress.setFont(QFont("Arial", sizes["small"]))
         
         # Update API key input font
         self.api_key_input.setFont(QFont("Arial", sizes["normal"]))
@@ -926,8 +1405,11 @@ class AIChatWidget(QWidget):
     
     def closeEvent(self, event):
         """Called when the widget is closed"""
-        # Make sure thread is properly stopped
-        if self.response_thread is not None and self.response_thread.isRunning():
-            self.response_thread.stop()
-            self.response_thread.wait()
-        super().closeEvent(event)
\ No newline at end of file
+        self.shutdown()
+        super().closeEvent(event)
+    
+    def shutdown(self):
+        """Cancel in-flight requests and release network resources without waiting on the network"""
+        if self.response_task is not None and self.response_task.isRunning():
+            self.response_task.stop()
+        self.gemini_client.close()
\ No newline at end of file
@@ -1,9 +1,12 @@
 import os
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QFrame, QHBoxLayout, 
-                            QComboBox, QPushButton, QFileDialog, QLineEdit)
+                            QComboBox, QPushButton, QFileDialog, QLineEdit, QCheckBox)
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, pyqtSignal
 
+from utils.config import load_config
+from utils.shell_session import shared_sessions, sessions_supported
+
 class CommandContextWidget(QWidget):
     """Widget to select where commands should be executed"""
     
@@ -23,6 +26,10 @@ class CommandContextWidget(QWidget):
             "Custom Location": {"path": "", "description": "Execute commands in a custom directory"}
         }
         self.active_context = "Current Directory"
+        # Contexts whose commands run in a persistent shell session
+        self.persistent_contexts = set()
+        if sessions_supported() and load_config().get("persistent_sessions", False):
+            self.persistent_contexts.update(self.execution_contexts)
         self.setup_ui()
         
     def setup_ui(self):
@@ -130,6 +137,30 @@ class CommandContextWidget(QWidget):
         context_layout.addWidget(self.path_display_label)
         context_layout.addWidget(self.path_display)
         
+        # Persistent session: one long-lived shell per context, so cd and exports carry over
+        session_layout = QHBoxLayout()
+        self.session_checkbox = QCheckBox("Keep a persistent shell session")
+        self.session_checkbox.setToolTip("Run this context's commands in one long-lived shell: faster, and "
+                                         "directory changes, exported variables and virtualenvs are kept")
+        self.session_checkbox.setStyleSheet("color: #E5E9F0;")
+        self.session_checkbox.setChecked(self.active_context in self.persistent_contexts)
+        self.session_checkbox.toggled.connect(self.on_session_toggled)
+        
+        self.reset_session_button = QPushButton("Reset Session")
+        self.reset_session_button.setToolTip("Start a fresh shell for this context, dropping its state")
+        self.reset_session_button.setStyleSheet(self.browse_button.styleSheet())
+        self.reset_session_button.setEnabled(self.session_checkbox.isChecked())
+        self.reset_session_button.clicked.connect(self.reset_session)
+        
+        session_layout.addWidget(self.session_checkbox)
+        session_layout.addStretch()
+        session_layout.addWidget(self.reset_session_button)
+        self.session_container = QWidget()
+        self.session_container.setLayout(session_layout)
+        session_layout.setContentsMargins(0, 0, 0, 0)
+        self.session_container.setVisible(sessions_supported())
+        context_layout.addWidget(self.session_container)
+        
         layout.addWidget(self.context_frame)
         
     def on_context_changed(self, context_name):
@@ -146,10 +177,16 @@ class CommandContextWidget(QWidget):
         if context_name != "Custom Location":
             self.path_display.setText(self.execution_contexts[context_name]["path"])
             
+        self.session_checkbox.blockSignals(True)
+        self.session_checkbox.setChecked(context_name in self.persistent_contexts)
+        self.session_checkbox.blockSignals(False)
+        self.reset_session_button.setEnabled(self.session_checkbox.isChecked())
+            
         # Emit the context changed signal with the new context info
         context_info = {
             "name": context_name,
-            "path": self.execution_contexts[context_name]["path"]
+            "path": self.execution_contexts[context_name]["path"],
+            "persistent": context_name in self.persistent_contexts
         }
         
         # Debug output
@@ -166,7 +203,8 @@ class CommandContextWidget(QWidget):
             # Emit context changed signal
             context_info = {
                 "name": "Custom Location",
-                "path": path
+                "path": path,
+                "persistent": "Custom Location" in self.persistent_contexts
             }
             self.context_changed.emit(context_info)
     
@@ -185,7 +223,8 @@ class CommandContextWidget(QWidget):
             # Emit context changed signal
             context_info = {
                 "name": "Custom Location",
-                "path": directory
+                "path": directory,
+                "persistent": "Custom Location" in self.persistent_contexts
             }
             self.context_changed.emit(context_info)
     
@@ -200,9 +239,24 @@ class CommandContextWidget(QWidget):
             
         return {
             "name": context_name,
-            "path": context_path
+            "path": context_path,
+            "persistent": context_name in self.persistent_contexts
         }
     
+    def on_session_toggled(self, checked):
+        """Switch the active context between one-shot commands and a persistent session"""
+        if checked:
+            self.persistent_contexts.add(self.active_context)
+        else:
+            self.persistent_contexts.discard(self.active_context)
+            shared_sessions().reset(self.active_context)
+        self.reset_session_button.setEnabled(checked)
+        self.context_changed.emit(self.get_active_context())
+    
+    def reset_session(self):
+        """Drop the active context's shell; the next command starts a fresh one"""
+        shared_sessions().reset(self.active_context)
+    
     def update_theme(self, theme_name):
         """Update the widget's theme to match the application theme"""
         self.current_theme = theme_name
@@ -311,6 +365,8 @@ class CommandContextWidget(QWidget):
                 background-color: {colors['accent']};
             }}
         """)
+        self.reset_session_button.setStyleSheet(self.browse_button.styleSheet())
+        self.session_checkbox.setStyleSheet(f"color: {colors['text']};")
         
     def update_font_size(self, font_size_name):
         """Update the widget's font sizes"""
@@ -352,4 +408,6 @@ class CommandContextWidget(QWidget):
         self.browse_button.setFont(QFont("Arial", sizes["normal"]))
         self.context_description.setFont(QFont("Arial", sizes["small"]))
         self.path_display_label.setFont(QFont("Arial", sizes["normal"]))
+        self.session_checkbox.setFont(QFont("Arial", sizes["normal"]))
+        self.reset_session_button.setFont(QFont("Arial", sizes["normal"]))
         self.path_display.setFont(QFont("Arial", sizes["normal"], QFont.Bold))
\ No newline at end of file
@@ -2,18 +2,38 @@ import platform
 import subprocess
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QSplitter, QTreeWidget, QTreeWidgetItem, 
                            QLabel, QFrame, QHBoxLayout, QGroupBox, QLineEdit, QPushButton, 
-                           QTextEdit, QMessageBox)
-from PyQt5.QtGui import QFont
+                           QMessageBox, QSpinBox, QHeaderView, QStyle)
+from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
 
 from utils.command_worker import CommandWorker
+from utils.command_worker import STATUS_CANCELLED, STATUS_TIMED_OUT
+from utils.job_scheduler import shared_scheduler
+from utils.output_buffer import buffer_options_from_config
+from utils.config import load_config
+from utils.toolchain_scan import ToolchainScan, INSTALLED, MISSING
+from ui.widgets.output_view import OutputView
+
+class ToolchainItem(QTreeWidgetItem):
+    """Toolchain matrix row that sorts its latency column by value rather than text"""
+    def __lt__(self, other):
+        if self.treeWidget() is not None and self.treeWidget().sortColumn() == 3:
+            return (self.data(3, Qt.UserRole) or 0.0) < (other.data(3, Qt.UserRole) or 0.0)
+        return super().__lt__(other)
 
 class DeveloperToolsWidget(QWidget):
     """Widget containing developer tools and commands"""
     def __init__(self, parent=None):
         super().__init__(parent)
+        config = load_config()
+        self.command_timeout = config.get("command_timeout", 300)  # Seconds, 0 for no limit
+        self.buffer_options = buffer_options_from_config(config)
+        self.current_job = None  # Job of the command currently running
+        self.scan_parallelism = config.get("toolchain_scan_parallelism", 16)
+        self.probe_timeout = config.get("probe_timeout", 10)  # Seconds per version probe
+        self.toolchain_scan = None
+        self.toolchain_results = []
         self.setup_ui()
-        self.command_workers = []
         self.current_theme = "Nord Dark (Default)"
         self.current_font_size = "Medium (Default)"
         
@@ -136,8 +156,42 @@ class DeveloperToolsWidget(QWidget):
         """)
         self.terminal_button.clicked.connect(self.open_in_terminal)
         
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setFont(QFont("Arial", 11))
+        self.cancel_button.setCursor(Qt.PointingHandCursor)
+        self.cancel_button.setStyleSheet("""
+            QPushButton {
+                background-color: #BF616A;
+                color: #ECEFF4;
+                border-radius: 5px;
+                padding: 10px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #D08770;
+            }
+            QPushButton:disabled {
+                background-color: #4C566A;
+            }
+        """)
+        self.cancel_button.clicked.connect(self.cancel_command)
+        self.cancel_button.setEnabled(False)  # Only while a command is running
+        
+        # Per-command timeout; 0 means the command may run forever
+        self.timeout_label = QLabel("Timeout:")
+        self.timeout_label.setStyleSheet("color: #D8DEE9;")
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(0, 24 * 3600)
+        self.timeout_spin.setSuffix(" s")
+        self.timeout_spin.setSpecialValueText("None")
+        self.timeout_spin.setValue(self.command_timeout)
+        self.timeout_spin.setToolTip("Stop the command if it runs longer than this")
+        
         buttons_layout.addWidget(self.execute_button)
+        buttons_layout.addWidget(self.cancel_button)
         buttons_layout.addWidget(self.terminal_button)
+        buttons_layout.addWidget(self.timeout_label)
+        buttons_layout.addWidget(self.timeout_spin)
         execution_layout.addLayout(buttons_layout)
         
         # Result output
@@ -145,25 +199,71 @@ class DeveloperToolsWidget(QWidget):
         result_box.setStyleSheet("color: #88C0D0; border: none;")
         result_box_layout = QVBoxLayout(result_box)
         
-        self.result_output = QTextEdit()
-        self.result_output.setReadOnly(True)
+        # Only the visible lines are drawn, so outputs of millions of lines stay responsive
+        self.result_output = OutputView(self.buffer_options)
         self.result_output.setFont(QFont("Consolas", 10))
-        self.result_output.setStyleSheet("""
-            QTextEdit {
-                background-color: #2E3440;
-                color: #D8DEE9;
-                border-radius: 3px;
-                selection-background-color: #5E81AC;
-            }
-        """)
         self.result_output.setMinimumHeight(200)
         result_box_layout.addWidget(self.result_output)
         
         execution_layout.addWidget(result_box)
         command_layout.addWidget(execution_frame)
         
+        # Toolchain matrix, filled by a scan
+        self.toolchain_box = QGroupBox("Toolchain")
+        self.toolchain_box.setStyleSheet("color: #88C0D0; border: none;")
+        toolchain_layout = QVBoxLayout(self.toolchain_box)
+        toolchain_layout.setContentsMargins(9, 20, 9, 9)  # Clear of the title
+        self.toolchain_summary = QLabel("")
+        self.toolchain_summary.setStyleSheet("color: #D8DEE9;")
+        toolchain_layout.addWidget(self.toolchain_summary)
+        self.toolchain_tree = QTreeWidget()
+        self.toolchain_tree.setHeaderLabels(["Tool", "Version", "Path", "Latency"])
+        self.toolchain_tree.setRootIsDecorated(False)
+        self.toolchain_tree.setSortingEnabled(True)
+        self.toolchain_tree.sortByColumn(0, Qt.AscendingOrder)
+        self.toolchain_tree.header().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.toolchain_tree.setStyleSheet("""
+            QTreeWidget {
+                background-color: #2E3440;
+                border: none;
+                color: #E5E9F0;
+            }
+        """)
+        self.toolchain_tree.setMinimumHeight(150)
+        toolchain_layout.addWidget(self.toolchain_tree)
+        self.toolchain_box.setVisible(False)  # Until the first scan
+        command_layout.addWidget(self.toolchain_box)
+        
+        # The tree, with the toolchain scan under it
+        tree_panel = QWidget()
+        tree_panel_layout = QVBoxLayout(tree_panel)
+        tree_panel_layout.setContentsMargins(0, 0, 0, 0)
+        tree_panel_layout.setSpacing(0)
+        tree_panel_layout.addWidget(self.tree_widget)
+        
+        self.scan_button = QPushButton("Scan Toolchain")
+        self.scan_button.setFont(QFont("Arial", 10))
+        self.scan_button.setCursor(Qt.PointingHandCursor)
+        self.scan_button.setToolTip("Run every version check at once and mark which tools are installed")
+        self.scan_button.setStyleSheet("""
+            QPushButton {
+                background-color: #5E81AC;
+                color: white;
+                border-radius: 0px;
+                padding: 10px;
+            }
+            QPushButton:hover {
+                background-color: #81A1C1;
+            }
+            QPushButton:disabled {
+                background-color: #4C566A;
+            }
+        """)
+        self.scan_button.clicked.connect(self.scan_toolchain)
+        tree_panel_layout.addWidget(self.scan_button)
+        
         # Add widgets to splitter
-        splitter.addWidget(self.tree_widget)
+        splitter.addWidget(tree_panel)
         splitter.addWidget(command_widget)
         splitter.setSizes([200, 600])  # Set initial sizes
         
@@ -178,12 +278,14 @@ class DeveloperToolsWidget(QWidget):
         
     def populate_developer_tree(self):
         """Populate the tree with developer domains and commands"""
+        self.probe_items = {}  # Version probe -> tree item, for the scan's installed/missing icons
         # Load commands from a JSON structure
         self.dev_commands = {
             "Web Development": {
                 "Node.js": [
                     {"name": "Install Node.js", 
                      "command": self._get_os_specific_command("node -v"),
+                     "probe": "node -v",
                      "description": "Check if Node.js is installed or install it if not available."},
                     {"name": "Create React App", 
                      "command": "npx create-react-app my-app",
@@ -193,6 +295,7 @@ class DeveloperToolsWidget(QWidget):
                      "description": "Install Express.js framework for Node.js."},
                     {"name": "Check NPM Version", 
                      "command": "npm -v",
+                     "probe": "npm -v",
                      "description": "Display the version of NPM package manager."}
                 ],
                 "Python Web": [
@@ -209,9 +312,11 @@ class DeveloperToolsWidget(QWidget):
                 "PHP": [
                     {"name": "Check PHP Version", 
                      "command": self._get_os_specific_command("php -v"),
+                     "probe": "php -v",
                      "description": "Check the installed PHP version."},
                     {"name": "Install Composer", 
                      "command": self._get_os_specific_command("composer --version"),
+                     "probe": "composer --version",
                      "description": "Check if Composer is installed or install it if not available."},
                     {"name": "Create Laravel Project", 
                      "command": "composer create-project laravel/laravel my-project",
@@ -236,6 +341,7 @@ class DeveloperToolsWidget(QWidget):
                 "Flutter": [
                     {"name": "Check Flutter", 
                      "command": self._get_os_specific_command("flutter --version"),
+                     "probe": "flutter --version",
                      "description": "Check if Flutter is installed and display its version."},
                     {"name": "Create Flutter App", 
                      "command": "flutter create my_flutter_app",
@@ -247,12 +353,14 @@ class DeveloperToolsWidget(QWidget):
                 "Android": [
                     {"name": "Check Android SDK", 
                      "command": self._get_os_specific_command("adb --version"),
+                     "probe": "adb --version",
                      "description": "Check if Android Debug Bridge (ADB) is installed."},
                     {"name": "List Android Devices", 
                      "command": "adb devices",
                      "description": "List all connected Android devices."},
                     {"name": "Open Android Emulator", 
                      "command": self._get_os_specific_command("emulator -list-avds"),
+                     "probe": "emulator -version",
                      "description": "List available Android emulators."}
                 ]
             },
@@ -274,9 +382,11 @@ class DeveloperToolsWidget(QWidget):
                 "R": [
                     {"name": "Check R Version", 
                      "command": self._get_os_specific_command("R --version"),
+                     "probe": "R --version",
                      "description": "Check if R is installed and display its version."},
                     {"name": "Install RStudio", 
                      "command": self._get_os_specific_command("rstudio --version"),
+                     "probe": "rstudio --version",
                      "description": "Check if RStudio is installed."}
                 ],
                 "Jupyter": [
@@ -292,6 +402,7 @@ class DeveloperToolsWidget(QWidget):
                 "Docker": [
                     {"name": "Check Docker Version", 
                      "command": self._get_os_specific_command("docker --version"),
+                     "probe": "docker --version",
                      "description": "Check if Docker is installed and display its version."},
                     {"name": "Docker PS", 
                      "command": "docker ps",
@@ -303,6 +414,7 @@ class DeveloperToolsWidget(QWidget):
                 "Git": [
                     {"name": "Check Git Version", 
                      "command": "git --version",
+                     "probe": "git --version",
                      "description": "Check if Git is installed and display its version."},
                     {"name": "Git Init", 
                      "command": "git init",
@@ -314,12 +426,15 @@ class DeveloperToolsWidget(QWidget):
                 "Cloud": [
                     {"name": "Check AWS CLI", 
                      "command": self._get_os_specific_command("aws --version"),
+                     "probe": "aws --version",
                      "description": "Check if AWS CLI is installed and display its version."},
                     {"name": "Check Azure CLI", 
                      "command": self._get_os_specific_command("az --version"),
+                     "probe": "az --version",
                      "description": "Check if Azure CLI is installed and display its version."},
                     {"name": "Check GCloud CLI", 
                      "command": self._get_os_specific_command("gcloud --version"),
+                     "probe": "gcloud --version",
                      "description": "Check if Google Cloud CLI is installed and display its version."}
                 ]
             },
@@ -327,20 +442,25 @@ class DeveloperToolsWidget(QWidget):
                 "SQL": [
                     {"name": "Check MySQL", 
                      "command": self._get_os_specific_command("mysql --version"),
+                     "probe": "mysql --version",
                      "description": "Check if MySQL is installed and display its version."},
                     {"name": "Check PostgreSQL", 
                      "command": self._get_os_specific_command("psql --version"),
+                     "probe": "psql --version",
                      "description": "Check if PostgreSQL is installed and display its version."},
                     {"name": "Check SQLite", 
                      "command": self._get_os_specific_command("sqlite3 --version"),
+                     "probe": "sqlite3 --version",
                      "description": "Check if SQLite is installed and display its version."}
                 ],
                 "NoSQL": [
                     {"name": "Check MongoDB", 
                      "command": self._get_os_specific_command("mongo --version"),
+                     "probe": "mongo --version",
                      "description": "Check if MongoDB is installed and display its version."},
                     {"name": "Check Redis", 
                      "command": self._get_os_specific_command("redis-cli --version"),
+                     "probe": "redis-cli --version",
                      "description": "Check if Redis CLI is installed and display its version."}
                 ]
             },
@@ -371,7 +491,8 @@ class DeveloperToolsWidget(QWidget):
                      "description": "List all running processes on the system."},
                     {"name": "Network Connectivity", 
                      "command": "ping -c 4 google.com" if platform.system() != "Windows" else "ping -n 4 google.com",
-                     "description": "Test network connectivity by pinging Google.com."}
+                     "description": "Test network connectivity by pinging Google.com.",
+                     "timeout": 30}
                 ]
             }
         }
@@ -392,10 +513,71 @@ class DeveloperToolsWidget(QWidget):
                     command_item.setData(0, Qt.UserRole, cmd)
                     command_item.setFont(0, QFont("Arial", 9))
                     category_item.addChild(command_item)
+                    if "probe" in cmd:
+                        self.probe_items[cmd["probe"]] = command_item
             
             domain_item.setExpanded(True)
 
 
+    def scan_toolchain(self):
+        """Run every version probe in the catalog at once"""
+        if self.toolchain_scan is not None and self.toolchain_scan.isRunning():
+            return
+        probes = [(item.text(0), probe) for probe, item in self.probe_items.items()]
+        for item in self.probe_items.values():
+            item.setIcon(0, self.style().standardIcon(QStyle.SP_BrowserReload))
+        
+        self.toolchain_tree.clear()
+        self.toolchain_results = []
+        self.toolchain_summary.setText(f"Checking {len(probes)} tools...")
+        self.toolchain_box.setVisible(True)
+        self.scan_button.setEnabled(False)
+        self.scan_button.setText("Scanning...")
+        
+        self.toolchain_scan = ToolchainScan(probes, max_parallel=self.scan_parallelism, timeout=self.probe_timeout)
+        self.toolchain_scan.probe_finished.connect(self.handle_probe_finished)
+        self.toolchain_scan.scan_finished.connect(self.handle_scan_finished)
+        self.toolchain_scan.start()
+    
+    def handle_probe_finished(self, result):
+        """Add one tool to the matrix and mark it in the tree"""
+        self.toolchain_results.append(result)
+        status = result["status"]
+        version = result["version"] if status == INSTALLED else status
+        latency = f"{result['latency'] * 1000:.0f} ms" if result["path"] else ""
+        row = ToolchainItem([result["tool"], version, result["path"], latency])
+        row.setToolTip(1, result["output"] or result["probe"])
+        row.setToolTip(2, result["path"])
+        row.setData(3, Qt.UserRole, result["latency"])
+        if status == INSTALLED:
+            icon, color = QStyle.SP_DialogApplyButton, "#A3BE8C"
+        elif status == MISSING:
+            icon, color = QStyle.SP_DialogCancelButton, "#BF616A"
+        else:
+            icon, color = QStyle.SP_MessageBoxWarning, "#EBCB8B"
+        row.setIcon(0, self.style().standardIcon(icon))
+        row.setForeground(1, QColor(color))
+        self.toolchain_tree.addTopLevelItem(row)
+        
+        item = self.probe_items.get(result["probe"])
+        if item is not None:
+            item.setIcon(0, self.style().standardIcon(icon))
+            item.setToolTip(0, f"{result['tool']}: {version}")
+    
+    def handle_scan_finished(self, elapsed):
+        """Summarize the sweep: the wall time against what probing one by one would have cost"""
+        self.scan_button.setEnabled(True)
+        self.scan_button.setText("Scan Toolchain")
+        results = self.toolchain_results
+        installed = sum(result["status"] == INSTALLED for result in results)
+        slowest = max((result["latency"] for result in results), default=0.0)
+        total = sum(result["latency"] for result in results)
+        self.toolchain_summary.setText(
+            f"{installed} of {len(results)} tools installed. Scan took {elapsed:.2f} s "
+            f"(slowest probe {slowest:.2f} s, {total:.2f} s one by one).")
+        for column in (0, 1, 3):
+            self.toolchain_tree.resizeColumnToContents(column)
+
     def update_theme(self, theme_name):
         """Update the widget's theme to match the application theme"""
         self.current_theme = theme_name
@@ -518,15 +700,31 @@ class DeveloperToolsWidget(QWidget):
             }}
         """)
         
-        # Apply styles to result output
-        self.result_output.setStyleSheet(f"""
-            QTextEdit {{
+        self.timeout_label.setStyleSheet(f"color: {colors['secondary_text']};")
+        
+        self.scan_button.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {colors['accent']};
+                color: {colors['main_bg']};
+                border-radius: 0px;
+                padding: 10px;
+            }}
+            QPushButton:hover {{
+                background-color: {colors['highlight_bg']};
+            }}
+        """)
+        self.toolchain_box.setStyleSheet(f"color: {colors['accent']}; border: none;")
+        self.toolchain_summary.setStyleSheet(f"color: {colors['secondary_text']};")
+        self.toolchain_tree.setStyleSheet(f"""
+            QTreeWidget {{
                 background-color: {colors['main_bg']};
+                border: none;
                 color: {colors['text']};
-                border-radius: 3px;
-                selection-background-color: {colors['highlight_bg']};
             }}
         """)
+        
+        # Apply styles to result output
+        self.result_output.set_colors(colors['main_bg'], colors['text'], colors['highlight_bg'], colors['accent'])
 
 
 
@@ -590,6 +788,12 @@ class DeveloperToolsWidget(QWidget):
         # Update buttons fonts
         self.execute_button.setFont(QFont("Arial", sizes["normal"]))
         self.terminal_button.setFont(QFont("Arial", sizes["normal"]))
+        self.cancel_button.setFont(QFont("Arial", sizes["normal"]))
+        self.timeout_label.setFont(QFont("Arial", sizes["normal"]))
+        self.timeout_spin.setFont(QFont("Arial", sizes["normal"]))
+        self.scan_button.setFont(QFont("Arial", sizes["normal"]))
+        self.toolchain_summary.setFont(QFont("Arial", sizes["small"]))
+        self.toolchain_tree.setFont(QFont("Arial", sizes["small"]))
         
         # Update result output font
         self.result_output.setFont(QFont("Consolas", sizes["small"]))
@@ -718,6 +922,7 @@ class DeveloperToolsWidget(QWidget):
                     self.command_header.setText(command_data["name"])
                     self.command_description.setText(command_data["description"])
                     self.command_text.setText(command_data["command"])
+                    self.timeout_spin.setValue(command_data.get("timeout", self.command_timeout))
                     self.execute_button.setEnabled(True)
                     self.terminal_button.setEnabled(True)
                 else:
@@ -742,32 +947,47 @@ class DeveloperToolsWidget(QWidget):
     def execute_command(self):
         command = self.command_text.text()
         if not command:
-            self.result_output.setText("No command selected!")
+            self.result_output.clear()
+            self.result_output.append_line("No command selected!")
             return
         
         # Clear previous output
+        if self.current_job is not None:
+            shared_scheduler().cancel(self.current_job)  # Only one command owns the output view
         self.result_output.clear()
-        self.result_output.append(f"Executing: {command}\n")
-        self.result_output.append("Please wait...\n\n")
-        
-        # Create worker thread for command execution
-        worker = CommandWorker(command)
-        self.command_workers.append(worker)  # Keep a reference
-        worker.finished.connect(self.handle_command_result)
-        worker.start()
-
+        self.result_output.append_line(f"Executing: {command}\n")
+        
+        # Run the command on the shared job pool; it writes its output straight into the view
+        worker = CommandWorker(command, timeout=self.timeout_spin.value() or None,
+                               buffer_options=self.buffer_options, display_buffer=self.result_output.buffer)
+        worker.completed.connect(self.handle_command_completed)
+        self.current_job = shared_scheduler().submit(worker, command)
+        self.cancel_button.setEnabled(True)
     
-    def handle_command_result(self, stdout, stderr):
-        """Handle the result of command execution"""
-        if stdout:
-            self.result_output.append("Output:\n")
-            self.result_output.append(stdout)
-        
-        if stderr:
-            self.result_output.append("\nErrors:\n")
-            self.result_output.append(stderr)
-            
-        self.result_output.append("\nCommand execution completed.")
+    def cancel_command(self):
+        """Stop the running command and everything it started"""
+        if self.current_job is not None:
+            shared_scheduler().cancel(self.current_job)
+            self.result_output.append_line("Cancelling...", "#D08770")
+    
+    def handle_command_completed(self, exit_code, elapsed, status):
+        """Report how the command ended"""
+        if self.current_job is None or self.sender() is not self.current_job.target:
+            return
+        self.current_job = None
+        self.cancel_button.setEnabled(False)
+        
+        if status == STATUS_TIMED_OUT:
+            self.result_output.append_line(f"\nCommand timed out after {elapsed:.1f} s and was stopped.", "#BF616A")
+        elif status == STATUS_CANCELLED:
+            self.result_output.append_line(f"\nCommand cancelled after {elapsed:.1f} s.", "#D08770")
+        else:
+            color = "#A3BE8C" if exit_code == 0 else "#BF616A"
+            self.result_output.append_line(f"\nCommand execution completed (exit code {exit_code}, {elapsed:.2f} s).",
+                                           color)
+        usage = getattr(self.sender(), "usage", None)
+        if usage is not None:
+            self.result_output.append_line(usage.summary(), "#81A1C1")
 
     def open_in_terminal(self):
         """Open the selected command in a terminal"""
@@ -0,0 +1,285 @@
+import time
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem,
+                             QPushButton, QHeaderView, QLineEdit, QSplitter, QMessageBox)
+from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtCore import Qt, QTimer
+
+from utils.command_worker import STDERR_COLOR
+from utils.output_buffer import format_size
+from utils.run_history import shared_history
+from ui.widgets.output_view import OutputView
+
+
+def format_duration(seconds):
+    """Durations from milliseconds to hours, in the unit that reads best"""
+    if seconds is None:
+        return ""
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    if seconds < 60:
+        return f"{seconds:.2f} s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes:.0f}m {seconds:02.0f}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:.0f}h {minutes:02.0f}m"
+
+
+class HistoryWidget(QWidget):
+    """Panel showing every recorded command run, with p50/p95 durations per command
+
+    The top list has one row per command; the recent p50 column turns red
+    when the last runs are clearly slower than the command's overall median.
+    Selecting a command lists its runs, and selecting a run shows the
+    output recorded for it.
+    """
+    def __init__(self, history=None, parent=None):
+        super().__init__(parent)
+        self.history = history or shared_history()
+        self.current_theme = "Nord Dark (Default)"
+        self.current_font_size = "Medium (Default)"
+        self.shown_run = None  # Run whose output is in the output view
+        self.setup_ui()
+
+        # Runs are recorded from worker threads; refresh once a burst of them is over
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(500)
+        self.refresh_timer.timeout.connect(self.refresh)
+        if self.history is not None:
+            self.history.run_recorded.connect(self.refresh_timer.start)
+        self.refresh()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        self.header = QLabel("Command History")
+        self.header.setFont(QFont("Arial", 16, QFont.Bold))
+        self.header.setStyleSheet("color: #88C0D0;")
+        layout.addWidget(self.header)
+
+        self.summary_label = QLabel()
+        self.summary_label.setStyleSheet("color: #D8DEE9;")
+        layout.addWidget(self.summary_label)
+
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter commands...")
+        self.filter_input.textChanged.connect(lambda: self.refresh_timer.start())
+        layout.addWidget(self.filter_input)
+
+        self.splitter = QSplitter(Qt.Vertical)
+
+        self.commands_tree = QTreeWidget()
+        self.commands_tree.setHeaderLabels(["Command", "Runs", "Failures", "p50", "p95", "Recent p50", "Last Run"])
+        self.commands_tree.setRootIsDecorated(False)
+        self.commands_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.commands_tree.headerItem().setToolTip(5, "Median of the last 20 runs")
+        self.commands_tree.itemSelectionChanged.connect(self.show_runs)
+        self.splitter.addWidget(self.commands_tree)
+
+        self.runs_tree = QTreeWidget()
+        self.runs_tree.setHeaderLabels(["Started", "Directory", "Exit", "Wall", "CPU", "Peak RSS", "I/O"])
+        self.runs_tree.setRootIsDecorated(False)
+        self.runs_tree.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.runs_tree.header().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.runs_tree.itemSelectionChanged.connect(self.show_output)
+        self.splitter.addWidget(self.runs_tree)
+
+        self.output_view = OutputView()
+        self.splitter.addWidget(self.output_view)
+        self.splitter.setSizes([300, 200, 200])
+        layout.addWidget(self.splitter)
+
+        for tree in (self.commands_tree, self.runs_tree):
+            tree.setStyleSheet("""
+                QTreeWidget {
+                    background-color: #2E3440;
+                    border: none;
+                    color: #E5E9F0;
+                }
+                QTreeWidget::item:selected {
+                    background-color: #4C566A;
+                }
+            """)
+
+        buttons_layout = QHBoxLayout()
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.setCursor(Qt.PointingHandCursor)
+        self.refresh_button.clicked.connect(self.refresh)
+
+        self.clear_button = QPushButton("Clear History")
+        self.clear_button.setCursor(Qt.PointingHandCursor)
+        self.clear_button.clicked.connect(self.clear_history)
+
+        buttons_layout.addWidget(self.refresh_button)
+        buttons_layout.addWidget(self.clear_button)
+        buttons_layout.addStretch()
+        layout.addLayout(buttons_layout)
+
+    def refresh(self):
+        """Reload the per-command statistics, keeping the selected command"""
+        if self.history is None:
+            self.summary_label.setText("Command history is turned off in the settings.")
+            return
+        selected = self.selected_command()
+        commands, runs = self.history.totals()
+        self.summary_label.setText(f"{runs} runs of {commands} commands recorded")
+
+        self.commands_tree.blockSignals(True)
+        self.commands_tree.clear()
+        for stats in self.history.command_stats(self.filter_input.text()):
+            item = QTreeWidgetItem([
+                stats["command"], str(stats["runs"]), str(stats["failures"]), format_duration(stats["p50"]),
+                format_duration(stats["p95"]), format_duration(stats["recent_p50"]),
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(stats["last_run"]))
+            ])
+            item.setData(0, Qt.UserRole, stats["command"])
+            item.setToolTip(0, stats["command"])
+            if stats["failures"]:
+                item.setForeground(2, QColor("#BF616A"))
+            if stats["p50"] and stats["recent_p50"] is not None:
+                # A quarter either side of the long-run median counts as a trend
+                if stats["recent_p50"] > stats["p50"] * 1.25:
+                    item.setForeground(5, QColor("#BF616A"))
+                elif stats["recent_p50"] < stats["p50"] * 0.8:
+                    item.setForeground(5, QColor("#A3BE8C"))
+            self.commands_tree.addTopLevelItem(item)
+            if stats["command"] == selected:
+                item.setSelected(True)
+        self.commands_tree.blockSignals(False)
+        self.show_runs()
+
+    def selected_command(self):
+        items = self.commands_tree.selectedItems()
+        return items[0].data(0, Qt.UserRole) if items else None
+
+    def show_runs(self):
+        """List the latest runs of the selected command"""
+        selected_run = self.runs_tree.selectedItems()
+        selected_run = selected_run[0].data(0, Qt.UserRole) if selected_run else None
+        self.runs_tree.blockSignals(True)
+        self.runs_tree.clear()
+        command = self.selected_command()
+        if command is not None and self.history is not None:
+            for run in self.history.recent_runs(command):
+                usage = run["usage"]
+                exit_code = run["exit_code"]
+                exit_text = run["status"] if run["status"] not in (None, "done") else str(exit_code)
+                item = QTreeWidgetItem([
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started_at"])),
+                    run["context_path"] or "", exit_text, format_duration(usage.wall_time),
+                    format_duration(usage.cpu_time()), format_size(usage.peak_rss),
+                    f"{format_size(usage.read_bytes)} / {format_size(usage.write_bytes)}"
+                ])
+                item.setData(0, Qt.UserRole, run["id"])
+                item.setToolTip(1, run["context_path"] or "")
+                item.setForeground(2, QColor("#A3BE8C" if exit_code == 0 else "#BF616A"))
+                self.runs_tree.addTopLevelItem(item)
+                if run["id"] == selected_run:
+                    item.setSelected(True)
+        self.runs_tree.blockSignals(False)
+        self.show_output()
+
+    def show_output(self):
+        """Show what the selected run printed"""
+        items = self.runs_tree.selectedItems()
+        run_id = items[0].data(0, Qt.UserRole) if items else None
+        if run_id is not None and run_id == self.shown_run:
+            return
+        self.shown_run = run_id
+        self.output_view.clear()
+        if run_id is None:
+            return
+        stdout, stderr = self.history.output(run_id)
+        if stdout:
+            self.output_view.append_line(stdout)
+        if stderr:
+            self.output_view.append_line(stderr, STDERR_COLOR)
+        if not stdout and not stderr:
+            self.output_view.append_line("(no output)", "#D8DEE9")
+
+    def clear_history(self):
+        if self.history is None:
+            return
+        reply = QMessageBox.question(self, "Clear History", "Forget every recorded command run?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.history.clear()
+
+    def update_theme(self, theme_name):
+        """Update the widget's theme to match the application theme"""
+        self.current_theme = theme_name
+
+        themes = {
+            "Nord Dark (Default)": {"main_bg": "#2E3440", "highlight_bg": "#4C566A", "accent": "#88C0D0",
+                                    "text": "#ECEFF4", "secondary_text": "#D8DEE9"},
+            "Nord Light": {"main_bg": "#ECEFF4", "highlight_bg": "#D8DEE9", "accent": "#5E81AC",
+                           "text": "#2E3440", "secondary_text": "#4C566A"},
+            "Dracula": {"main_bg": "#282a36", "highlight_bg": "#6272a4", "accent": "#8be9fd",
+                        "text": "#f8f8f2", "secondary_text": "#f8f8f2"},
+            "Solarized Dark": {"main_bg": "#002b36", "highlight_bg": "#586e75", "accent": "#2aa198",
+                               "text": "#fdf6e3", "secondary_text": "#eee8d5"},
+            "Solarized Light": {"main_bg": "#fdf6e3", "highlight_bg": "#93a1a1", "accent": "#2aa198",
+                                "text": "#002b36", "secondary_text": "#073642"}
+        }
+        colors = themes.get(theme_name, themes["Nord Dark (Default)"])
+
+        self.header.setStyleSheet(f"color: {colors['accent']};")
+        self.summary_label.setStyleSheet(f"color: {colors['secondary_text']};")
+        self.filter_input.setStyleSheet(f"""
+            QLineEdit {{
+                background-color: {colors['main_bg']};
+                color: {colors['text']};
+                border: 1px solid {colors['highlight_bg']};
+                border-radius: 3px;
+                padding: 5px;
+            }}
+        """)
+        for tree in (self.commands_tree, self.runs_tree):
+            tree.setStyleSheet(f"""
+                QTreeWidget {{
+                    background-color: {colors['main_bg']};
+                    border: none;
+                    color: {colors['text']};
+                }}
+                QTreeWidget::item:selected {{
+                    background-color: {colors['highlight_bg']};
+                }}
+            """)
+        self.output_view.set_colors(colors['main_bg'], colors['text'], colors['highlight_bg'], colors['accent'])
+        for button in (self.refresh_button, self.clear_button):
+            button.setStyleSheet(f"""
+                QPushButton {{
+                    background-color: {colors['accent']};
+                    color: {colors['main_bg']};
+                    border-radius: 5px;
+                    padding: 8px;
+                    min-width: 120px;
+                }}
+                QPushButton:hover {{
+                    background-color: {colors['highlight_bg']};
+                }}
+            """)
+
+    def update_font_size(self, font_size_name):
+        """Update the widget's font sizes"""
+        self.current_font_size = font_size_name
+
+        font_sizes = {
+            "Small": {"header": 14, "normal": 9, "small": 8},
+            "Medium (Default)": {"header": 16, "normal": 10, "small": 9},
+            "Large": {"header": 18, "normal": 12, "small": 10},
+            "Extra Large": {"header": 20, "normal": 14, "small": 12}
+        }
+        sizes = font_sizes.get(font_size_name, font_sizes["Medium (Default)"])
+
+        self.header.setFont(QFont("Arial", sizes["header"], QFont.Bold))
+        self.summary_label.setFont(QFont("Arial", sizes["small"]))
+        self.filter_input.setFont(QFont("Arial", sizes["normal"]))
+        self.commands_tree.setFont(QFont("Arial", sizes["normal"]))
+        self.runs_tree.setFont(QFont("Arial", sizes["normal"]))
+        self.output_view.setFont(QFont("Consolas", sizes["small"]))
+        self.refresh_button.setFont(QFont("Arial", sizes["normal"]))
+        self.clear_button.setFont(QFont("Arial", sizes["normal"]))
@@ -0,0 +1,180 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTreeWidget,
+                             QTreeWidgetItem, QPushButton, QHeaderView)
+from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtCore import Qt, QTimer
+
+from utils.output_buffer import format_size
+from utils.job_scheduler import shared_scheduler, QUEUED, RUNNING, DONE, CANCELLED, TIMED_OUT
+
+class JobsWidget(QWidget):
+    """Panel listing the background jobs of the shared JobScheduler"""
+    def __init__(self, scheduler=None, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler or shared_scheduler()
+        self.current_theme = "Nord Dark (Default)"
+        self.current_font_size = "Medium (Default)"
+        self.state_colors = {
+            QUEUED: "#EBCB8B",
+            RUNNING: "#88C0D0",
+            DONE: "#A3BE8C",
+            CANCELLED: "#D08770",
+            TIMED_OUT: "#BF616A"
+        }
+        self.setup_ui()
+
+        self.scheduler.jobs_changed.connect(self.refresh)
+        # Running durations tick once a second while something is running
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        self.header = QLabel("Background Jobs")
+        self.header.setFont(QFont("Arial", 16, QFont.Bold))
+        self.header.setStyleSheet("color: #88C0D0;")
+        layout.addWidget(self.header)
+
+        self.summary_label = QLabel()
+        self.summary_label.setStyleSheet("color: #D8DEE9;")
+        layout.addWidget(self.summary_label)
+
+        self.jobs_tree = QTreeWidget()
+        self.jobs_tree.setHeaderLabels(["#", "Job", "State", "Duration", "CPU", "Peak RSS"])
+        self.jobs_tree.setRootIsDecorated(False)
+        self.jobs_tree.setSelectionMode(QTreeWidget.ExtendedSelection)
+        self.jobs_tree.header().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.jobs_tree.setStyleSheet("""
+            QTreeWidget {
+                background-color: #2E3440;
+                border: none;
+                color: #E5E9F0;
+            }
+            QTreeWidget::item:selected {
+                background-color: #4C566A;
+            }
+        """)
+        layout.addWidget(self.jobs_tree)
+
+        buttons_layout = QHBoxLayout()
+        self.cancel_button = QPushButton("Cancel Selected")
+        self.cancel_button.setCursor(Qt.PointingHandCursor)
+        self.cancel_button.clicked.connect(self.cancel_selected)
+
+        self.clear_button = QPushButton("Clear Finished")
+        self.clear_button.setCursor(Qt.PointingHandCursor)
+        self.clear_button.clicked.connect(self.scheduler.clear_history)
+
+        buttons_layout.addWidget(self.cancel_button)
+        buttons_layout.addWidget(self.clear_button)
+        buttons_layout.addStretch()
+        layout.addLayout(buttons_layout)
+
+    def refresh(self):
+        """Rebuild the list from the scheduler, keeping the selection"""
+        selected = {item.data(0, Qt.UserRole) for item in self.jobs_tree.selectedItems()}
+        self.jobs_tree.clear()
+
+        running = 0
+        queued = 0
+        for job in self.scheduler.jobs():
+            running += job.state == RUNNING
+            queued += job.state == QUEUED
+
+            state = job.state
+            if state == DONE and job.exit_code is not None:
+                state = f"done (exit {job.exit_code})"
+            duration = f"{job.duration():.1f} s" if job.started_at is not None else ""
+            usage = job.usage
+            cpu = f"{usage.cpu_time():.1f} s" if usage is not None else ""
+            peak_rss = format_size(usage.peak_rss) if usage is not None else ""
+
+            item = QTreeWidgetItem([str(job.id), job.label, state, duration, cpu, peak_rss])
+            item.setData(0, Qt.UserRole, job.id)
+            item.setForeground(2, QColor(self.state_colors.get(job.state, "#D8DEE9")))
+            item.setToolTip(1, job.label)
+            if usage is not None:
+                item.setToolTip(4, usage.summary())
+            self.jobs_tree.addTopLevelItem(item)
+            if job.id in selected:
+                item.setSelected(True)
+
+        self.summary_label.setText(f"{running} running, {queued} queued, "
+                                   f"at most {self.scheduler.max_workers} at a time")
+        if running and not self.refresh_timer.isActive():
+            self.refresh_timer.start()
+        elif not running:
+            self.refresh_timer.stop()
+
+    def cancel_selected(self):
+        """Cancel the selected queued or running jobs"""
+        selected = {item.data(0, Qt.UserRole) for item in self.jobs_tree.selectedItems()}
+        for job in self.scheduler.active_jobs():
+            if job.id in selected:
+                self.scheduler.cancel(job)
+
+    def update_theme(self, theme_name):
+        """Update the widget's theme to match the application theme"""
+        self.current_theme = theme_name
+
+        themes = {
+            "Nord Dark (Default)": {"main_bg": "#2E3440", "highlight_bg": "#4C566A", "accent": "#88C0D0",
+                                    "text": "#ECEFF4", "secondary_text": "#D8DEE9"},
+            "Nord Light": {"main_bg": "#ECEFF4", "highlight_bg": "#D8DEE9", "accent": "#5E81AC",
+                           "text": "#2E3440", "secondary_text": "#4C566A"},
+            "Dracula": {"main_bg": "#282a36", "highlight_bg": "#6272a4", "accent": "#8be9fd",
+                        "text": "#f8f8f2", "secondary_text": "#f8f8f2"},
+            "Solarized Dark": {"main_bg": "#002b36", "highlight_bg": "#586e75", "accent": "#2aa198",
+                               "text": "#fdf6e3", "secondary_text": "#eee8d5"},
+            "Solarized Light": {"main_bg": "#fdf6e3", "highlight_bg": "#93a1a1", "accent": "#2aa198",
+                                "text": "#002b36", "secondary_text": "#073642"}
+        }
+        colors = themes.get(theme_name, themes["Nord Dark (Default)"])
+
+        self.header.setStyleSheet(f"color: {colors['accent']};")
+        self.summary_label.setStyleSheet(f"color: {colors['secondary_text']};")
+        self.jobs_tree.setStyleSheet(f"""
+            QTreeWidget {{
+                background-color: {colors['main_bg']};
+                border: none;
+                color: {colors['text']};
+            }}
+            QTreeWidget::item:selected {{
+                background-color: {colors['highlight_bg']};
+            }}
+        """)
+        for button in (self.cancel_button, self.clear_button):
+            button.setStyleSheet(f"""
+                QPushButton {{
+                    background-color: {colors['accent']};
+                    color: {colors['main_bg']};
+                    border-radius: 5px;
+                    padding: 8px;
+                    min-width: 120px;
+                }}
+                QPushButton:hover {{
+                    background-color: {colors['highlight_bg']};
+                }}
+            """)
+
+    def update_font_size(self, font_size_name):
+        """Update the widget's font sizes"""
+        self.current_font_size = font_size_name
+
+        font_sizes = {
+            "Small": {"header": 14, "normal": 9, "small": 8},
+            "Medium (Default)": {"header": 16, "normal": 10, "small": 9},
+            "Large": {"header": 18, "normal": 12, "small": 10},
+            "Extra Large": {"header": 20, "normal": 14, "small": 12}
+        }
+        sizes = font_sizes.get(font_size_name, font_sizes["Medium (Default)"])
+
+        self.header.setFont(QFont("Arial", sizes["header"], QFont.Bold))
+        self.summary_label.setFont(QFont("Arial", sizes["small"]))
+        self.jobs_tree.setFont(QFont("Arial", sizes["normal"]))
+        self.cancel_button.setFont(QFont("Arial", sizes["normal"]))
+        self.clear_button.setFont(QFont("Arial", sizes["normal"]))
@@ -0,0 +1,410 @@
+import re
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QAbstractScrollArea, QLineEdit, QPushButton,
+                             QLabel, QApplication, QMenu)
+from PyQt5.QtGui import QFont, QFontMetrics, QPainter, QColor, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, QEvent
+
+from utils.ansi import colorize, styled_segments
+from utils.line_index import LineIndex
+from utils.output_buffer import OutputBuffer
+from utils.output_compactor import strip_ansi
+from utils.output_search import OutputSearch, compile_search
+
+
+class OutputCanvas(QAbstractScrollArea):
+    """Draws only the lines that are on screen, read from a LineIndex
+
+    Each visible line is decoded and its colors parsed when it is first
+    painted; the result is cached for scrolling back and forth. Scrolling
+    costs the same with 100 lines or 10 million.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = None
+        self.cache = {}  # Line number -> styled segments
+        self.follow = True  # Keep the last line in view as output arrives
+        self.content_width = 0
+        self.selection = None  # (first, last) selected line numbers
+        self.selection_anchor = None
+        self.match_line = None
+        self.highlight = None  # Compiled search pattern whose matches are highlighted
+        self.colors = {"background": "#2E3440", "text": "#D8DEE9", "selection": "#434C5E",
+                       "match": "#4C566A", "highlight": "#EBCB8B"}
+        self.update_metrics()
+        self.setFont(QFont("Consolas", 10))
+        self.verticalScrollBar().setSingleStep(1)
+
+    def set_index(self, index):
+        self.index = index
+        self.cache.clear()
+        self.follow = True
+        self.content_width = 0
+        self.selection = None
+        self.match_line = None
+        self.update_scrollbars()
+        self.viewport().update()
+
+    def refresh(self):
+        """Index newly appended output and show it"""
+        if self.index is None:
+            return
+        complete = self.index.newlines
+        if not self.index.update():
+            return
+        # The unterminated last line may have grown
+        self.cache.pop(complete, None)
+        self.update_scrollbars()
+        if self.follow:
+            self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        self.viewport().update()
+
+    def update_metrics(self):
+        metrics = QFontMetrics(self.font())
+        self.line_height = metrics.height()
+        self.ascent = metrics.ascent()
+        self.bold_font = QFont(self.font())
+        self.bold_font.setBold(True)
+        self.underline_font = QFont(self.font())
+        self.underline_font.setUnderline(True)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.FontChange:
+            self.update_metrics()
+            self.content_width = 0
+            self.update_scrollbars()
+        super().changeEvent(event)
+
+    def visible_lines(self):
+        return max(1, self.viewport().height() // self.line_height)
+
+    def update_scrollbars(self):
+        total = self.index.line_count() if self.index is not None else 0
+        visible = self.visible_lines()
+        self.verticalScrollBar().setPageStep(visible)
+        self.verticalScrollBar().setRange(0, max(0, total - visible))
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+        self.horizontalScrollBar().setRange(0, max(0, self.content_width - self.viewport().width() + 20))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbars()
+
+    def scrollContentsBy(self, dx, dy):
+        scrollbar = self.verticalScrollBar()
+        self.follow = scrollbar.value() >= scrollbar.maximum()
+        self.viewport().update()
+
+    def scroll_to_line(self, line):
+        """Scroll so that line is in the middle of the view"""
+        self.follow = False
+        self.verticalScrollBar().setValue(max(0, line - self.visible_lines() // 2))
+        self.viewport().update()
+
+    def segments(self, line, data, state):
+        """The styled segments of one line, parsed on first use"""
+        segments = self.cache.get(line)
+        if segments is not None:
+            return segments
+        text = data.decode("utf-8", errors="replace")
+        if "\r" in text:
+            # Progress bars redraw the line after \r; show what the terminal would end up showing
+            text = next((part for part in reversed(text.split("\r")) if part.strip()), "")
+        segments = expand_tabs(styled_segments(text, state))
+        if line < self.index.newlines:
+            if len(self.cache) > 5000:
+                self.cache.clear()
+            self.cache[line] = segments
+        return segments
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), QColor(self.colors["background"]))
+        if self.index is None:
+            return
+        metrics = QFontMetrics(self.font())
+        first = self.verticalScrollBar().value()
+        left = 4 - self.horizontalScrollBar().value()
+        widest = self.content_width
+        default_color = QColor(self.colors["text"])
+
+        for row, (data, state) in enumerate(self.index.lines(first, self.visible_lines() + 1)):
+            line = first + row
+            top = row * self.line_height
+            segments = self.segments(line, data, state)
+
+            if self.selection and self.selection[0] <= line <= self.selection[1]:
+                painter.fillRect(0, top, self.viewport().width(), self.line_height, QColor(self.colors["selection"]))
+            elif line == self.match_line:
+                painter.fillRect(0, top, self.viewport().width(), self.line_height, QColor(self.colors["match"]))
+
+            if self.highlight is not None:
+                plain = "".join(text for text, _ in segments)
+                for match in self.highlight.finditer(plain):
+                    if match.end() == match.start():
+                        continue
+                    start = left + metrics.horizontalAdvance(plain[:match.start()])
+                    width = metrics.horizontalAdvance(match.group())
+                    color = QColor(self.colors["highlight"])
+                    color.setAlpha(110)
+                    painter.fillRect(start, top, width, self.line_height, color)
+
+            x = left
+            for text, (foreground, background, bold, underline) in segments:
+                width = metrics.horizontalAdvance(text)
+                if background:
+                    painter.fillRect(x, top, width, self.line_height, QColor(background))
+                painter.setFont(self.bold_font if bold else self.underline_font if underline else self.font())
+                painter.setPen(QColor(foreground) if foreground else default_color)
+                painter.drawText(x, top + self.ascent, text)
+                x += width
+            widest = max(widest, x - left)
+
+        if widest > self.content_width:
+            self.content_width = widest
+            self.update_scrollbars()
+
+    def line_at(self, y):
+        return self.verticalScrollBar().value() + max(0, y) // self.line_height
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.index is not None:
+            line = min(self.line_at(event.y()), self.index.line_count() - 1)
+            if line >= 0:
+                self.selection_anchor = line
+                self.selection = (line, line)
+                self.viewport().update()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.LeftButton and self.selection_anchor is not None:
+            line = min(self.line_at(event.y()), self.index.line_count() - 1)
+            self.selection = (min(line, self.selection_anchor), max(line, self.selection_anchor))
+            if event.y() > self.viewport().height():
+                self.verticalScrollBar().setValue(self.verticalScrollBar().value() + 1)
+            elif event.y() < 0:
+                self.verticalScrollBar().setValue(self.verticalScrollBar().value() - 1)
+            self.viewport().update()
+        super().mouseMoveEvent(event)
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            self.copy_selection()
+        elif event.matches(QKeySequence.SelectAll):
+            self.select_all()
+        elif event.matches(QKeySequence.MoveToStartOfDocument):
+            self.verticalScrollBar().setValue(0)
+        elif event.matches(QKeySequence.MoveToEndOfDocument):
+            self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        copy_action = menu.addAction("Copy", self.copy_selection)
+        copy_action.setEnabled(self.selection is not None)
+        menu.addAction("Select All", self.select_all)
+        menu.exec_(event.globalPos())
+
+    def select_all(self):
+        if self.index is not None and self.index.line_count():
+            self.selection = (0, self.index.line_count() - 1)
+            self.viewport().update()
+
+    def copy_selection(self, max_bytes=32 * 1024 * 1024):
+        """Copy the selected lines without their escape sequences, up to max_bytes of output"""
+        if self.index is None or self.selection is None:
+            return
+        start = self.index.offset(self.selection[0])
+        end = min(self.index.offset(self.selection[1] + 1), start + max_bytes)
+        data = self.index.buffer.read(start, end)
+        QApplication.clipboard().setText(strip_ansi(data.decode("utf-8", errors="replace")))
+
+
+class OutputView(QWidget):
+    """Read-only view of command output of any size, with incremental regex search
+
+    The output lives in an OutputBuffer (spilled to disk when large) that
+    a CommandWorker writes into directly; the view picks up new output on a
+    timer, indexes it and repaints only what is visible.
+    """
+    def __init__(self, buffer_options=None, parent=None):
+        super().__init__(parent)
+        self.buffer_options = buffer_options or {}
+        self.buffer = None
+        self.search_thread = None
+        self.matches = []
+        self.current_match = -1
+        self.setup_ui()
+
+        # New output is picked up at most 20 times a second, however fast it arrives
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(50)
+        self.poll_timer.timeout.connect(self.canvas.refresh)
+        self.poll_timer.start()
+
+        # Search as you type, once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.start_search)
+        self.clear()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(4)
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search output (regular expression)")
+        self.search_input.setToolTip("Case-insensitive unless the pattern contains capital letters; "
+                                     "Enter jumps to the next match")
+        self.search_input.textChanged.connect(self.search_timer_restart)
+        self.search_input.returnPressed.connect(self.next_match)
+
+        self.previous_match_button = QPushButton("▲")
+        self.previous_match_button.setToolTip("Previous match")
+        self.previous_match_button.clicked.connect(self.previous_match)
+        self.next_match_button = QPushButton("▼")
+        self.next_match_button.setToolTip("Next match")
+        self.next_match_button.clicked.connect(self.next_match)
+        for button in (self.previous_match_button, self.next_match_button):
+            button.setCursor(Qt.PointingHandCursor)
+            button.setFixedWidth(30)
+
+        self.match_label = QLabel()
+        self.match_label.setMinimumWidth(110)
+
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.previous_match_button)
+        search_layout.addWidget(self.next_match_button)
+        search_layout.addWidget(self.match_label)
+        layout.addLayout(search_layout)
+
+        self.canvas = OutputCanvas()
+        layout.addWidget(self.canvas)
+
+    def clear(self):
+        """Start over with an empty buffer; the old one, and its temp file, are released"""
+        self.stop_search()
+        if self.buffer is not None:
+            self.buffer.close()
+        self.buffer = OutputBuffer(**self.buffer_options)
+        self.canvas.set_index(LineIndex(self.buffer))
+        self.matches = []
+        self.current_match = -1
+        self.match_label.setText("")
+
+    def append_line(self, text, color=None):
+        """Add a line of text, in color if given, on a line of its own"""
+        if not self.buffer.ends_with_newline:
+            text = "\n" + text
+        self.buffer.write((colorize(text, color) if color else text) + "\n")
+        self.canvas.refresh()
+
+    def setFont(self, font):
+        self.canvas.setFont(font)
+
+    def set_colors(self, background, text, selection, highlight):
+        """Match the application theme"""
+        self.canvas.colors.update({"background": background, "text": text, "selection": selection,
+                                   "match": selection, "highlight": highlight})
+        self.match_label.setStyleSheet(f"color: {text};")
+        self.canvas.viewport().update()
+
+    def search_timer_restart(self):
+        self.search_timer.start()
+
+    def stop_search(self):
+        if self.search_thread is not None:
+            self.search_thread.stop()
+            self.search_thread.wait()
+            self.search_thread = None
+
+    def start_search(self):
+        """Search the whole output in the background for the pattern in the search box"""
+        self.stop_search()
+        self.search_timer.stop()
+        self.matches = []
+        self.current_match = -1
+        self.canvas.match_line = None
+        self.canvas.highlight = None
+        pattern = self.search_input.text()
+        if not pattern:
+            self.match_label.setText("")
+            self.canvas.viewport().update()
+            return
+        try:
+            regex = compile_search(pattern)
+            self.canvas.highlight = re.compile(pattern, regex.flags & re.IGNORECASE)  # Matched within one line
+        except re.error:
+            self.match_label.setText("Invalid pattern")
+            self.canvas.viewport().update()
+            return
+
+        self.match_label.setText("Searching...")
+        self.search_thread = OutputSearch(self.buffer, regex, self.buffer.size)
+        self.search_thread.matches_found.connect(self.add_matches)
+        self.search_thread.search_finished.connect(self.search_finished)
+        self.search_thread.start()
+        self.canvas.viewport().update()
+
+    def add_matches(self, lines):
+        if self.sender() is not self.search_thread:
+            return  # A search that has been replaced
+        self.matches.extend(lines)
+        if self.current_match == -1:
+            self.go_to_match(0)
+        else:
+            self.update_match_label(searching=True)
+
+    def search_finished(self, total):
+        if self.sender() is not self.search_thread:
+            return
+        if not self.matches:
+            self.match_label.setText("No matches")
+        else:
+            self.update_match_label()
+
+    def update_match_label(self, searching=False):
+        more = "+" if searching else ""
+        self.match_label.setText(f"{self.current_match + 1} of {len(self.matches):,}{more}")
+
+    def go_to_match(self, number):
+        if not self.matches:
+            # Enter before the debounce fired: search now
+            if self.search_input.text() and self.search_thread is None:
+                self.start_search()
+            return
+        self.current_match = number % len(self.matches)
+        self.canvas.match_line = self.matches[self.current_match]
+        self.canvas.scroll_to_line(self.canvas.match_line)
+        self.update_match_label(searching=self.search_thread is not None and self.search_thread.isRunning())
+
+    def next_match(self):
+        self.go_to_match(self.current_match + 1)
+
+    def previous_match(self):
+        self.go_to_match(self.current_match - 1)
+
+
+def expand_tabs(segments, tab_size=8):
+    """Replace tabs with spaces up to the next tab stop, across segments"""
+    column = 0
+    result = []
+    for text, state in segments:
+        if "\t" in text:
+            parts = text.split("\t")
+            expanded = []
+            for part in parts[:-1]:
+                column += len(part)
+                padding = tab_size - column % tab_size
+                expanded.append(part + " " * padding)
+                column += padding
+            expanded.append(parts[-1])
+            text = "".join(expanded)
+            column += len(parts[-1])
+        else:
+            column += len(text)
+        result.append((text, state))
+    return result
@@ -1,25 +1,125 @@
-import platform
-import sys
-import psutil
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QFrame, QGridLayout, QScrollArea
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 import json
 import os
 
 # Import the CommandContextWidget
 from ui.widgets.command_context_widget import CommandContextWidget
+from ui.widgets.resource_monitor_widget import ResourceMonitorWidget
+from utils.config import load_config
+from utils.system_info import (SystemInfoCollector, CATEGORY_NAMES, VOLATILE_CATEGORIES, UNRESPONSIVE,
+                               load_cached_profile, save_cached_profile)
+
+# Colors of the application themes
+THEMES = {
+    "Nord Dark (Default)": {
+        "main_bg": "#2E3440",
+        "secondary_bg": "#3B4252",
+        "highlight_bg": "#4C566A",
+        "accent": "#88C0D0",
+        "text": "#ECEFF4",
+        "secondary_text": "#D8DEE9",
+        "success": "#A3BE8C"
+    },
+    "Nord Light": {
+        "main_bg": "#ECEFF4",
+        "secondary_bg": "#E5E9F0",
+        "highlight_bg": "#D8DEE9",
+        "accent": "#5E81AC",
+        "text": "#2E3440",
+        "secondary_text": "#4C566A",
+        "success": "#A3BE8C"
+    },
+    "Dracula": {
+        "main_bg": "#282a36",
+        "secondary_bg": "#44475a",
+        "highlight_bg": "#6272a4",
+        "accent": "#8be9fd",
+        "text": "#f8f8f2",
+        "secondary_text": "#f8f8f2",
+        "success": "#50fa7b"
+    },
+    "Solarized Dark": {
+        "main_bg": "#002b36",
+        "secondary_bg": "#073642",
+        "highlight_bg": "#586e75",
+        "accent": "#2aa198",
+        "text": "#fdf6e3",
+        "secondary_text": "#eee8d5",
+        "success": "#859900"
+    },
+    "Solarized Light": {
+        "main_bg": "#fdf6e3",
+        "secondary_bg": "#eee8d5",
+        "highlight_bg": "#93a1a1",
+        "accent": "#2aa198",
+        "text": "#002b36",
+        "secondary_text": "#073642",
+        "success": "#859900"
+    }
+}
+
+# Point sizes for each font size setting
+FONT_SIZES = {
+    "Small": {
+        "header": 14,
+        "subheader": 12,
+        "normal": 9,
+        "small": 8
+    },
+    "Medium (Default)": {
+        "header": 16,
+        "subheader": 14,
+        "normal": 10,
+        "small": 9
+    },
+    "Large": {
+        "header": 18,
+        "subheader": 16,
+        "normal": 12,
+        "small": 10
+    },
+    "Extra Large": {
+        "header": 20,
+        "subheader": 18,
+        "normal": 14,
+        "small": 12
+    }
+}
+
 
 class ProfileWidget(QWidget):
     """Enhanced widget to display system information with command execution context selection"""
     
     context_updated = pyqtSignal(dict)  # Signal emitted when command context is updated
+    system_info_updated = pyqtSignal(dict)  # The profile so far, each time another category arrives
     
     def __init__(self):
         super().__init__()
         self.current_theme = "Nord Dark (Default)"
         self.current_font_size = "Medium (Default)"
+        # The last run's profile, if nothing it depends on has changed since; shown right away
+        cached = load_cached_profile()
+        self.system_info = cached or {}  # Filled in category by category
+        self.pending_categories = [name for name in CATEGORY_NAMES if name not in self.system_info]
+        self.category_rows = {}  # Labels of each category in the grid, as rows of (label, column)
         self.setup_ui()
+        
+        # Collected in the background so the window shows up without waiting on disks or interfaces;
+        # with a cached profile only the volatile categories and any it lacks are collected again
+        self.collector = SystemInfoCollector()
+        self.collector.category_ready.connect(self.on_category_ready)
+        if cached is None:
+            self.collector.start()
+        else:
+            self.collector.start(VOLATILE_CATEGORIES + self.pending_categories)
+        
+        # Mounts that did not answer are probed again until they do
+        self.storage_recheck_timer = QTimer(self)
+        self.storage_recheck_timer.setSingleShot(True)
+        self.storage_recheck_timer.setInterval(int(load_config().get("storage_recheck_interval", 30) * 1000))
+        self.storage_recheck_timer.timeout.connect(lambda: self.collector.collect("Storage"))
 
     def get_system_info_dict(self):
         """Returns the system information as a dictionary for easy sharing with other components"""
@@ -42,15 +142,16 @@ class ProfileWidget(QWidget):
         self.command_context_widget.context_changed.connect(self.forward_context_change)
         layout.addWidget(self.command_context_widget)
         
+        # Live charts of what the grid below shows as of launch
+        self.monitor_widget = ResourceMonitorWidget()
+        layout.addWidget(self.monitor_widget)
+        
         # System information widget
         self.info_frame = QFrame()
         self.info_frame.setStyleSheet("background-color: #3B4252; border-radius: 5px; padding: 15px;")
         self.info_layout = QGridLayout(self.info_frame)
         
-        # Get system information
-        self.system_info = self.get_system_info()
-        
-        # Display system information in a grid
+        # Display system information in a grid, with placeholders until it is collected
         self.populate_system_info()
         
         # Create a scroll area for the system info
@@ -71,147 +172,116 @@ class ProfileWidget(QWidget):
         """Get the current command execution context"""
         return self.command_context_widget.get_active_context()
     
-    def populate_system_info(self):
-        """Populate the grid with system information"""
-        # Clear existing items
+    def on_category_ready(self, category, items, elapsed):
+        """Show a category as soon as it has been collected"""
+        if category in self.pending_categories:
+            self.pending_categories.remove(category)
+        if items:
+            # Keep the display order whatever order the categories finish in
+            self.system_info[category] = items
+            self.system_info = {name: self.system_info[name] for name in CATEGORY_NAMES if name in self.system_info}
+        else:
+            self.system_info.pop(category, None)  # Drop what the cache had for it
+        if category == "Storage" and any(is_unresponsive(value) for value in items.values()):
+            self.storage_recheck_timer.start()
+        # Only this category's labels are made again, styled as they are made
+        self.populate_system_info([category])
+        self.system_info_updated.emit(self.system_info)
+        if not self.collector.is_running():
+            save_cached_profile(self.system_info)
+    
+    def populate_system_info(self, changed=None):
+        """Lay out the system information grid
+
+        Only the labels of the changed categories (all of them when None)
+        are made again; the others are moved to their new rows as they are.
+        """
+        # Take everything out of the grid; the labels of unchanged categories are kept
         while self.info_layout.count():
-            item = self.info_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-                
+            self.info_layout.takeAt(0)
+        for category in list(self.category_rows):
+            if changed is None or category in changed:
+                for row_widgets in self.category_rows.pop(category):
+                    for widget, _ in row_widgets:
+                        widget.deleteLater()
+        
         # Display system information in a grid
         row = 0
-        for category, items in self.system_info.items():
-            # Category header
-            category_label = QLabel(category)
-            category_label.setFont(QFont("Arial", 12, QFont.Bold))
-            category_label.setStyleSheet("color: #88C0D0;")
-            self.info_layout.addWidget(category_label, row, 0, 1, 2)
-            row += 1
-            
-            # Category items
-            for key, value in items.items():
-                key_label = QLabel(f"{key}:")
-                key_label.setStyleSheet("color: #E5E9F0;")
-                value_label = QLabel(str(value))
-                value_label.setStyleSheet("color: #A3BE8C;")
-                value_label.setWordWrap(True)
-                
-                self.info_layout.addWidget(key_label, row, 0)
-                self.info_layout.addWidget(value_label, row, 1)
+        for category in CATEGORY_NAMES:
+            if category not in self.category_rows:
+                rows = self.category_grid_rows(category)
+                if not rows:
+                    continue  # Nothing to show, e.g. no readable disks
+                self.category_rows[category] = rows
+            for row_widgets in self.category_rows[category]:
+                for widget, column in row_widgets:
+                    # Category headers span both columns
+                    if widget.property("role") == "category":
+                        self.info_layout.addWidget(widget, row, 0, 1, 2)
+                    else:
+                        self.info_layout.addWidget(widget, row, column)
                 row += 1
-                
-            # Add spacing between categories
-            spacer = QLabel("")
-            self.info_layout.addWidget(spacer, row, 0)
-            row += 1
+    
+    def category_grid_rows(self, category):
+        """New labels for one category, as a list of rows of (label, column)"""
+        pending = category in self.pending_categories
+        items = self.system_info.get(category)
+        if not pending and not items:
+            return []
+        
+        # Category header
+        rows = [[(self.grid_label(category, "category"), 0)]]
         
-    def get_system_info(self):
-        """Gather detailed system information"""
-        system_info = {
-            "System": {
-                "OS": f"{platform.system()} {platform.release()}",
-                "Version": platform.version(),
-                "Architecture": platform.machine(),
-                "Processor": platform.processor(),
-                "Computer Name": platform.node()
-            },
-            "Hardware": {
-                "CPU Cores": psutil.cpu_count(logical=False),
-                "CPU Threads": psutil.cpu_count(logical=True),
-                "RAM": f"{round(psutil.virtual_memory().total / (1024**3), 2)} GB",
-                "RAM Available": f"{round(psutil.virtual_memory().available / (1024**3), 2)} GB",
-            },
-            "Python Environment": {
-                "Python Version": platform.python_version(),
-                "Python Implementation": platform.python_implementation(),
-                "Python Path": sys.executable
-            }
-        }
+        if pending:
+            rows.append([(self.grid_label("Collecting...", "key"), 0)])
+            items = {}
         
-        # Add disk information
-        disk_info = {}
-        for disk in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(disk.mountpoint)
-                disk_info[f"Disk {disk.device}"] = f"{round(usage.total / (1024**3), 2)} GB (Used: {usage.percent}%)"
-            except:
-                pass
-                
-        if disk_info:
-            system_info["Storage"] = disk_info
-            
-        # Network information
-        try:
-            network_info = {}
-            network_interfaces = psutil.net_if_addrs()
-            for interface, addresses in network_interfaces.items():
-                for address in addresses:
-                    if address.family == 2:  # IPv4
-                        network_info[interface] = address.address
-                        
-            if network_info:
-                system_info["Network"] = network_info
-        except:
-            pass
-            
-        return system_info
+        # Category items
+        for key, value in items.items():
+            key_label = self.grid_label(f"{key}:", "key")
+            value_label = self.grid_label(str(value), "value")
+            value_label.setWordWrap(True)
+            rows.append([(key_label, 0), (value_label, 1)])
+        
+        # Add spacing between categories
+        rows.append([(QLabel(""), 0)])
+        return rows
+    
+    def grid_label(self, text, role):
+        """A label of the system info grid, styled for the current theme and font size"""
+        label = QLabel(text)
+        label.setProperty("role", role)
+        self.style_grid_label(label)
+        return label
     
+    def style_grid_label(self, label):
+        """Color and size a grid label by its role: a category header, a key or a value"""
+        colors = THEMES.get(self.current_theme, THEMES["Nord Dark (Default)"])
+        sizes = FONT_SIZES.get(self.current_font_size, FONT_SIZES["Medium (Default)"])
+        role = label.property("role")
+        if role == "category":
+            label.setStyleSheet(f"color: {colors['accent']};")
+            label.setFont(QFont("Arial", sizes["subheader"], QFont.Bold))
+            return
+        if role == "value":
+            color = "#BF616A" if is_unresponsive(label.text()) else colors['success']
+        else:
+            color = colors['text']
+        label.setStyleSheet(f"color: {color};")
+        label.setFont(QFont("Arial", sizes["normal"]))
+    
+    def restyle_grid(self):
+        """Restyle the grid's labels in place after a theme or font size change"""
+        for index in range(self.info_layout.count()):
+            widget = self.info_layout.itemAt(index).widget()
+            if isinstance(widget, QLabel) and widget.property("role"):
+                self.style_grid_label(widget)
+        
     def update_theme(self, theme_name):
         """Update the widget's theme to match the application theme"""
         self.current_theme = theme_name
         
-        # Get theme colors
-        themes = {
-            "Nord Dark (Default)": {
-                "main_bg": "#2E3440",
-                "secondary_bg": "#3B4252",
-                "highlight_bg": "#4C566A",
-                "accent": "#88C0D0",
-                "text": "#ECEFF4",
-                "secondary_text": "#D8DEE9",
-                "success": "#A3BE8C"
-            },
-            "Nord Light": {
-                "main_bg": "#ECEFF4",
-                "secondary_bg": "#E5E9F0",
-                "highlight_bg": "#D8DEE9",
-                "accent": "#5E81AC",
-                "text": "#2E3440",
-                "secondary_text": "#4C566A",
-                "success": "#A3BE8C"
-            },
-            "Dracula": {
-                "main_bg": "#282a36",
-                "secondary_bg": "#44475a",
-                "highlight_bg": "#6272a4",
-                "accent": "#8be9fd",
-                "text": "#f8f8f2",
-                "secondary_text": "#f8f8f2",
-                "success": "#50fa7b"
-            },
-            "Solarized Dark": {
-                "main_bg": "#002b36",
-                "secondary_bg": "#073642",
-                "highlight_bg": "#586e75",
-                "accent": "#2aa198",
-                "text": "#fdf6e3",
-                "secondary_text": "#eee8d5",
-                "success": "#859900"
-            },
-            "Solarized Light": {
-                "main_bg": "#fdf6e3",
-                "secondary_bg": "#eee8d5",
-                "highlight_bg": "#93a1a1",
-                "accent": "#2aa198",
-                "text": "#002b36",
-                "secondary_text": "#073642",
-                "success": "#859900"
-            }
-        }
-        
-        colors = themes.get(theme_name, themes["Nord Dark (Default)"])
+        colors = THEMES.get(theme_name, THEMES["Nord Dark (Default)"])
         
         # Apply styles to header
         self.header.setStyleSheet(f"color: {colors['text']};")
@@ -224,89 +294,28 @@ class ProfileWidget(QWidget):
         
         # Update command context widget theme
         self.command_context_widget.update_theme(theme_name)
+        self.monitor_widget.update_theme(colors)
         
-        # Refresh system info display to apply new styles
-        self.populate_system_info()
-        
-        # Update category headers and values
-        for row in range(self.info_layout.rowCount()):
-            widget_item = self.info_layout.itemAtPosition(row, 0)
-            if widget_item and widget_item.widget():
-                widget = widget_item.widget()
-                if isinstance(widget, QLabel):
-                    text = widget.text()
-                    if text in self.system_info:
-                        # This is a category header
-                        widget.setStyleSheet(f"color: {colors['accent']};")
-                    else:
-                        # This is a key label
-                        widget.setStyleSheet(f"color: {colors['text']};")
-            
-            value_item = self.info_layout.itemAtPosition(row, 1)
-            if value_item and value_item.widget():
-                value_widget = value_item.widget()
-                if isinstance(value_widget, QLabel):
-                    value_widget.setStyleSheet(f"color: {colors['success']};")
+        # Restyle the system info grid in place
+        self.restyle_grid()
     
     def update_font_size(self, font_size_name):
         """Update the widget's font sizes"""
         self.current_font_size = font_size_name
         
-        # Define font sizes for different elements
-        font_sizes = {
-            "Small": {
-                "header": 14,
-                "subheader": 12,
-                "normal": 9,
-                "small": 8
-            },
-            "Medium (Default)": {
-                "header": 16,
-                "subheader": 14,
-                "normal": 10,
-                "small": 9
-            },
-            "Large": {
-                "header": 18,
-                "subheader": 16,
-                "normal": 12,
-                "small": 10
-            },
-            "Extra Large": {
-                "header": 20,
-                "subheader": 18,
-                "normal": 14,
-                "small": 12
-            }
-        }
-        
-        sizes = font_sizes.get(font_size_name, font_sizes["Medium (Default)"])
+        sizes = FONT_SIZES.get(font_size_name, FONT_SIZES["Medium (Default)"])
         
         # Update header font
         self.header.setFont(QFont("Arial", sizes["header"], QFont.Bold))
         
         # Update command context widget font sizes
         self.command_context_widget.update_font_size(font_size_name)
+        self.monitor_widget.update_font_size(sizes)
         
-        # Refresh system info display to apply new font sizes
-        self.populate_system_info()
-        
-        # Update fonts in grid items
-        for row in range(self.info_layout.rowCount()):
-            widget_item = self.info_layout.itemAtPosition(row, 0)
-            if widget_item and widget_item.widget():
-                widget = widget_item.widget()
-                if isinstance(widget, QLabel):
-                    text = widget.text()
-                    if text in self.system_info:
-                        # This is a category header
-                        widget.setFont(QFont("Arial", sizes["subheader"], QFont.Bold))
-                    else:
-                        # This is a key label
-                        widget.setFont(QFont("Arial", sizes["normal"]))
-            
-            value_item = self.info_layout.itemAtPosition(row, 1)
-            if value_item and value_item.widget():
-                value_widget = value_item.widget()
-                if isinstance(value_widget, QLabel):
-                    value_widget.setFont(QFont("Arial", sizes["normal"]))
\ No newline at end of file
+        # Resize the system info grid in place
+        self.restyle_grid()
+
+
+def is_unresponsive(value):
+    """Whether a profile value is a mount that did not answer its probe"""
+    return isinstance(value, str) and value.startswith(UNRESPONSIVE)
@@ -0,0 +1,284 @@
+import time
+import asyncio
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QCheckBox, QComboBox, QSizePolicy
+from PyQt5.QtGui import QFont, QPainter, QColor, QPen, QPolygonF
+from PyQt5.QtCore import Qt, QPointF, QRectF, QTimer, pyqtSignal
+
+from utils.async_runner import shared_runner
+from utils.config import load_config
+from utils.output_buffer import format_size
+from utils.metrics_store import FIELDS, shared_metrics
+from utils.resource_monitor import ResourceMonitor, downsample
+
+
+class HistorySource:
+    """A stored range of the metrics history, read by the charts in place of the live monitor
+
+    The charts show the mean of each bucket; the value next to the title
+    is the average over the whole range.
+    """
+    def __init__(self):
+        self.columns = {}
+
+    def load(self, records):
+        self.columns = {field: [record[2 + i] for record in records] for i, field in enumerate(FIELDS)}
+
+    def downsampled(self, name, points):
+        return downsample(self.columns.get(name, []), points)
+
+    def latest(self, name):
+        values = self.columns.get(name)
+        return sum(values) / len(values) if values else None
+
+
+class Sparkline(QWidget):
+    """A small line chart of one monitor series with its title and latest value
+
+    The series is downsampled to at most one point per pixel of width when
+    painted, so drawing costs the same whatever the history length.
+    Percentages are drawn against 0-100; rates against their own peak.
+    """
+    def __init__(self, source, name, title, percent=True, height=44, parent=None):
+        super().__init__(parent)
+        self.source = source  # The live monitor, or a HistorySource
+        self.name = name
+        self.title = title
+        self.percent = percent
+        self.colors = {"background": "#2E3440", "line": "#88C0D0", "text": "#D8DEE9"}
+        self.setMinimumHeight(height)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setFont(QFont("Arial", 8))
+
+    def sizeHint(self):
+        return self.minimumSize().expandedTo(self.minimumSizeHint())
+
+    def format_value(self, value):
+        if value is None:
+            return "-"
+        return f"{value:.0f}%" if self.percent else f"{format_size(value)}/s"
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(self.colors["background"]))
+        metrics = painter.fontMetrics()
+        text_height = metrics.height()
+        painter.setPen(QColor(self.colors["text"]))
+        painter.drawText(QRectF(4, 1, self.width() - 8, text_height), Qt.AlignLeft,
+                         self.title)
+        painter.drawText(QRectF(4, 1, self.width() - 8, text_height), Qt.AlignRight,
+                         self.format_value(self.source.latest(self.name)))
+
+        chart = QRectF(2, text_height + 2, self.width() - 4, self.height() - text_height - 4)
+        values = self.source.downsampled(self.name, max(2, int(chart.width())))
+        if len(values) < 2:
+            return
+        top = 100.0 if self.percent else max(max(values), 1.0)
+        step = chart.width() / (len(values) - 1)
+        line = QPolygonF([
+            QPointF(chart.left() + i * step, chart.bottom() - min(value, top) / top * chart.height())
+            for i, value in enumerate(values)
+        ])
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor(self.colors["line"]), 1.5))
+        painter.drawPolyline(line)
+
+
+class ResourceMonitorWidget(QWidget):
+    """Live CPU, memory, swap, disk and network charts for the profile tab
+
+    The monitor samples in the background only while live monitoring is
+    turned on, at monitor_interval seconds, keeping monitor_history samples.
+    The charts are repainted after each sample only when they are on screen.
+    Samples also go to the on-disk metrics history, which the range selector
+    charts instead of the live samples. A stored range is read on the shared
+    loop's executor, never on the GUI thread, and read again only as often
+    as the tier it comes from can gain a record.
+    """
+    CHARTS = [
+        ("cpu", "CPU", True),
+        ("memory", "Memory", True),
+        ("swap", "Swap", True),
+        ("disk_read", "Disk Read", False),
+        ("disk_write", "Disk Write", False),
+        ("net_recv", "Network In", False),
+        ("net_sent", "Network Out", False),
+    ]
+    CORE_COLUMNS = 4
+    RANGES = [("Live", None), ("Last hour", 3600), ("Last 24 hours", 86400), ("Last 7 days", 7 * 86400)]
+    HISTORY_POINTS = 4000
+    # Bounds on how often a stored range is read again, in seconds
+    MIN_HISTORY_REFRESH = 5
+    MAX_HISTORY_REFRESH = 60
+
+    history_loaded = pyqtSignal(int, object, object)  # Generation, tier width, records
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        config = load_config()
+        self.monitor = ResourceMonitor(interval=config.get("monitor_interval", 1.0),
+                                       history=config.get("monitor_history", 600))
+        self.monitor.sampled.connect(self.on_sample)
+        self.store = shared_metrics()
+        if self.store is not None:
+            # Written on the sampling thread, so the disk never holds up the interface
+            self.monitor.sampled.connect(self.store.append, Qt.DirectConnection)
+        self.history_source = HistorySource()
+        self.history_generation = 0  # Bumped on every range change so late results are dropped
+        self.history_pending = False
+        self.history_loaded.connect(self.on_history_loaded)
+        self.history_timer = QTimer(self)
+        self.history_timer.setSingleShot(True)
+        self.history_timer.timeout.connect(self.load_history)
+        self.setup_ui()
+        if config.get("live_monitor", False):
+            self.toggle_checkbox.setChecked(True)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(8)
+
+        self.toggle_checkbox = QCheckBox("Live monitoring")
+        self.toggle_checkbox.setStyleSheet("color: #E5E9F0;")
+        self.toggle_checkbox.toggled.connect(self.set_monitoring)
+
+        self.range_combo = QComboBox()
+        for label, _ in self.RANGES:
+            self.range_combo.addItem(label)
+        self.range_combo.setEnabled(self.store is not None)
+        self.range_combo.currentIndexChanged.connect(self.set_range)
+
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(self.toggle_checkbox)
+        controls_layout.addStretch()
+        controls_layout.addWidget(self.range_combo)
+        layout.addLayout(controls_layout)
+
+        self.charts_container = QWidget()
+        charts_layout = QVBoxLayout(self.charts_container)
+        charts_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.sparklines = []
+        self.main_sparklines = []
+        main_grid = QGridLayout()
+        for i, (name, title, percent) in enumerate(self.CHARTS):
+            sparkline = Sparkline(self.monitor, name, title, percent)
+            self.sparklines.append(sparkline)
+            self.main_sparklines.append(sparkline)
+            main_grid.addWidget(sparkline, i // 2, i % 2)
+        charts_layout.addLayout(main_grid)
+
+        self.cores_label = QLabel("CPU per core")
+        self.cores_label.setStyleSheet("color: #88C0D0;")
+        charts_layout.addWidget(self.cores_label)
+        self.cores_container = QWidget()
+        cores_grid = QGridLayout(self.cores_container)
+        cores_grid.setContentsMargins(0, 0, 0, 0)
+        for core in range(self.monitor.cores):
+            sparkline = Sparkline(self.monitor, f"cpu{core}", f"Core {core}", height=32)
+            self.sparklines.append(sparkline)
+            cores_grid.addWidget(sparkline, core // self.CORE_COLUMNS, core % self.CORE_COLUMNS)
+        charts_layout.addWidget(self.cores_container)
+
+        self.charts_container.hide()
+        layout.addWidget(self.charts_container)
+
+    def history_range(self):
+        """Seconds of stored history being charted, or None for the live samples"""
+        return self.RANGES[self.range_combo.currentIndex()][1]
+
+    def set_monitoring(self, enabled):
+        if enabled:
+            self.monitor.start()
+        else:
+            self.monitor.stop()
+        self.update_visibility()
+
+    def set_range(self):
+        live = self.history_range() is None
+        for sparkline in self.main_sparklines:
+            sparkline.source = self.monitor if live else self.history_source
+        # Per-core CPU is not kept on disk
+        self.cores_label.setVisible(live)
+        self.cores_container.setVisible(live)
+        self.update_visibility()
+        self.history_generation += 1
+        self.history_timer.stop()
+        self.history_source.load([])
+        self.load_history()
+        self.refresh()
+
+    def update_visibility(self):
+        self.charts_container.setVisible(self.toggle_checkbox.isChecked() or self.history_range() is not None)
+
+    def load_history(self):
+        """Read the charted range, if any, from the metrics history off the GUI thread"""
+        seconds = self.history_range()
+        if seconds is None or self.store is None or self.history_pending:
+            return
+        self.history_pending = True
+        shared_runner().submit(self.query_history(self.history_generation, seconds))
+
+    async def query_history(self, generation, seconds):
+        now = time.time()
+        try:
+            # Opening the store and reading it both touch the disk
+            width, records = await asyncio.get_running_loop().run_in_executor(
+                None, self.store.query, now - seconds, now, self.HISTORY_POINTS)
+        except Exception as e:
+            print(f"Metrics history error: {e}")
+            width, records = None, []
+        self.history_loaded.emit(generation, width, records)
+
+    def on_history_loaded(self, generation, width, records):
+        self.history_pending = False
+        if generation != self.history_generation:
+            self.load_history()  # The range changed while this one was read
+            return
+        self.history_source.load(records)
+        self.refresh()
+        if width is not None:
+            # The chart only changes when the tier gains a record (or its open bucket moves)
+            interval = min(max(width, self.MIN_HISTORY_REFRESH), self.MAX_HISTORY_REFRESH)
+            self.history_timer.start(int(interval * 1000))
+
+    def refresh(self):
+        """Repaint the charts"""
+        for sparkline in self.sparklines:
+            sparkline.update()
+
+    def on_sample(self, sample):
+        # Painting is what costs; charts that are not on screen are left alone,
+        # and a stored range is reloaded on its own timer
+        if self.charts_container.isVisible() and self.history_range() is None:
+            self.refresh()
+
+    def stop(self):
+        self.history_timer.stop()
+        self.monitor.stop()
+
+    def update_theme(self, colors):
+        """Restyle with a theme's color dict, as used by the profile widget"""
+        self.toggle_checkbox.setStyleSheet(f"color: {colors['text']};")
+        self.range_combo.setStyleSheet(f"""
+            QComboBox {{
+                background-color: {colors['main_bg']};
+                color: {colors['text']};
+                border: 1px solid {colors['highlight_bg']};
+                border-radius: 3px;
+                padding: 3px 8px;
+            }}
+        """)
+        self.cores_label.setStyleSheet(f"color: {colors['accent']};")
+        for sparkline in self.sparklines:
+            sparkline.colors = {"background": colors['main_bg'], "line": colors['accent'],
+                                "text": colors['secondary_text']}
+            sparkline.update()
+
+    def update_font_size(self, sizes):
+        """Resize text with a font size dict, as used by the profile widget"""
+        self.toggle_checkbox.setFont(QFont("Arial", sizes["normal"]))
+        self.range_combo.setFont(QFont("Arial", sizes["normal"]))
+        self.cores_label.setFont(QFont("Arial", sizes["normal"], QFont.Bold))
+        for sparkline in self.sparklines:
+            sparkline.setFont(QFont("Arial", sizes["small"]))
@@ -0,0 +1,108 @@
+import re
+
+from utils.output_compactor import ANSI_PATTERN
+
+# Select Graphic Rendition: the escape sequences that set colors and text attributes
+SGR_PATTERN = re.compile(rb"\x1b\[([0-9;:]*)m")
+
+# (foreground, background, bold, underline); colors are "#rrggbb" strings, None for the default
+DEFAULT_STATE = (None, None, False, False)
+
+# The 16 standard terminal colors, in the Nord palette the rest of the application uses
+BASIC_COLORS = [
+    "#3B4252", "#BF616A", "#A3BE8C", "#EBCB8B", "#81A1C1", "#B48EAD", "#88C0D0", "#E5E9F0",
+    "#4C566A", "#D08770", "#B9D395", "#F0D399", "#5E81AC", "#C895BF", "#8FBCBB", "#ECEFF4"
+]
+
+
+def color_256(index):
+    """The color of an xterm 256-color palette entry"""
+    if index < 16:
+        return BASIC_COLORS[index]
+    if index < 232:
+        index -= 16
+        levels = [0, 95, 135, 175, 215, 255]
+        r, g, b = levels[index // 36], levels[index // 6 % 6], levels[index % 6]
+    else:
+        r = g = b = 8 + (index - 232) * 10
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def apply_sgr(state, params):
+    """Return the state after an SGR sequence with the given parameter string"""
+    fg, bg, bold, underline = state
+    codes = [int(code) if code.isdigit() else 0 for code in params.replace(":", ";").split(";")]
+    i = 0
+    while i < len(codes):
+        code = codes[i]
+        if code == 0:
+            fg, bg, bold, underline = DEFAULT_STATE
+        elif code == 1:
+            bold = True
+        elif code == 4:
+            underline = True
+        elif code == 22:
+            bold = False
+        elif code == 24:
+            underline = False
+        elif 30 <= code <= 37:
+            fg = BASIC_COLORS[code - 30]
+        elif 90 <= code <= 97:
+            fg = BASIC_COLORS[code - 90 + 8]
+        elif code == 39:
+            fg = None
+        elif 40 <= code <= 47:
+            bg = BASIC_COLORS[code - 40]
+        elif 100 <= code <= 107:
+            bg = BASIC_COLORS[code - 100 + 8]
+        elif code == 49:
+            bg = None
+        elif code in (38, 48) and i + 1 < len(codes):
+            # Extended colors: 5;n for the 256-color palette, 2;r;g;b for true color
+            color = None
+            if codes[i + 1] == 5 and i + 2 < len(codes):
+                color = color_256(min(codes[i + 2], 255))
+                i += 2
+            elif codes[i + 1] == 2 and i + 4 < len(codes):
+                color = "#{:02x}{:02x}{:02x}".format(*(min(value, 255) for value in codes[i + 2:i + 5]))
+                i += 4
+            if code == 38:
+                fg = color
+            else:
+                bg = color
+        i += 1
+    return (fg, bg, bold, underline)
+
+
+def state_after(state, data):
+    """Return the state after the SGR sequences in a run of raw output bytes"""
+    if b"\x1b" not in data:
+        return state
+    for match in SGR_PATTERN.finditer(data):
+        state = apply_sgr(state, match.group(1).decode("ascii"))
+    return state
+
+
+def styled_segments(text, state):
+    """Split one line into (text, state) segments, dropping every escape sequence"""
+    if "\x1b" not in text:
+        return [(text, state)] if text else []
+    segments = []
+    position = 0
+    for match in ANSI_PATTERN.finditer(text):
+        if match.start() > position:
+            segments.append((text[position:match.start()], state))
+        sequence = match.group()
+        if sequence.startswith("\x1b[") and sequence.endswith("m"):
+            state = apply_sgr(state, sequence[2:-1])
+        position = match.end()
+    if position < len(text):
+        segments.append((text[position:], state))
+    return segments
+
+
+def colorize(text, color):
+    """Wrap every line of text in a true-color SGR sequence, so each line carries its own color"""
+    r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    start = f"\x1b[38;2;{r};{g};{b}m"
+    return "\n".join(f"{start}{line}\x1b[39m" if line else line for line in text.split("\n"))
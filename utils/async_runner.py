@@ -0,0 +1,209 @@
+import asyncio
+from PyQt5.QtCore import QThread, QObject, pyqtSignal
+
+from services.token_estimator import estimate_tokens
+
+class AsyncRunner(QThread):
+    """Thread hosting a single asyncio event loop shared by all AI requests
+
+    Coroutines are submitted from the GUI thread and results come back through
+    Qt signals, so any number of requests can be in flight without a thread each.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.loop = asyncio.new_event_loop()
+        self.cleanups = []  # Coroutine functions awaited before the loop shuts down
+
+    def run(self):
+        """Run the event loop until stop() is called"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop and return a concurrent.futures.Future
+
+        Cancelling the returned future cancels the task on the loop.
+        """
+        if not self.isRunning():
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def add_cleanup(self, coro_function):
+        """Register a coroutine function to await at shutdown (e.g. closing sessions)"""
+        self.cleanups.append(coro_function)
+
+    def stop(self, timeout_ms=2000):
+        """Cancel outstanding tasks, run the cleanups and stop the loop"""
+        if not self.isRunning():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        self.wait(timeout_ms)
+
+    async def _shutdown(self):
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for cleanup in self.cleanups:
+            try:
+                await cleanup()
+            except Exception as e:
+                print(f"Error during async shutdown: {e}")
+        self.loop.stop()
+
+
+_shared_runner = None
+
+def shared_runner():
+    """Return the application-wide AsyncRunner"""
+    global _shared_runner
+    if _shared_runner is None:
+        _shared_runner = AsyncRunner()
+    return _shared_runner
+
+
+class ResponseTask(QObject):
+    """A single AI request running on the shared event loop (asyncio counterpart of ResponseThread)"""
+    response_received = pyqtSignal(str)
+    partial_received = pyqtSignal(str)  # Emitted for each streamed piece of the response
+
+    def __init__(self, async_client, prompt, system_context, stream=False, use_cache=True,
+                 timeout=None, history=None, runner=None):
+        super().__init__()
+        self.async_client = async_client
+        self.prompt = prompt
+        self.system_context = system_context
+        self.stream = stream
+        self.use_cache = use_cache
+        self.timeout = timeout
+        self.history = history
+        self.runner = runner or shared_runner()
+        self.future = None
+
+    def start(self):
+        """Submit the request to the event loop"""
+        self.future = self.runner.submit(self.run())
+
+    async def run(self):
+        """Get response from AI API"""
+        try:
+            if self.stream:
+                # A stream that breaks off yields only its error, which keeps it out of the history
+                response = await self.async_client.collect_stream(
+                    self.prompt, self.system_context, on_partial=self.partial_received.emit,
+                    use_cache=self.use_cache, timeout=self.timeout, history=self.history)
+            else:
+                response = await self.async_client.get_response(
+                    self.prompt, self.system_context, use_cache=self.use_cache,
+                    timeout=self.timeout, history=self.history)
+            self.response_received.emit(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.response_received.emit(f"Error getting response: {str(e)}")
+
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
+
+    def stop(self):
+        """Cancel the request; the task is cancelled on the loop without blocking"""
+        if self.future is not None:
+            self.future.cancel()
+
+
+class MapReduceTask(QObject):
+    """Chunked analysis of a large output on the shared event loop (see MapReduceAnalyzer)"""
+    response_received = pyqtSignal(str)
+    partial_received = pyqtSignal(str)  # Streamed pieces of the final answer
+    progress = pyqtSignal(int, int)     # Requests finished, requests planned
+
+    def __init__(self, analyzer, text, subject, system_context, use_cache=True, runner=None):
+        super().__init__()
+        self.analyzer = analyzer
+        self.text = text
+        self.subject = subject
+        self.system_context = system_context
+        self.use_cache = use_cache
+        self.runner = runner or shared_runner()
+        self.future = None
+
+    def start(self):
+        """Submit the analysis to the event loop"""
+        self.future = self.runner.submit(self.run())
+
+    async def run(self):
+        try:
+            response = await self.analyzer.analyze(
+                self.text, self.subject, self.system_context, use_cache=self.use_cache,
+                on_progress=self.progress.emit, on_partial=self.partial_received.emit)
+            self.response_received.emit(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.response_received.emit(f"Error getting response: {str(e)}")
+
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
+
+    def stop(self):
+        """Cancel every chunk request still queued or in flight"""
+        if self.future is not None:
+            self.future.cancel()
+
+
+class CompactionTask(QObject):
+    """Reads and compacts output for analysis on a worker thread, keeping multi-MB logs off the GUI thread
+
+    The output is given as text or as the path of a file to read. prepared
+    carries the compacted text, the compaction stats and the number of
+    chunks it splits into, or 0 when it fits in one of the analyzer's chunks
+    and is sent in a single request. Only output sent in a single request
+    is windowed; what is chunked is analyzed in full.
+    """
+    prepared = pyqtSignal(str, dict, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, compactor, analyzer, text=None, path=None, runner=None):
+        super().__init__()
+        self.compactor = compactor
+        self.analyzer = analyzer
+        self.text = text
+        self.path = path
+        self.runner = runner or shared_runner()
+        self.future = None
+
+    def start(self):
+        self.future = self.runner.submit(self.run())
+
+    async def run(self):
+        try:
+            compacted, stats, chunks = await asyncio.get_running_loop().run_in_executor(None, self.prepare)
+        except OSError as e:
+            self.failed.emit(f"Could not read {self.path}: {e}")
+            return
+        self.prepared.emit(compacted, stats, chunks)
+
+    def prepare(self):
+        text = self.text
+        if self.path is not None:
+            with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        # One threshold decides both: what fits a chunk is one request, anything larger is chunked
+        limit = self.analyzer.chunk_tokens
+        compacted, stats = self.compactor.compact(text, chunk_tokens=limit)
+        chunks = self.analyzer.count_chunks(compacted) if estimate_tokens(compacted) > limit else 0
+        return compacted, stats, chunks
+
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
+
+    def stop(self):
+        """Drop the result; a read or compaction under way finishes on its thread and is ignored"""
+        if self.future is not None:
+            self.future.cancel()
@@ -0,0 +1,117 @@
+import os
+import shlex
+import shutil
+import threading
+
+# Characters that only mean something to a shell: pipes, redirection, command
+# lists, subshells, expansions, globs, comments, escapes and home directories
+SHELL_METACHARACTERS = frozenset("|&;<>()$`\\*?[]{}~#!\n")
+
+# Words a shell handles itself; they have no executable, or one that cannot
+# change the shell's state the way the user expects (cd, export, ...)
+SHELL_WORDS = frozenset([
+    ".", ":", "[[", "alias", "bg", "bind", "break", "builtin", "case", "cd", "command", "continue",
+    "declare", "dirs", "disown", "do", "done", "elif", "else", "esac", "eval", "exec", "exit", "export",
+    "fc", "fg", "fi", "for", "function", "getopts", "hash", "history", "if", "jobs", "let", "local",
+    "logout", "popd", "pushd", "read", "readonly", "return", "select", "set", "shift", "shopt", "source",
+    "suspend", "then", "time", "times", "trap", "type", "typeset", "ulimit", "umask", "unalias", "unset",
+    "until", "wait", "while",
+])
+
+
+def needs_shell(command):
+    """True if command uses shell syntax outside quotes, or expansions inside double quotes"""
+    quote = None
+    for char in command:
+        if quote == "'":
+            if char == "'":
+                quote = None
+        elif quote == '"':
+            if char == '"':
+                quote = None
+            elif char in "$`\\!":
+                return True
+        elif char in "'\"":
+            quote = char
+        elif char in SHELL_METACHARACTERS:
+            return True
+    return False
+
+
+def split_simple(command):
+    """Split a command that needs no shell into its arguments, or return None
+
+    A command is simple when it is a plain program name followed by
+    arguments, optionally quoted, without anything a shell would expand or
+    interpret. Running such a command directly gives the same result as
+    running it through the shell, minus the shell.
+    """
+    if os.name == "nt":
+        return None  # cmd.exe resolves .cmd/.bat scripts and built-ins such as dir
+    if not command or needs_shell(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None  # Unbalanced quotes: let the shell report it
+    if not argv or argv[0] in SHELL_WORDS or "=" in argv[0]:
+        return None  # Built-ins, keywords and VAR=value prefixes
+    return argv
+
+
+class ExecutableCache:
+    """Remembers where programs were found on the PATH
+
+    A hit is checked with a single access() call instead of a walk over
+    every PATH directory; the cache is keyed by the PATH value, so changing
+    PATH starts over. Misses are not remembered, so newly installed tools are
+    found right away.
+    """
+    def __init__(self):
+        self.paths = {}
+        self.lock = threading.Lock()
+
+    def find(self, name):
+        """Return the absolute path of the program name, or None"""
+        if os.sep in name:
+            return None  # Relative to the working directory; the caller runs it as given
+        search_path = os.environ.get("PATH", os.defpath)
+        key = (name, search_path)
+        with self.lock:
+            path = self.paths.get(key)
+        if path is not None and os.access(path, os.X_OK) and not os.path.isdir(path):
+            return path
+        path = shutil.which(name, path=search_path)
+        if path is None or not os.path.isabs(path):
+            return None  # Relative PATH entries depend on the directory the command runs in
+        with self.lock:
+            self.paths[key] = path
+        return path
+
+    def clear(self):
+        with self.lock:
+            self.paths.clear()
+
+
+_executables = ExecutableCache()
+
+def find_executable(name):
+    """Cached PATH lookup shared by the whole application"""
+    return _executables.find(name)
+
+
+def direct_command(command):
+    """Return (executable, argv) for running command without a shell, or None if it needs one
+
+    Programs that are not on the PATH go through the shell too, so the user
+    sees the shell's usual "command not found" message.
+    """
+    argv = split_simple(command)
+    if argv is None:
+        return None
+    if os.sep in argv[0]:
+        return argv[0], argv
+    executable = find_executable(argv[0])
+    if executable is None:
+        return None
+    return executable, argv
@@ -1,42 +1,300 @@
 import subprocess
-from PyQt5.QtCore import QThread, pyqtSignal
+import threading
+import codecs
+import locale
+import signal
+import time
+from PyQt5.QtCore import QObject, pyqtSignal
 import os
 
-class CommandWorker(QThread):
-    """Thread worker for running commands asynchronously with custom working directory"""
-    
+from utils.command_line import direct_command
+from utils.ansi import colorize
+from utils.output_buffer import OutputBuffer
+from utils.resource_usage import ProcessTreeSampler, wait_with_rusage
+from utils.run_history import shared_history
+
+STDERR_COLOR = "#BF616A"
+
+# How a command ended
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+STATUS_TIMED_OUT = "timed-out"
+
+
+class CommandWorker(QObject):
+    """Worker for running commands with custom working directory
+
+    run() blocks, so workers are executed on a JobScheduler pool thread; the
+    signals reach widgets on the GUI thread as queued connections.
+
+    The command runs in its own process group so that cancelling it, or
+    running past its timeout, stops everything the shell started: the group
+    gets SIGTERM first and SIGKILL if it is still alive after kill_grace seconds.
+
+    The complete output is captured in an OutputBuffer per stream, which
+    spills to a temp file past its memory limit; finished then carries the
+    head and tail of a spilled stream. The buffers are closed once finished
+    has been emitted and the run recorded, so a finished worker holds no
+    output.
+
+    Given a display_buffer, usually the buffer of an OutputView, the worker
+    also writes both streams into it as they arrive, with errors in red, so
+    the view can show them without any signal traffic.
+
+    Given a ShellSession, the command runs in that long-lived shell instead
+    of a new one, keeping the directory and environment it leaves behind.
+    Otherwise a simple command (a program and its arguments, nothing for a
+    shell to interpret) is started directly, without a shell in between.
+
+    What the command cost is recorded in usage, a ResourceUsage, before
+    completed is emitted: CPU time and peak memory from wait4's rusage,
+    topped up by sampling the process tree every sample_interval seconds
+    (the only source for session commands, which are not reaped).
+    Unless record is False, the finished run is then stored in the shared
+    RunHistory.
+    """
+
     finished = pyqtSignal(str, str)  # Signal emitted when command execution finishes (stdout, stderr)
-    
-    def __init__(self, command, working_dir=None):
+    completed = pyqtSignal(int, float, str)  # Exit code, elapsed seconds and status, emitted just before finished
+
+    def __init__(self, command, working_dir=None, timeout=None, kill_grace=3.0,
+                 buffer_options=None, display_buffer=None, session=None, direct=True,
+                 sample_interval=0.2, record=True):
         super().__init__()
         self.command = command
         # Ensure working directory is properly set and validated
         self.working_dir = working_dir if working_dir and os.path.exists(working_dir) else os.getcwd()
-        
+        self.session = session
+        self.direct = direct  # Skip the shell for commands that do not need one
+        self.timeout = timeout  # Seconds; None or 0 means no limit
+        self.kill_grace = kill_grace
+        self.exit_code = None
+        self.elapsed = 0.0
+        self.status = None
+        self.process = None
+        self.cancelled = False
+        self.stop_requested_at = None  # When SIGTERM was sent, for the SIGKILL escalation
+        self.deadline = None
+        self.timed_out = False
+        self.sample_interval = sample_interval
+        self.sampler = None
+        self.rusage = None
+        self.usage = None  # ResourceUsage, once the command has finished
+        self.record = record
+
+        # Everything, for the finished signal and the output viewer
+        self.stdout_buffer = OutputBuffer(**(buffer_options or {}))  # Closed once the run is over
+        self.stderr_buffer = OutputBuffer(**(buffer_options or {}))
+        self.captured = {"stdout": self.stdout_buffer, "stderr": self.stderr_buffer}
+        self.display_buffer = display_buffer
+        self.output_event = threading.Event()
+
     def run(self):
         """Run the command in the specified working directory"""
+        start = time.monotonic()
+        started_at = time.time()
+        self.deadline = start + self.timeout if self.timeout else None
         try:
             # Log the execution details for debugging
             print(f"Executing command: {self.command}")
             print(f"Working directory: {self.working_dir}")
-            
-            # Use the specified working directory
-            result = subprocess.run(
-                self.command,
-                capture_output=True,
-                text=True,
-                shell=True,
-                cwd=self.working_dir  # This specifies the working directory for the command
-            )
-            
+
+            if self.session is not None:
+                self.exit_code = self.run_in_session()
+            else:
+                self.exit_code = self.run_process()
+
+            if self.timed_out:
+                self.status = STATUS_TIMED_OUT
+            elif self.cancelled:
+                self.status = STATUS_CANCELLED
+            else:
+                self.status = STATUS_DONE
+
             # Process the results
-            stdout = result.stdout.strip() if result.stdout else ""
-            stderr = result.stderr.strip() if result.stderr else ""
-            
+            stdout = self.stdout_buffer.text().strip()
+            stderr = self.stderr_buffer.text().strip()
+
             # Emit the results
+            self.elapsed = time.monotonic() - start
+            if self.sampler is not None:
+                self.usage = self.sampler.usage(self.elapsed, self.rusage)
+            self.completed.emit(self.exit_code, self.elapsed, self.status)
             self.finished.emit(stdout, stderr)
-            
+
+            history = shared_history() if self.record and self.usage is not None else None
+            if history is not None:
+                history.record(self.command, self.working_dir, started_at, self.exit_code, self.status,
+                               self.usage, stdout, stderr)
+
         except Exception as e:
             error_msg = f"Error executing command: {str(e)}"
             print(error_msg)
-            self.finished.emit("", error_msg)
\ No newline at end of file
+            if self.sampler is not None:
+                self.sampler.stop_event.set()
+            self.exit_code = -1
+            self.status = STATUS_CANCELLED if self.cancelled else STATUS_DONE
+            self.elapsed = time.monotonic() - start
+            self.completed.emit(self.exit_code, self.elapsed, self.status)
+            self.finished.emit("", error_msg)
+        finally:
+            # Receivers got their copy with finished, and the view keeps its own
+            self.stdout_buffer.close()
+            self.stderr_buffer.close()
+
+    def run_process(self):
+        """Run the command in a process of its own and return its exit code"""
+        process = self.process = self.start_process()
+        self.sampler = ProcessTreeSampler(process.pid, self.sample_interval).start()
+        if self.cancelled:
+            self.request_stop()  # Cancelled while the process was being started
+
+        # One reader per pipe; reading both from one thread could deadlock on a full pipe
+        readers = [
+            threading.Thread(target=self.read_pipe, args=(process.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self.read_pipe, args=(process.stderr, "stderr"), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+
+        # Watch the deadline until the command exits and both pipes are drained
+        while any(reader.is_alive() for reader in readers):
+            if self.output_event.wait(0.25):
+                self.output_event.clear()
+            self.check_deadline()
+
+        for reader in readers:
+            reader.join()
+        self.sampler.stop()
+        exit_code, self.rusage = wait_with_rusage(process)
+        return exit_code
+
+    def start_process(self):
+        """Start the command directly when it needs no shell, through the shell otherwise"""
+        options = dict(
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.working_dir,  # This specifies the working directory for the command
+            **process_group_options()
+        )
+        direct = direct_command(self.command) if self.direct else None
+        if direct is not None:
+            executable, argv = direct
+            try:
+                return subprocess.Popen(argv, executable=executable, **options)
+            except OSError:
+                pass  # Not runnable after all; the shell reports why
+        return subprocess.Popen(self.command, shell=True, **options)
+
+    def run_in_session(self):
+        """Run the command in the persistent shell session and return its exit code"""
+        decoders = {
+            name: codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace")
+            for name in ("stdout", "stderr")
+        }
+
+        def started(process):
+            self.process = process
+            if self.cancelled:
+                return False  # Cancelled while waiting for the session's previous command
+            # The timeout covers this command, not the wait for the one before it
+            self.deadline = time.monotonic() + self.timeout if self.timeout else None
+            # The shell's counters include its reaped children: what they grow by is this command
+            self.sampler = ProcessTreeSampler(process.pid, self.sample_interval, include_root=False).start()
+            return True
+
+        def output(name, data):
+            self.add_output(name, decoders[name].decode(data))
+
+        exit_code = self.session.execute(self.command, output, self.check_deadline, started)
+        if self.sampler is not None:
+            self.sampler.stop()
+        for name, decoder in decoders.items():
+            self.add_output(name, decoder.decode(b"", final=True))
+        return -1 if exit_code is None else exit_code
+
+    def check_deadline(self):
+        """Stop the command once it runs past its timeout, and force it if SIGTERM was not enough"""
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline and self.stop_requested_at is None:
+            self.timed_out = True
+            self.request_stop()
+        if self.stop_requested_at is not None and now - self.stop_requested_at >= self.kill_grace:
+            # Still holding the pipes after SIGTERM: force it
+            kill_process_group(self.process, force=True)
+            self.stop_requested_at = now  # Repeat only after another grace period
+
+    def cancel(self):
+        """Stop the command; safe to call from any thread and never blocks"""
+        self.cancelled = True
+        self.request_stop()
+
+    def skip(self):
+        """Report a cancellation before run() started, through completed as run() would have"""
+        self.cancelled = True
+        self.exit_code = -1
+        self.status = STATUS_CANCELLED
+        self.stdout_buffer.close()
+        self.stderr_buffer.close()
+        self.completed.emit(self.exit_code, self.elapsed, self.status)
+
+    def kill(self):
+        """SIGKILL the whole process group right away (used when the application quits)"""
+        self.cancelled = True
+        if self.process is not None:
+            kill_process_group(self.process, force=True)
+
+    def request_stop(self):
+        """Send SIGTERM to the process group; run() escalates to SIGKILL if needed"""
+        process = self.process
+        if process is None or self.stop_requested_at is not None:
+            return
+        self.stop_requested_at = time.monotonic()
+        kill_process_group(process, force=False)
+        self.output_event.set()  # Wake the waiting loop
+
+    def read_pipe(self, pipe, name):
+        """Collect output from one pipe as it arrives"""
+        # Same encoding text=True would use, decoded incrementally so split characters survive
+        decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace")
+        try:
+            while True:
+                data = pipe.read1(65536)
+                self.add_output(name, decoder.decode(data, final=not data))
+                if not data:
+                    break
+        finally:
+            pipe.close()
+            self.output_event.set()  # Wake the waiting loop so it notices the pipe closed
+
+    def add_output(self, name, text):
+        """Record a piece of output from one stream"""
+        if not text:
+            return
+        self.captured[name].write(text)
+        if self.display_buffer is not None:
+            self.display_buffer.write(text if name == "stdout" else colorize(text, STDERR_COLOR))
+
+
+def process_group_options():
+    """Popen arguments that put the command and its children in a group of their own"""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_group(process, force=False):
+    """Terminate (or with force, kill) a process and everything it started"""
+    try:
+        if os.name == "nt":
+            # taskkill walks the child tree, which Windows process groups do not cover
+            args = ["taskkill", "/T", "/PID", str(process.pid)]
+            if force:
+                args.insert(1, "/F")
+            subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            # start_new_session made the shell the leader, so its pid is the group id
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except OSError:
+        pass  # Already gone
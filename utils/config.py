@@ -0,0 +1,20 @@
+import os
+import json
+
+def get_config_dir():
+    """Return the application data directory (~/.rapture), creating it if needed"""
+    config_dir = os.path.join(os.path.expanduser("~"), ".rapture")
+    if not os.path.exists(config_dir):
+        os.makedirs(config_dir)
+    return config_dir
+
+def load_config():
+    """Load ~/.rapture/config.json; returns an empty dict if it is missing or unreadable"""
+    config_file = os.path.join(get_config_dir(), "config.json")
+    if os.path.exists(config_file):
+        try:
+            with open(config_file, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error loading settings: {e}")
+    return {}
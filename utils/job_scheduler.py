@@ -0,0 +1,198 @@
+import heapq
+import itertools
+import time
+from collections import deque
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from utils.command_worker import STATUS_TIMED_OUT
+from utils.config import load_config
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed-out"
+
+# Lower values run first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+
+class Job(QObject):
+    """A unit of work tracked by the JobScheduler
+
+    The target is any object with a blocking run() method, and optionally
+    cancel(), and skip() to report a cancellation before it ever ran; for
+    commands it is a CommandWorker. Once the job is finished
+    the target is released, keeping only its exit code and usage, so the
+    history does not hold on to a command's captured output.
+    """
+    state_changed = pyqtSignal(str)
+
+    def __init__(self, job_id, label, target, priority=PRIORITY_NORMAL):
+        super().__init__()
+        self.id = job_id
+        self.label = label
+        self.target = target
+        self.priority = priority
+        self.state = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.exit_code = None
+        self.usage = None
+
+    def duration(self):
+        """Seconds spent running so far, or in total once finished"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def is_finished(self):
+        return self.state in (DONE, CANCELLED, TIMED_OUT)
+
+    def set_state(self, state):
+        self.state = state
+        self.state_changed.emit(state)
+
+    def release(self):
+        """Keep the target's exit code and usage, and drop the target itself"""
+        self.exit_code = getattr(self.target, "exit_code", None)
+        self.usage = getattr(self.target, "usage", None)
+        self.target = None
+
+
+class JobRunnable(QRunnable):
+    """Runs one job on a QThreadPool thread and reports back to the scheduler"""
+    def __init__(self, scheduler, job):
+        super().__init__()
+        self.scheduler = scheduler
+        self.job = job
+
+    def run(self):
+        try:
+            self.job.target.run()
+        except Exception as e:
+            print(f"Error running job '{self.job.label}': {e}")
+        finally:
+            # Queued back to the scheduler's (GUI) thread
+            self.scheduler.job_finished.emit(self.job)
+
+
+class JobScheduler(QObject):
+    """Runs background jobs on a bounded thread pool in priority order
+
+    Jobs wait in a priority queue (FIFO within a priority) until a pool thread
+    is free. Finished jobs are released automatically; only the last
+    history_size are kept for the jobs panel.
+    """
+    jobs_changed = pyqtSignal()
+    job_finished = pyqtSignal(object)
+
+    def __init__(self, max_workers=4, history_size=50):
+        super().__init__()
+        self.max_workers = max_workers
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_workers)
+        self.queue = []  # Heap of (priority, sequence, job)
+        self.sequence = itertools.count()
+        self.running = set()
+        self.history = deque(maxlen=history_size)
+        self.ids = itertools.count(1)
+        self.job_finished.connect(self.on_job_finished)
+
+    def submit(self, target, label, priority=PRIORITY_NORMAL):
+        """Queue a target with a blocking run() method and return its Job
+
+        The job may start right away, so connect to the target's signals first.
+        """
+        job = Job(next(self.ids), label, target, priority)
+        heapq.heappush(self.queue, (priority, next(self.sequence), job))
+        self.dispatch()
+        self.jobs_changed.emit()
+        return job
+
+    def cancel(self, job):
+        """Cancel a queued job, or ask a running one to stop"""
+        if job.state == QUEUED:
+            # Left in the heap and skipped when popped
+            job.finished_at = time.time()
+            job.set_state(CANCELLED)
+            # The target never runs, so it reports the cancellation itself for whoever waits on it
+            skip = getattr(job.target, "skip", None)
+            if skip is not None:
+                skip()
+            job.release()
+            self.history.append(job)
+            self.jobs_changed.emit()
+        elif job.state == RUNNING:
+            job.set_state(CANCELLED)
+            cancel = getattr(job.target, "cancel", None)
+            if cancel is not None:
+                cancel()
+            self.jobs_changed.emit()
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            self.cancel(job)
+
+    def active_jobs(self):
+        """Running jobs followed by queued ones in the order they will run"""
+        queued = [job for _, _, job in sorted(self.queue) if job.state == QUEUED]
+        running = sorted(self.running, key=lambda job: job.started_at)
+        return running + queued
+
+    def jobs(self):
+        """Every job the panel shows: active ones first, then the most recent finished ones"""
+        return self.active_jobs() + list(reversed(self.history))
+
+    def clear_history(self):
+        self.history.clear()
+        self.jobs_changed.emit()
+
+    def dispatch(self):
+        """Start queued jobs while pool threads are free"""
+        while self.queue and len(self.running) < self.max_workers:
+            _, _, job = heapq.heappop(self.queue)
+            if job.state != QUEUED:
+                continue
+            job.started_at = time.time()
+            job.set_state(RUNNING)
+            self.running.add(job)
+            self.pool.start(JobRunnable(self, job))
+
+    def on_job_finished(self, job):
+        self.running.discard(job)
+        job.finished_at = time.time()
+        if getattr(job.target, "status", None) == STATUS_TIMED_OUT:
+            job.set_state(TIMED_OUT)
+        elif job.state == RUNNING:
+            job.set_state(DONE)
+        # Only the summary is kept; the target and its output are freed with the last other reference
+        job.release()
+        self.history.append(job)
+        self.dispatch()
+        self.jobs_changed.emit()
+
+    def shutdown(self, timeout_ms=3000):
+        """Cancel everything, then kill whatever is still running after timeout_ms"""
+        self.cancel_all()
+        if self.pool.waitForDone(timeout_ms):
+            return
+        for job in list(self.running):
+            kill = getattr(job.target, "kill", None)
+            if kill is not None:
+                kill()
+        self.pool.waitForDone(1000)
+
+
+_shared_scheduler = None
+
+def shared_scheduler():
+    """Return the application-wide JobScheduler"""
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        _shared_scheduler = JobScheduler(max_workers=load_config().get("max_parallel_jobs", 4))
+    return _shared_scheduler
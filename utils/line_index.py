@@ -0,0 +1,110 @@
+import bisect
+from array import array
+
+from utils.ansi import DEFAULT_STATE, state_after
+
+
+class LineIndex:
+    """Sparse index of the lines in an OutputBuffer
+
+    Instead of one offset per line, a checkpoint is recorded at the first
+    line starting after every checkpoint_bytes bytes, with its line number
+    and the color state in effect there. Finding a line is a binary search
+    over the checkpoints plus a scan of at most one checkpoint's worth of
+    bytes, so 10 million lines need a few thousand checkpoints rather than
+    80 MB of offsets.
+    """
+    def __init__(self, buffer, checkpoint_bytes=64 * 1024, max_line_bytes=4096):
+        self.buffer = buffer
+        self.checkpoint_bytes = checkpoint_bytes
+        self.max_line_bytes = max_line_bytes  # Longer lines are cut when read for display
+        self.checkpoint_lines = array("Q", [0])
+        self.checkpoint_offsets = array("Q", [0])
+        self.checkpoint_states = [DEFAULT_STATE]
+        self.indexed = 0  # Bytes of the buffer covered so far
+        self.newlines = 0
+        self.state = DEFAULT_STATE  # Color state at self.indexed
+
+    def line_count(self):
+        """Lines indexed so far, counting an unterminated last line"""
+        partial = self.indexed > 0 and self.buffer.read(self.indexed - 1, self.indexed) != b"\n"
+        return self.newlines + partial
+
+    def update(self, max_bytes=16 * 1024 * 1024):
+        """Index output appended since the last call, at most max_bytes of it; returns True if anything was added"""
+        end = min(self.buffer.size, self.indexed + max_bytes)
+        if end <= self.indexed:
+            return False
+        while self.indexed < end:
+            data = self.buffer.read(self.indexed, min(end, self.indexed + 1024 * 1024))
+            if not data:
+                break
+            position = 0
+            while True:
+                # Next checkpoint: the first line start at least checkpoint_bytes after the last one
+                target = self.checkpoint_offsets[-1] + self.checkpoint_bytes - self.indexed
+                newline = data.find(b"\n", max(position, target - 1))
+                if newline == -1:
+                    break
+                self.newlines += data.count(b"\n", position, newline + 1)
+                self.state = state_after(self.state, data[position:newline + 1])
+                self.checkpoint_lines.append(self.newlines)
+                self.checkpoint_offsets.append(self.indexed + newline + 1)
+                self.checkpoint_states.append(self.state)
+                position = newline + 1
+            self.newlines += data.count(b"\n", position)
+            self.state = state_after(self.state, data[position:])
+            self.indexed += len(data)
+        return True
+
+    def locate(self, line):
+        """Return the byte offset where line starts and the color state in effect there"""
+        checkpoint = bisect.bisect_right(self.checkpoint_lines, line) - 1
+        offset = start = self.checkpoint_offsets[checkpoint]
+        state = self.checkpoint_states[checkpoint]
+        skip = line - self.checkpoint_lines[checkpoint]
+        while skip > 0 and offset < self.indexed:
+            window = self.buffer.read(offset, min(self.indexed, offset + 256 * 1024))
+            position = 0
+            while skip > 0:
+                newline = window.find(b"\n", position)
+                if newline == -1:
+                    break
+                position = newline + 1
+                skip -= 1
+            offset += position if skip == 0 else len(window)
+        # Colors set on the skipped lines carry over; read in pieces in case one of them is huge
+        for piece in range(start, offset, 1024 * 1024):
+            state = state_after(state, self.buffer.read(piece, min(offset, piece + 1024 * 1024)))
+        return offset, state
+
+    def lines(self, first, count):
+        """Return up to count (bytes, state) pairs for the lines starting at first"""
+        offset, state = self.locate(first)
+        result = []
+        while len(result) < count and offset < self.indexed:
+            data = self.buffer.read(offset, min(self.indexed, offset + (count - len(result)) * self.max_line_bytes))
+            parts = data.split(b"\n")
+            complete = parts[:-1]
+            for part in complete[:count - len(result)]:
+                result.append((part[:self.max_line_bytes], state))
+                state = state_after(state, part)
+            if len(result) >= count:
+                break
+            if offset + len(data) >= self.indexed:
+                if parts[-1]:
+                    result.append((parts[-1][:self.max_line_bytes], state))  # Unterminated last line
+                break
+            if not complete:
+                # A line longer than the whole read: show its start and find where the next one begins
+                result.append((parts[-1][:self.max_line_bytes], state))
+                offset, state = self.locate(first + len(result))
+            else:
+                offset += len(data) - len(parts[-1])
+        return result
+
+    def offset(self, line):
+        """Byte offset where line starts, or the end of the indexed output"""
+        if line >= self.line_count():
+            return self.indexed
+        return self.locate(line)[0]
@@ -0,0 +1,328 @@
+import os
+import math
+import mmap
+import struct
+import threading
+import time
+
+from utils.config import get_config_dir, load_config
+from utils.output_buffer import format_size
+
+# Monitor series kept on disk; per-core CPU is left out to keep records fixed-width
+FIELDS = ("cpu", "memory", "swap", "disk_read", "disk_write", "net_sent", "net_recv")
+PERCENT_FIELDS = ("cpu", "memory", "swap")
+
+MAGIC = b"RAPTMET1"
+HEADER = struct.Struct("<8sII")  # Magic, record size, tier width in seconds
+# Start time, samples covered, the mean of each field over them, then the maximum of each
+RECORD = struct.Struct(f"<dI{len(FIELDS)}f{len(FIELDS)}f")
+TIME = struct.Struct("<d")
+
+# (name, width in seconds, default retention in days)
+TIERS = [("1s", 1, 1), ("1m", 60, 30), ("1h", 3600, 365)]
+
+
+class MetricsTier:
+    """One resolution of the history: an append-only file of fixed-width RECORDs in time order
+
+    Records are appended through a buffered file and read through a
+    read-only memory map of the same file, remapped when it has grown.
+    Because every record is the same size and times only increase, record
+    n is at a known offset and a time range is two binary searches away,
+    whatever the size of the file.
+    """
+    def __init__(self, path, width, retention):
+        self.path = path
+        self.width = width
+        self.retention = retention  # Seconds; older records are compacted away
+        self.file = None
+        self.reader = None
+        self.map = None
+        self.count = 0
+
+    def open(self):
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                header = f.read(HEADER.size)
+            if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, RECORD.size, self.width):
+                # Another format or a file that is not ours; keep it aside rather than misread it
+                os.replace(self.path, f"{self.path}.old")
+        if not os.path.exists(self.path):
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, RECORD.size, self.width))
+        size = os.path.getsize(self.path)
+        self.count = (size - HEADER.size) // RECORD.size
+        if HEADER.size + self.count * RECORD.size != size:
+            # A record cut short by a crash mid-write
+            os.truncate(self.path, HEADER.size + self.count * RECORD.size)
+        self.file = open(self.path, "ab")
+        self.reader = open(self.path, "rb")
+        self.map = None
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        for f in (self.file, self.reader):
+            if f is not None:
+                f.close()
+        self.file = self.reader = None
+
+    def append(self, record):
+        self.file.write(RECORD.pack(*record))
+        self.file.flush()
+        self.count += 1
+
+    def _view(self):
+        """The memory map, covering every record appended so far"""
+        if self.count == 0:
+            return None
+        size = HEADER.size + self.count * RECORD.size
+        if self.map is None or len(self.map) < size:
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.reader.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.map
+
+    def time_at(self, view, index):
+        return TIME.unpack_from(view, HEADER.size + index * RECORD.size)[0]
+
+    def index_of(self, view, when):
+        """Index of the first record at or after when"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.time_at(view, middle) < when:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def span(self, start, end):
+        """(first, last) indexes of the records in [start, end)"""
+        view = self._view()
+        if view is None:
+            return 0, 0
+        return self.index_of(view, start), self.index_of(view, end)
+
+    def records(self, start=0.0, end=math.inf):
+        """The records in [start, end) as tuples"""
+        first, last = self.span(start, end)
+        if first >= last:
+            return []
+        view = self._view()
+        return list(RECORD.iter_unpack(view[HEADER.size + first * RECORD.size:HEADER.size + last * RECORD.size]))
+
+    def first_time(self):
+        view = self._view()
+        return self.time_at(view, 0) if view is not None else None
+
+    def last(self):
+        view = self._view()
+        if view is None:
+            return None
+        return RECORD.unpack_from(view, HEADER.size + (self.count - 1) * RECORD.size)
+
+    def compact(self, now):
+        """Drop records past retention by rewriting the file from the first one kept
+
+        Only done once the expired records are a tenth of the file, so the
+        cost of the rewrite is spread over many appends.
+        """
+        view = self._view()
+        if view is None:
+            return
+        expired = self.index_of(view, now - self.retention)
+        if expired == 0 or expired < self.count // 10:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(view[:HEADER.size])
+            f.write(view[HEADER.size + expired * RECORD.size:HEADER.size + self.count * RECORD.size])
+        self.close()
+        os.replace(temp_path, self.path)
+        self.open()
+
+
+class Rollup:
+    """Running totals for one bucket of a coarser tier"""
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.sums = [0.0] * len(FIELDS)
+        self.maxima = [-math.inf] * len(FIELDS)
+
+    def add(self, record):
+        count = record[1]
+        means = record[2:2 + len(FIELDS)]
+        maxima = record[2 + len(FIELDS):]
+        self.count += count
+        for i, (mean, maximum) in enumerate(zip(means, maxima)):
+            self.sums[i] += mean * count
+            if maximum > self.maxima[i]:
+                self.maxima[i] = maximum
+
+    def record(self):
+        return (self.start, self.count, *(total / self.count for total in self.sums), *self.maxima)
+
+
+class MetricsStore:
+    """Resource monitor samples kept on disk at 1 s, 1 min and 1 h resolution
+
+    Each sample is appended to the 1 s tier and folded into the open 1 min
+    bucket; a finished minute is appended to the 1 min tier and folded into
+    the open hour, and so on. Each tier keeps its records for its own
+    retention (metrics_retention_days per tier name, 1 day, 30 days and a
+    year by default), and is compacted whenever an hour is finished.
+    Buckets still open at exit are rebuilt from the finer tier next time.
+
+    Queries read from the finest tier that answers within max_points
+    records, so a week of history costs a few hundred records rather than
+    600,000 samples. If the files cannot be opened, samples are dropped.
+
+    The files are opened on first use, which can mean rebuilding the open
+    buckets, so the first call should not be made on the GUI thread; the
+    GUI checks is_open() instead.
+    """
+    def __init__(self, directory=None, retention_days=None):
+        self.directory = directory or os.path.join(get_config_dir(), "metrics")
+        retention_days = retention_days or {}
+        self.tiers = [MetricsTier(os.path.join(self.directory, f"metrics_{name}.bin"), width,
+                                  retention_days.get(name, days) * 86400)
+                      for name, width, days in TIERS]
+        self.pending = [None] * len(self.tiers)  # Open bucket of each tier but the finest
+        self.lock = threading.Lock()
+        self.opened = None  # True once open, False if it failed
+
+    def _open(self):
+        if self.opened is None:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                for tier in self.tiers:
+                    tier.open()
+                # Rebuild the buckets left open at the last exit from the tier below
+                for level in range(1, len(self.tiers)):
+                    last = self.tiers[level].last()
+                    since = last[0] + self.tiers[level].width if last else 0.0
+                    for record in self.tiers[level - 1].records(since):
+                        self._roll(level, record, cascade=False)
+                self.compact()
+                self.opened = True
+            except (OSError, ValueError) as e:
+                print(f"Metrics history unavailable: {e}")
+                for tier in self.tiers:
+                    tier.close()
+                self.opened = False
+        return self.opened
+
+    def is_open(self):
+        """Whether the files have been opened, so reading costs no more than the read"""
+        return self.opened is True
+
+    def append(self, sample):
+        """Store one monitor sample (a dict with time and FIELDS)"""
+        values = [float(sample.get(field, 0.0)) for field in FIELDS]
+        record = (float(sample["time"]), 1, *values, *values)
+        with self.lock:
+            if not self._open():
+                return
+            last = self.tiers[0].last()
+            if last is not None and record[0] <= last[0]:
+                return  # The clock went back; times must keep increasing
+            try:
+                self.tiers[0].append(record)
+                self._roll(1, record)
+            except (OSError, ValueError) as e:
+                print(f"Metrics history error: {e}")
+
+    def _roll(self, level, record, cascade=True):
+        """Fold a record of the tier below into this tier's open bucket, closing it first if record is past it"""
+        if level >= len(self.tiers):
+            return
+        tier = self.tiers[level]
+        start = math.floor(record[0] / tier.width) * tier.width
+        rollup = self.pending[level]
+        if rollup is not None and rollup.start != start:
+            finished = rollup.record()
+            tier.append(finished)
+            rollup = None
+            if cascade:
+                self._roll(level + 1, finished)
+                if level == len(self.tiers) - 1:
+                    self.compact()
+        if rollup is None:
+            rollup = self.pending[level] = Rollup(start)
+        rollup.add(record)
+
+    def compact(self):
+        now = time.time()
+        for tier in self.tiers:
+            tier.compact(now)
+
+    def query(self, start, end, max_points=2000):
+        """(tier width, records) for [start, end) at the finest resolution with at most max_points records
+
+        Records are RECORD tuples: start time, samples, FIELDS means, FIELDS
+        maxima. The open bucket of the chosen tier is included, so coarse
+        tiers reach up to the present too.
+        """
+        with self.lock:
+            if not self._open():
+                return None, []
+            now = time.time()
+            for level, tier in enumerate(self.tiers):
+                first, last = tier.span(start, end)
+                covered = start >= now - tier.retention
+                if (covered and last - first <= max_points) or level == len(self.tiers) - 1:
+                    records = tier.records(start, end)
+                    rollup = self.pending[level]
+                    if rollup is not None and rollup.count and start <= rollup.start < end:
+                        records.append(rollup.record())
+                    return tier.width, records
+        return None, []
+
+    def summary(self, start, end):
+        """Mean and peak of each field over [start, end), as {field: (mean, peak)}, or None without data"""
+        _, records = self.query(start, end)
+        if not records:
+            return None
+        total = Rollup(start)
+        for record in records:
+            total.add(record)
+        return {field: (mean, peak) for field, mean, peak in
+                zip(FIELDS, total.record()[2:2 + len(FIELDS)], total.maxima)}
+
+    def describe(self, start, end):
+        """One line on what the machine was doing over [start, end), for the AI, or None without data"""
+        summary = self.summary(start, end)
+        if summary is None:
+            return None
+
+        def value(field):
+            mean, peak = summary[field]
+            if field in PERCENT_FIELDS:
+                return f"{mean:.0f}% avg, {peak:.0f}% peak"
+            return f"{format_size(mean)}/s avg, {format_size(peak)}/s peak"
+
+        return (f"CPU {value('cpu')}; memory {value('memory')}; swap {value('swap')}; "
+                f"disk read {value('disk_read')}, write {value('disk_write')}; "
+                f"network in {value('net_recv')}, out {value('net_sent')}")
+
+    def close(self):
+        with self.lock:
+            for tier in self.tiers:
+                tier.close()
+            self.opened = None
+
+
+_shared_metrics = None
+
+def shared_metrics():
+    """Return the application-wide MetricsStore, or None if metrics history is turned off in the settings"""
+    global _shared_metrics
+    if _shared_metrics is None:
+        config = load_config()
+        if not config.get("metrics_history", True):
+            return None
+        _shared_metrics = MetricsStore(retention_days=config.get("metrics_retention_days"))
+    return _shared_metrics
@@ -0,0 +1,150 @@
+import mmap
+import tempfile
+import threading
+
+
+class RingBuffer:
+    """Fixed-size byte buffer that keeps only the most recent capacity bytes"""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = bytearray(capacity)
+        self.position = 0  # Where the next byte goes
+        self.length = 0
+
+    def write(self, data):
+        if len(data) >= self.capacity:
+            # Only the end of a large write survives
+            self.data[:] = data[-self.capacity:]
+            self.position = 0
+            self.length = self.capacity
+            return
+        end = self.position + len(data)
+        if end <= self.capacity:
+            self.data[self.position:end] = data
+        else:
+            split = self.capacity - self.position
+            self.data[self.position:] = data[:split]
+            self.data[:end - self.capacity] = data[split:]
+        self.position = end % self.capacity
+        self.length = min(self.capacity, self.length + len(data))
+
+    def getvalue(self):
+        """Return the buffered bytes, oldest first"""
+        if self.length < self.capacity:
+            return bytes(self.data[:self.length])
+        return bytes(self.data[self.position:] + self.data[:self.position])
+
+
+class OutputBuffer:
+    """Captures one stream of command output with bounded memory
+
+    Output is kept in memory until it grows past memory_limit bytes; from
+    then on everything is written to an anonymous temp file, and memory only
+    holds the first head_bytes and a ring buffer of the last tail_bytes for
+    the preview. read() serves any byte range, from a memory map of the temp
+    file once it has spilled.
+
+    write() is called from a reader thread while the GUI reads, so every
+    method takes the lock.
+    """
+    def __init__(self, memory_limit=4 * 1024 * 1024, head_bytes=256 * 1024, tail_bytes=256 * 1024):
+        self.memory_limit = memory_limit
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.lock = threading.Lock()
+        self.memory = bytearray()  # Encoded output while it still fits in memory
+        self.size = 0
+        self.file = None  # Temp file once spilled
+        self.map = None  # Memory map of the temp file, grown as the file grows
+        self.head = b""
+        self.tail = None
+        self.ends_with_newline = True
+        self.closed = False
+
+    @property
+    def spilled(self):
+        return self.file is not None
+
+    def write(self, text):
+        if not text:
+            return
+        data = text.encode("utf-8")
+        with self.lock:
+            if self.closed:
+                return  # Output of a command nobody is looking at any more
+            self.size += len(data)
+            self.ends_with_newline = text.endswith("\n")
+            if self.file is None:
+                self.memory += data
+                if self.size > self.memory_limit:
+                    self.spill()
+                return
+            self.file.write(data)
+            self.tail.write(data)
+
+    def spill(self):
+        """Move the in-memory output to the temp file"""
+        data = bytes(self.memory)
+        self.memory = bytearray()
+        self.file = tempfile.TemporaryFile(prefix="rapture-output-")
+        self.file.write(data)
+        self.head = data[:self.head_bytes]
+        self.tail = RingBuffer(self.tail_bytes)
+        self.tail.write(data)
+
+    def read(self, start, end):
+        """Return the bytes from start to end"""
+        with self.lock:
+            end = min(end, self.size)
+            if start >= end:
+                return b""
+            if self.file is None:
+                return bytes(self.memory[start:end])
+            if self.map is None or len(self.map) < end:
+                # Map everything written so far; the old map is dropped, not copied
+                self.file.flush()
+                if self.map is not None:
+                    self.map.close()
+                self.map = mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ)
+            return self.map[start:end]
+
+    def text(self):
+        """Return the whole output, or its head and tail around a marker once it has spilled to disk"""
+        with self.lock:
+            if self.file is None:
+                return self.memory.decode("utf-8", errors="replace")
+            omitted = self.size - len(self.head) - self.tail.length
+            head = self.head.decode("utf-8", errors="replace")
+            tail = self.tail.getvalue().decode("utf-8", errors="replace")
+        if omitted <= 0:
+            return head + tail
+        return f"{head}\n... [{format_size(omitted)} of output omitted] ...\n{tail}"
+
+    def close(self):
+        """Release the memory and delete the temp file"""
+        with self.lock:
+            self.closed = True
+            self.memory = bytearray()
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def format_size(size):
+    """Format a byte count for display"""
+    for unit in ("bytes", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def buffer_options_from_config(config):
+    """OutputBuffer arguments from the user's config.json settings"""
+    return {
+        "memory_limit": int(config.get("output_memory_limit_mb", 4) * 1024 * 1024)
+    }
+
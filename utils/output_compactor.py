@@ -0,0 +1,194 @@
+import re
+import hashlib
+
+from services.token_estimator import estimate_tokens
+
+# CSI sequences (colors, cursor movement), OSC sequences (titles, links) and other two-byte escapes
+ANSI_PATTERN = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]")
+# Everything that typically changes between otherwise identical progress/log lines
+VOLATILE_PATTERN = re.compile(r"0x[0-9a-fA-F]+|\d+(?:[.:,]\d+)*|[0-9a-f]{7,}")
+ERROR_PATTERN = re.compile(
+    r"error|exception|traceback|fail|fatal|panic|denied|not found|cannot|unable|refused|segmentation fault|warn",
+    re.IGNORECASE
+)
+# Stack frame lines from Python, JavaScript/Java/C# and Go/Rust style traces
+FRAME_PATTERN = re.compile(r'^\s+(File ".*", line \d+|at\s+\S|\S+\.(go|rs):\d+)|^\s{4,}\S')
+
+
+class OutputCompactor:
+    """Shrinks command output before it is sent to the AI for analysis
+
+    The pipeline strips terminal escapes, resolves carriage-return progress
+    bars, collapses runs of identical or near-identical lines into one line
+    with a count, replaces repeated stack traces with a reference to the first
+    one, and finally keeps only the head, the tail and the windows around
+    error lines when the result is still long. Output that will be analyzed
+    in chunks anyway, because it is over chunk_tokens, is not windowed, so
+    no part of it is lost.
+    """
+    def __init__(self, head_lines=40, tail_lines=40, context_lines=3, max_lines=200, min_repeat=3,
+                 max_block_lines=8, max_line_chars=500):
+        self.head_lines = head_lines
+        self.tail_lines = tail_lines
+        self.context_lines = context_lines  # Lines kept on each side of an error line
+        self.max_lines = max_lines          # Windowing only kicks in above this
+        self.min_repeat = min_repeat        # Shortest run of similar lines worth collapsing
+        self.max_block_lines = max_block_lines  # Longest multi-line pattern checked for repetition
+        self.max_line_chars = max_line_chars
+
+    def compact(self, text, chunk_tokens=None):
+        """Return (compacted_text, stats) where stats reports sizes and the compression ratio"""
+        original_chars = len(text)
+        lines = [self.shorten(line) for line in self.split_lines(strip_ansi(text))]
+        original_lines = len(lines)
+
+        lines = self.collapse_repeats(lines)
+        lines = self.dedupe_stack_traces(lines)
+        lines = self.collapse_repeated_blocks(lines)
+        if chunk_tokens is None or estimate_tokens("\n".join(lines)) <= chunk_tokens:
+            lines = self.keep_windows(lines)
+
+        compacted = "\n".join(lines)
+        stats = {
+            "original_chars": original_chars,
+            "compacted_chars": len(compacted),
+            "original_lines": original_lines,
+            "compacted_lines": len(lines),
+            "ratio": original_chars / len(compacted) if compacted else 1.0
+        }
+        return compacted, stats
+
+    @staticmethod
+    def split_lines(text):
+        """Split into lines, keeping only what a terminal would finally show for \\r-overwritten lines"""
+        lines = []
+        for line in text.split("\n"):
+            if "\r" in line:
+                segments = [segment for segment in line.split("\r") if segment.strip()]
+                line = segments[-1] if segments else ""
+            lines.append(line.rstrip())
+        while lines and not lines[-1]:
+            lines.pop()
+        return lines
+
+    def shorten(self, line):
+        """Cut minified or base64 blobs down to something readable"""
+        if len(line) <= self.max_line_chars:
+            return line
+        return line[:self.max_line_chars] + f" ... [{len(line) - self.max_line_chars} more characters]"
+
+    def collapse_repeats(self, lines):
+        """Replace runs of lines that only differ in numbers with the first and last line and a count"""
+        keys = [normalize_line(line) for line in lines]
+        result = []
+        i = 0
+        while i < len(lines):
+            key = keys[i]
+            j = i + 1
+            while j < len(lines) and keys[j] == key:
+                j += 1
+            run = j - i
+            if not key:
+                result.append("")  # Runs of blank lines become one
+            elif run >= self.min_repeat:
+                result.append(lines[i])
+                result.append(f"    ... [{run - 2} similar lines collapsed] ...")
+                result.append(lines[j - 1])
+            else:
+                result.extend(lines[i:j])
+            i = j
+        return result
+
+    def dedupe_stack_traces(self, lines):
+        """Replace every stack trace identical to an earlier one with a short reference"""
+        result = []
+        seen = set()
+        i = 0
+        while i < len(lines):
+            if not FRAME_PATTERN.match(lines[i]):
+                result.append(lines[i])
+                i += 1
+                continue
+            j = i
+            while j < len(lines) and FRAME_PATTERN.match(lines[j]):
+                j += 1
+            block = lines[i:j]
+            digest = hashlib.sha1("\n".join(normalize_line(line) for line in block).encode("utf-8")).hexdigest()
+            if len(block) > 2 and digest in seen:
+                result.append(f"    ... [same {len(block)}-line stack trace as above] ...")
+            else:
+                seen.add(digest)
+                result.extend(block)
+            i = j
+        return result
+
+    def collapse_repeated_blocks(self, lines):
+        """Keep one copy of a group of lines that repeats back to back (retry loops, recursion)"""
+        keys = [normalize_line(line) for line in lines]
+        result = []
+        i = 0
+        while i < len(lines):
+            best_period, best_count = 0, 1
+            for period in range(2, self.max_block_lines + 1):
+                if i + 2 * period > len(lines):
+                    break
+                if keys[i] != keys[i + period]:
+                    continue
+                count = 1
+                while keys[i + count * period:i + (count + 1) * period] == keys[i:i + period]:
+                    count += 1
+                if count > 1 and count * period > best_count * best_period:
+                    best_period, best_count = period, count
+            if best_period:
+                result.extend(lines[i:i + best_period])
+                result.append(f"    ... [previous {best_period} lines repeated {best_count - 1} more times] ...")
+                i += best_period * best_count
+            else:
+                result.append(lines[i])
+                i += 1
+        return result
+
+    def keep_windows(self, lines):
+        """Keep the head, the tail and the lines around errors when there are too many lines"""
+        if len(lines) <= self.max_lines:
+            return lines
+
+        keep = set(range(min(self.head_lines, len(lines))))
+        keep.update(range(max(0, len(lines) - self.tail_lines), len(lines)))
+        for index, line in enumerate(lines):
+            if ERROR_PATTERN.search(line):
+                keep.update(range(max(0, index - self.context_lines),
+                                  min(len(lines), index + self.context_lines + 1)))
+
+        result = []
+        omitted = 0
+        for index, line in enumerate(lines):
+            if index in keep:
+                if omitted:
+                    result.append(f"... [{omitted} lines omitted] ...")
+                    omitted = 0
+                result.append(line)
+            else:
+                omitted += 1
+        return result
+
+
+def strip_ansi(text):
+    """Remove terminal escape sequences"""
+    return ANSI_PATTERN.sub("", text)
+
+
+def normalize_line(line):
+    """Reduce a line to its shape so lines differing only in counters, sizes or hashes compare equal"""
+    return " ".join(VOLATILE_PATTERN.sub("#", line).split())
+
+
+def compactor_from_config(config):
+    """Build an OutputCompactor from the user's config.json settings"""
+    return OutputCompactor(
+        head_lines=config.get("compaction_head_lines", 40),
+        tail_lines=config.get("compaction_tail_lines", 40),
+        context_lines=config.get("compaction_context_lines", 3),
+        max_lines=config.get("compaction_max_lines", 200),
+        max_line_chars=config.get("compaction_max_line_chars", 500)
+    )
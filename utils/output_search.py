@@ -0,0 +1,74 @@
+import re
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+def compile_search(pattern):
+    """Compile a search pattern for raw output bytes; case-insensitive unless it contains capitals"""
+    flags = re.MULTILINE  # ^ and $ match at line boundaries, as they would on a single line
+    if not any(char.isupper() for char in pattern):
+        flags |= re.IGNORECASE
+    return re.compile(pattern.encode("utf-8"), flags)
+
+
+class OutputSearch(QThread):
+    """Finds the lines of an OutputBuffer that match a regular expression
+
+    The buffer is read in large line-aligned blocks so the search runs at
+    regex speed, and matching line numbers are reported in batches while the
+    search goes on, so the first matches can be shown right away.
+    """
+    matches_found = pyqtSignal(list)  # Line numbers of new matches, in order
+    search_finished = pyqtSignal(int)  # Total number of matching lines
+
+    def __init__(self, buffer, regex, size, block_bytes=4 * 1024 * 1024, max_matches=1000000):
+        super().__init__()
+        self.buffer = buffer
+        self.regex = regex
+        self.size = size  # Output appended after the search started is not searched
+        self.block_bytes = block_bytes
+        self.max_matches = max_matches
+        self.is_running = True
+
+    def run(self):
+        offset = 0
+        line = 0
+        total = 0
+        batch = []
+        last_emit = time.monotonic()
+        while self.is_running and offset < self.size and total < self.max_matches:
+            block = self.buffer.read(offset, min(self.size, offset + self.block_bytes))
+            if not block:
+                break
+            if offset + len(block) < self.size:
+                # End on a line boundary so no match is cut in two; a huge line is searched in slices
+                cut = block.rfind(b"\n")
+                if cut != -1:
+                    block = block[:cut + 1]
+
+            position = 0
+            previous = -1
+            for match in self.regex.finditer(block):
+                line += block.count(b"\n", position, match.start())
+                position = match.start()
+                if line != previous:
+                    batch.append(line)
+                    previous = line
+                    total += 1
+                    if total >= self.max_matches:
+                        break
+            line += block.count(b"\n", position)
+            offset += len(block)
+
+            if batch and time.monotonic() - last_emit > 0.1:
+                self.matches_found.emit(batch)
+                batch = []
+                last_emit = time.monotonic()
+
+        if batch and self.is_running:
+            self.matches_found.emit(batch)
+        if self.is_running:
+            self.search_finished.emit(total)
+
+    def stop(self):
+        self.is_running = False
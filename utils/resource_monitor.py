@@ -0,0 +1,160 @@
+import time
+import threading
+from array import array
+
+import psutil
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+def downsample(values, points):
+    """At most points values, each the highest of the values it stands for so spikes survive"""
+    count = len(values)
+    if count <= points:
+        return list(values)
+    return [max(values[i * count // points:(i + 1) * count // points]) for i in range(points)]
+
+
+class SeriesRing:
+    """Fixed-size series of numbers in a flat array; the oldest value is overwritten once it is full
+
+    Every value is stored twice, capacity slots apart, so the values held
+    are always one contiguous stretch of the array and values() can hand
+    out a view of it instead of a copy. Its memory is allocated up front
+    and never grows, however many values are appended.
+    """
+    def __init__(self, capacity, typecode="d"):
+        self.capacity = capacity
+        self.data = array(typecode, [0]) * (2 * capacity)
+        self.view = memoryview(self.data)
+        self.next = 0  # Slot the next value goes into
+        self.count = 0
+
+    def append(self, value):
+        self.data[self.next] = value
+        self.data[self.next + self.capacity] = value
+        self.next = (self.next + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def last(self):
+        return self.data[self.next - 1] if self.count else None
+
+    def values(self):
+        """The values held, oldest first, as a view that is only valid until the next append"""
+        start = self.next if self.count == self.capacity else 0
+        return self.view[start:start + self.count]
+
+    def downsample(self, points):
+        return downsample(self.values(), points)
+
+
+class ResourceMonitor(QObject):
+    """Samples CPU per core, memory, swap, disk I/O and network throughput on a background thread
+
+    Every series is a SeriesRing of history samples, so the monitor holds
+    the last history * interval seconds in constant memory. A sample is a
+    handful of reads from /proc (or the platform's equivalent), so at one
+    sample a second the thread costs a fraction of a percent of one core.
+
+    sampled carries each sample as a dict of the series names below (per
+    core CPU as a list under cpu_per_core) plus its time. Rates are in
+    bytes per second; the first sample has none and reports 0.
+    """
+    SERIES = ("cpu", "memory", "swap", "disk_read", "disk_write", "net_sent", "net_recv")
+
+    sampled = pyqtSignal(dict)
+
+    def __init__(self, interval=1.0, history=600):
+        super().__init__()
+        self.interval = interval
+        self.history = history
+        self.cores = psutil.cpu_count(logical=True) or 1
+        self.series = {name: SeriesRing(history) for name in self.SERIES}
+        self.core_series = [SeriesRing(history) for _ in range(self.cores)]
+        self.times = SeriesRing(history)
+        self.lock = threading.Lock()
+        self.previous = None  # (time, disk counters, network counters) of the last sample
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.is_running():
+            return
+        self.stop_event.clear()
+        psutil.cpu_percent(percpu=True)  # The first reading only sets the starting point
+        self.previous = self.counters()
+        self.thread = threading.Thread(target=self.run, daemon=True, name="resource-monitor")
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                sample = self.sample()
+            except Exception as e:
+                print(f"Resource monitor error: {e}")
+                continue
+            self.sampled.emit(sample)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @staticmethod
+    def counters():
+        return time.monotonic(), psutil.disk_io_counters(), psutil.net_io_counters()
+
+    def sample(self):
+        """Take one sample and append it to every series"""
+        per_core = psutil.cpu_percent(percpu=True)
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        now, disk, network = self.counters()
+
+        last_time, last_disk, last_network = self.previous
+        elapsed = max(now - last_time, 1e-6)
+        self.previous = (now, disk, network)
+
+        def rate(current, last, field):
+            if current is None or last is None:
+                return 0.0  # Not available here, e.g. disk counters in some containers
+            return max(0.0, (getattr(current, field) - getattr(last, field)) / elapsed)
+
+        sample = {
+            "time": time.time(),
+            "cpu": sum(per_core) / len(per_core) if per_core else 0.0,
+            "cpu_per_core": per_core,
+            "memory": memory.percent,
+            "swap": swap.percent,
+            "disk_read": rate(disk, last_disk, "read_bytes"),
+            "disk_write": rate(disk, last_disk, "write_bytes"),
+            "net_sent": rate(network, last_network, "bytes_sent"),
+            "net_recv": rate(network, last_network, "bytes_recv"),
+        }
+        with self.lock:
+            self.times.append(sample["time"])
+            for name in self.SERIES:
+                self.series[name].append(sample[name])
+            for series, value in zip(self.core_series, per_core):
+                series.append(value)
+        return sample
+
+    def downsampled(self, name, points):
+        """Up to points values of a series (or of core n, for name "cpuN"), oldest first"""
+        with self.lock:
+            if name in self.series:
+                return self.series[name].downsample(points)
+            return self.core_series[int(name[3:])].downsample(points)
+
+    def latest(self, name):
+        with self.lock:
+            if name in self.series:
+                return self.series[name].last()
+            return self.core_series[int(name[3:])].last()
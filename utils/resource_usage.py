@@ -0,0 +1,180 @@
+import os
+import threading
+
+import psutil
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from utils.output_buffer import format_size
+
+
+class ResourceUsage:
+    """What one command cost: wall time, CPU time, peak memory and I/O
+
+    CPU times and byte counts cover the command and every child process it
+    waited for. peak_rss is the highest resident memory seen, either of the
+    largest single process (from rusage) or of the whole process tree at
+    once (from sampling), whichever is higher.
+    """
+    FIELDS = ("wall_time", "user_time", "system_time", "peak_rss", "read_bytes", "write_bytes")
+
+    def __init__(self, wall_time=0.0, user_time=0.0, system_time=0.0, peak_rss=0, read_bytes=0, write_bytes=0):
+        self.wall_time = wall_time
+        self.user_time = user_time
+        self.system_time = system_time
+        self.peak_rss = peak_rss
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+
+    def cpu_time(self):
+        return self.user_time + self.system_time
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**{field: values[field] for field in cls.FIELDS if field in values})
+
+    def summary(self):
+        """One line for the output view"""
+        return (f"Wall {self.wall_time:.2f} s, CPU {self.user_time:.2f} s user + {self.system_time:.2f} s sys, "
+                f"peak RSS {format_size(self.peak_rss)}, "
+                f"I/O {format_size(self.read_bytes)} read / {format_size(self.write_bytes)} written")
+
+
+def wait_with_rusage(process):
+    """Reap process like Popen.wait() and return (exit code, rusage or None)
+
+    wait4 reports the CPU time and peak memory of the process and all the
+    children it waited for, which is exact where sampling can miss
+    short-lived processes. Where wait4 does not exist this is Popen.wait().
+    """
+    if not hasattr(os, "wait4") or process.returncode is not None:
+        return process.wait(), None
+    while True:
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+            break
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            return process.wait(), None  # Reaped elsewhere
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, rusage
+
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+MAXRSS_SCALE = 1 if psutil.MACOS else 1024
+
+
+def rusage_values(rusage):
+    """(user, sys, peak RSS bytes, read bytes, written bytes) from a wait4 rusage"""
+    # Block counts are in 512-byte units
+    return (rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss * MAXRSS_SCALE,
+            rusage.ru_inblock * 512, rusage.ru_oublock * 512)
+
+
+def own_peak_rss():
+    """Peak memory of this process so far"""
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_SCALE
+
+
+class ProcessTreeSampler:
+    """Samples the memory, CPU and I/O of a process and its descendants
+
+    Counters of a process include those of the children it has reaped, so
+    the total of the root and its live descendants at any moment covers the
+    whole tree so far. The sampler keeps the highest total seen, measured
+    from a baseline taken at start(); sampling a long-lived shell before and
+    after a command therefore gives what the command used.
+
+    Processes that exit between samples are only seen through their parent's
+    counters, and the last interval before the tree exits is not sampled, so
+    CPU and I/O are lower bounds; wait4's rusage is preferred where there is one.
+    """
+    def __init__(self, pid, interval=0.2, include_root=True):
+        self.pid = pid
+        self.interval = interval
+        self.include_root = include_root  # False for a session shell, whose own memory is not the command's
+        self.baseline = None
+        self.totals = (0.0, 0.0, 0, 0)  # user, sys, read, write above the baseline
+        self.peak_rss = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.baseline = self.measure()
+        if self.baseline is not None:
+            self.peak_rss = self.baseline[4]
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        # Sample often at first so short commands are seen at all, then every interval
+        wait = min(0.01, self.interval)
+        while not self.stop_event.wait(wait):
+            self.sample()
+            wait = min(wait * 2, self.interval)
+
+    def stop(self):
+        """Take a last sample and stop; call before the root process is reaped"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.sample()
+
+    def sample(self):
+        measured = self.measure()
+        if measured is None or self.baseline is None:
+            return
+        user, system, read, write, rss = measured
+        base_user, base_system, base_read, base_write, _ = self.baseline
+        self.totals = tuple(max(total, value) for total, value in zip(
+            self.totals, (user - base_user, system - base_system, read - base_read, write - base_write)))
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def measure(self):
+        """(user, sys, read bytes, written bytes, RSS) summed over the tree, or None if it is gone"""
+        try:
+            root = psutil.Process(self.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        user = system = 0.0
+        read = write = rss = 0
+        for process in processes:
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    user += times.user + times.children_user
+                    system += times.system + times.children_system
+                    if process is not root or self.include_root:
+                        rss += process.memory_info().rss
+                    if hasattr(process, "io_counters"):  # Not available on macOS
+                        counters = process.io_counters()
+                        read += counters.read_bytes
+                        write += counters.write_bytes
+            except psutil.Error:
+                continue  # Exited or not ours to inspect
+        return user, system, read, write, rss
+
+    def usage(self, wall_time, rusage=None):
+        """Combine the samples with wait4's rusage, if there is one, into a ResourceUsage"""
+        user, system, read, write = self.totals
+        peak_rss = self.peak_rss
+        if rusage is not None:
+            user, system, max_rss, blocks_read, blocks_written = rusage_values(rusage)
+            # A forked child inherits its parent's peak, and exec does not reset it,
+            # so only a peak above ours is the command's own
+            if max_rss > own_peak_rss():
+                peak_rss = max(peak_rss, max_rss)
+            read = max(read, blocks_read)
+            write = max(write, blocks_written)
+        return ResourceUsage(wall_time, user, system, peak_rss, read, write)
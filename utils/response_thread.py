@@ -3,25 +3,29 @@ from PyQt5.QtCore import QThread, pyqtSignal
 class ResponseThread(QThread):
     """Thread for getting responses from the AI"""
     response_received = pyqtSignal(str)
-    
-    def __init__(self, client, prompt, system_context):
+
+    def __init__(self, client, prompt, system_context, use_cache=True, history=None):
         super().__init__()
         self.client = client
         self.prompt = prompt
         self.system_context = system_context
+        self.use_cache = use_cache
+        self.history = history
         self.is_running = True
-        
+
     def run(self):
         """Get response from AI API"""
         try:
             if self.is_running:
-                response = self.client.get_response(self.prompt, self.system_context)
+                response = self.client.get_response(self.prompt, self.system_context,
+                                                    use_cache=self.use_cache,
+                                                    history=self.history)
                 if self.is_running:
                     self.response_received.emit(response)
         except Exception as e:
             if self.is_running:
                 self.response_received.emit(f"Error getting response: {str(e)}")
-    
+
     def stop(self):
-        """Signal the thread to stop"""
-        self.is_running = False
\ No newline at end of file
+        """Signal the thread to stop; a request in flight is left to finish and its result dropped"""
+        self.is_running = False
@@ -0,0 +1,264 @@
+import os
+import math
+import zlib
+import sqlite3
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils.config import get_config_dir, load_config
+from utils.resource_usage import ResourceUsage
+
+# Runs of a command whose median is shown as its recent speed
+RECENT_RUNS = 20
+# Latest runs of a command its p50 and p95 are taken over
+SAMPLE_RUNS = 1000
+
+
+class RunHistory(QObject):
+    """Every command run, kept in SQLite under ~/.rapture/ with its timings and compressed output
+
+    runs holds one row per run, indexed by command and start time for the
+    per-command lists and by start time alone for pruning and time ranges.
+    commands keeps per-command counts and p50/p95 durations up to date on
+    every insert, so the summary is a single read of commands, whatever the
+    size of runs. The percentiles are taken over the command's last
+    SAMPLE_RUNS runs, which bounds what an insert reads.
+
+    Records come from worker threads; the connection is shared under a lock.
+    If the database cannot be opened, runs are simply not recorded.
+    """
+    run_recorded = pyqtSignal()
+
+    def __init__(self, path=None, max_runs=200000):
+        super().__init__()
+        self.path = path or os.path.join(get_config_dir(), "history.db")
+        self.max_runs = max_runs  # Oldest runs are dropped past this; 0 keeps everything
+        self.lock = threading.Lock()
+        self.db = None
+        self.inserts = 0
+
+    def _connect(self):
+        """Open the database lazily, creating the schema on first use"""
+        if self.db is None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.db = sqlite3.connect(self.path, check_same_thread=False)
+                self.db.execute("PRAGMA journal_mode=WAL")
+                self.db.execute("PRAGMA synchronous=NORMAL")
+                with self.db:
+                    self.db.execute(
+                        "CREATE TABLE IF NOT EXISTS runs ("
+                        "id INTEGER PRIMARY KEY, command TEXT NOT NULL, context_path TEXT, "
+                        "started_at REAL NOT NULL, exit_code INTEGER, status TEXT, "
+                        "wall_time REAL NOT NULL, user_time REAL, system_time REAL, peak_rss INTEGER, "
+                        "read_bytes INTEGER, write_bytes INTEGER, stdout BLOB, stderr BLOB)"
+                    )
+                    self.db.execute("CREATE INDEX IF NOT EXISTS idx_runs_command_started ON runs(command, started_at)")
+                    self.db.execute("CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at)")
+                    self.db.execute("DROP INDEX IF EXISTS idx_runs_command_wall")
+                    self.db.execute(
+                        "CREATE TABLE IF NOT EXISTS commands ("
+                        "command TEXT PRIMARY KEY, runs INTEGER NOT NULL, failures INTEGER NOT NULL, "
+                        "last_run REAL NOT NULL, p50 REAL, p95 REAL, recent_p50 REAL)"
+                    )
+                    columns = {row[1] for row in self.db.execute("PRAGMA table_info(commands)")}
+                    if "p50" not in columns:
+                        # Written before the percentiles were stored: add and fill them once
+                        for column in ("p50", "p95", "recent_p50"):
+                            self.db.execute(f"ALTER TABLE commands ADD COLUMN {column} REAL")
+                        for (command,) in self.db.execute("SELECT command FROM commands").fetchall():
+                            self._update_percentiles(self.db, command)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Command history unavailable: {e}")
+                self.db = None
+        return self.db
+
+    def record(self, command, context_path, started_at, exit_code, status, usage, stdout="", stderr=""):
+        """Store one finished run; usage is a ResourceUsage"""
+        failed = int(exit_code != 0)
+        row = (command, context_path, started_at, exit_code, status, usage.wall_time, usage.user_time,
+               usage.system_time, usage.peak_rss, usage.read_bytes, usage.write_bytes,
+               compress(stdout), compress(stderr))
+        with self.lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                with db:
+                    db.execute(
+                        "INSERT INTO runs (command, context_path, started_at, exit_code, status, wall_time, "
+                        "user_time, system_time, peak_rss, read_bytes, write_bytes, stdout, stderr) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+                    )
+                    db.execute(
+                        "INSERT INTO commands (command, runs, failures, last_run) VALUES (?, 1, ?, ?) "
+                        "ON CONFLICT(command) DO UPDATE SET runs = runs + 1, failures = failures + excluded.failures, "
+                        "last_run = MAX(last_run, excluded.last_run)",
+                        (command, failed, started_at)
+                    )
+                    self._update_percentiles(db, command)
+                    self.inserts += 1
+                    if self.max_runs and self.inserts % 1000 == 0:
+                        self._prune(db)
+            except sqlite3.Error as e:
+                print(f"Command history error: {e}")
+                return
+        self.run_recorded.emit()
+
+    def _prune(self, db):
+        """Drop the oldest runs beyond max_runs and rebuild the per-command counts"""
+        cutoff = db.execute("SELECT started_at FROM runs ORDER BY started_at DESC LIMIT 1 OFFSET ?",
+                            (self.max_runs,)).fetchone()
+        if cutoff is None:
+            return
+        pruned = [row[0] for row in db.execute("SELECT DISTINCT command FROM runs WHERE started_at <= ?", cutoff)]
+        db.execute("DELETE FROM runs WHERE started_at <= ?", cutoff)
+        db.execute("DELETE FROM commands WHERE command NOT IN (SELECT command FROM runs)")
+        for command in pruned:
+            db.execute("UPDATE commands SET (runs, failures, last_run) = "
+                       "(SELECT COUNT(*), SUM(exit_code != 0), MAX(started_at) FROM runs WHERE command = ?) "
+                       "WHERE command = ?", (command, command))
+            self._update_percentiles(db, command)
+
+    @staticmethod
+    def _update_percentiles(db, command):
+        """Store a command's p50, p95 and recent p50, read from its last SAMPLE_RUNS runs"""
+        durations = [row[0] for row in db.execute(
+            "SELECT wall_time FROM runs WHERE command = ? ORDER BY started_at DESC LIMIT ?",
+            (command, SAMPLE_RUNS))]
+        recent = sorted(durations[:RECENT_RUNS])
+        durations.sort()
+        db.execute("UPDATE commands SET p50 = ?, p95 = ?, recent_p50 = ? WHERE command = ?",
+                   (percentile(durations, 0.50), percentile(durations, 0.95), percentile(recent, 0.50), command))
+
+    def command_stats(self, text="", limit=200):
+        """Per-command run counts and p50/p95 durations, most recently run first
+
+        Each entry is a dict with command, runs, failures, last_run, p50,
+        p95 and recent_p50 (the median of the last RECENT_RUNS runs), so a
+        command that is getting slower stands out against its overall p50.
+        Everything comes from commands; runs is not read.
+        """
+        with self.lock:
+            db = self._connect()
+            if db is None:
+                return []
+            try:
+                rows = db.execute(
+                    "SELECT command, runs, failures, last_run, p50, p95, recent_p50 FROM commands "
+                    "WHERE command LIKE ? ESCAPE '\\' ORDER BY last_run DESC LIMIT ?",
+                    (like_pattern(text), limit)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Command history error: {e}")
+                return []
+        return [{
+            "command": row[0],
+            "runs": row[1],
+            "failures": row[2],
+            "last_run": row[3],
+            "p50": row[4],
+            "p95": row[5],
+            "recent_p50": row[6],
+        } for row in rows]
+
+    def totals(self):
+        """(number of distinct commands, number of runs) recorded"""
+        with self.lock:
+            db = self._connect()
+            if db is None:
+                return 0, 0
+            try:
+                count, runs = db.execute("SELECT COUNT(*), COALESCE(SUM(runs), 0) FROM commands").fetchone()
+                return count, runs
+            except sqlite3.Error as e:
+                print(f"Command history error: {e}")
+                return 0, 0
+
+    def recent_runs(self, command, limit=200):
+        """The latest runs of a command, newest first, as dicts with a ResourceUsage under usage"""
+        with self.lock:
+            db = self._connect()
+            if db is None:
+                return []
+            try:
+                rows = db.execute(
+                    "SELECT id, started_at, context_path, exit_code, status, wall_time, user_time, system_time, "
+                    "peak_rss, read_bytes, write_bytes FROM runs WHERE command = ? ORDER BY started_at DESC LIMIT ?",
+                    (command, limit)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Command history error: {e}")
+                return []
+        return [{
+            "id": row[0],
+            "started_at": row[1],
+            "context_path": row[2],
+            "exit_code": row[3],
+            "status": row[4],
+            "usage": ResourceUsage(*(value or 0 for value in row[5:11])),
+        } for row in rows]
+
+    def output(self, run_id):
+        """(stdout, stderr) recorded for a run, or empty strings"""
+        with self.lock:
+            db = self._connect()
+            if db is None:
+                return "", ""
+            try:
+                row = db.execute("SELECT stdout, stderr FROM runs WHERE id = ?", (run_id,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"Command history error: {e}")
+                return "", ""
+        if row is None:
+            return "", ""
+        return decompress(row[0]), decompress(row[1])
+
+    def clear(self):
+        """Forget every run"""
+        with self.lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                with db:
+                    db.execute("DELETE FROM runs")
+                    db.execute("DELETE FROM commands")
+            except sqlite3.Error as e:
+                print(f"Command history error: {e}")
+                return
+        self.run_recorded.emit()
+
+
+def compress(text):
+    return zlib.compress(text.encode("utf-8"), 6) if text else None
+
+
+def decompress(data):
+    return zlib.decompress(data).decode("utf-8", errors="replace") if data else ""
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values, or None if there are none"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def like_pattern(text):
+    """A LIKE pattern matching commands that contain text literally"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+_shared_history = None
+
+def shared_history():
+    """Return the application-wide RunHistory, or None if history is turned off in the settings"""
+    global _shared_history
+    if _shared_history is None:
+        config = load_config()
+        if not config.get("command_history", True):
+            return None
+        _shared_history = RunHistory(max_runs=config.get("history_max_runs", 200000))
+    return _shared_history
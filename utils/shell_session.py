@@ -0,0 +1,206 @@
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+from utils.command_worker import process_group_options, kill_process_group
+
+
+def sessions_supported():
+    """Persistent sessions need a POSIX shell; elsewhere commands always run one-shot"""
+    return os.name != "nt"
+
+
+class ShellSession:
+    """A long-lived shell that runs commands one after another
+
+    Commands are written to the shell's stdin, each followed by a marker
+    that the shell prints to stdout (with the exit status) and to stderr
+    when the command is done; everything before the markers is the
+    command's output. Because the same shell runs every command, cd,
+    exported variables and activated virtualenvs carry over, and a command
+    costs no process start-up.
+
+    Stopping a command kills the shell with it; the next command starts a
+    fresh one, without the state.
+    """
+    def __init__(self, name, working_dir, shell=None):
+        self.name = name
+        self.working_dir = working_dir
+        # bash survives syntax errors in eval, where a POSIX sh would exit
+        self.shell = shell or shutil.which("bash") or "/bin/sh"
+        self.marker = f"__rapture_{uuid.uuid4().hex}__"
+        self.process = None
+        self.events = None
+        self.lock = threading.Lock()  # One command at a time
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [self.shell],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.working_dir,
+            **process_group_options()
+        )
+        self.events = queue.Queue()
+        for pipe, name in ((self.process.stdout, "stdout"), (self.process.stderr, "stderr")):
+            threading.Thread(target=self.read_pipe, args=(pipe, name, self.events), daemon=True).start()
+
+    @staticmethod
+    def read_pipe(pipe, name, events):
+        """Forward everything the shell writes until it exits; None marks the end"""
+        try:
+            while True:
+                data = pipe.read1(65536)
+                if not data:
+                    break
+                events.put((name, data))
+        finally:
+            pipe.close()
+            events.put((name, None))
+
+    def execute(self, command, on_output, on_idle=None, on_start=None, idle_interval=0.05):
+        """Run command in the session and return its exit code
+
+        on_output(name, data) receives raw output bytes as they arrive;
+        on_idle() is called about every idle_interval seconds, which is where
+        the caller checks for timeouts and cancellation.
+        on_start(process) is called once the session is free for this
+        command; if it returns False the command is skipped and None is
+        returned. If the shell dies (exit, kill) the exit code is the shell's.
+        """
+        with self.lock:
+            if not self.discard_stale_output():
+                self.close()
+                self.start()
+            if on_start is not None and not on_start(self.process):
+                return None
+            marker = self.marker.encode("ascii")
+            script = (f"eval {shlex.quote(command)} </dev/null\n"
+                      f"__rapture_status=$?\n"
+                      f"printf '%s %d\\n' '{self.marker}' \"$__rapture_status\"\n"
+                      f"printf '%s\\n' '{self.marker}' >&2\n")
+            try:
+                self.process.stdin.write(script.encode("utf-8"))
+                self.process.stdin.flush()
+            except OSError:
+                pass  # Shell already gone; its end-of-output events follow
+
+            pending = {"stdout": b"", "stderr": b""}
+            finished = {"stdout": False, "stderr": False}
+            exit_code = None
+            last_idle = time.monotonic()
+            while not all(finished.values()):
+                if on_idle is not None and time.monotonic() - last_idle >= idle_interval:
+                    on_idle()
+                    last_idle = time.monotonic()
+                try:
+                    name, data = self.events.get(timeout=idle_interval)
+                except queue.Empty:
+                    continue
+                if data is None:
+                    # The shell exited during the command
+                    if pending[name]:
+                        on_output(name, pending[name])
+                        pending[name] = b""
+                    finished[name] = True
+                    continue
+                if finished[name]:
+                    continue  # Output of a background job after the marker
+
+                data = pending[name] + data
+                position = data.find(marker)
+                if position == -1:
+                    # Hold back what could be the start of a marker split across reads
+                    keep = len(marker) - 1
+                    if len(data) > keep:
+                        on_output(name, data[:-keep])
+                        data = data[-keep:]
+                    pending[name] = data
+                    continue
+                if name == "stdout":
+                    end = data.find(b"\n", position)
+                    if end == -1:
+                        pending[name] = data  # Wait for the exit status
+                        continue
+                    status = data[position + len(marker):end].strip()
+                    exit_code = int(status) if status.lstrip(b"-").isdigit() else -1
+                if position:
+                    on_output(name, data[:position])
+                pending[name] = b""
+                finished[name] = True
+
+            if exit_code is None:
+                exit_code = self.process.wait()
+            return exit_code
+
+    def discard_stale_output(self):
+        """Drop output background jobs wrote after the last command's markers
+
+        Otherwise it would be taken for the next command's output. Returns
+        False if there is no shell, or it has closed its output and is gone.
+        """
+        if not self.is_alive():
+            return False
+        while True:
+            try:
+                _, data = self.events.get_nowait()
+            except queue.Empty:
+                return True
+            if data is None:
+                return False
+
+    def close(self):
+        """Stop the shell and anything still running in it"""
+        if self.is_alive():
+            kill_process_group(self.process, force=True)
+            self.process.wait()
+
+
+class SessionManager:
+    """Keeps one ShellSession per execution context"""
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, context_name, working_dir):
+        """Return the session for a context, replacing it if the context now points elsewhere"""
+        with self.lock:
+            session = self.sessions.get(context_name)
+            if session is None or session.working_dir != working_dir:
+                if session is not None:
+                    session.close()
+                session = self.sessions[context_name] = ShellSession(context_name, working_dir)
+            return session
+
+    def reset(self, context_name):
+        """Throw away a context's session; the next command starts a fresh shell"""
+        with self.lock:
+            session = self.sessions.pop(context_name, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+_shared_sessions = None
+
+def shared_sessions():
+    """Return the application-wide SessionManager"""
+    global _shared_sessions
+    if _shared_sessions is None:
+        _shared_sessions = SessionManager()
+    return _shared_sessions
@@ -0,0 +1,229 @@
+import os
+import json
+import platform
+import socket
+import sys
+import threading
+import time
+import psutil
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from utils.config import get_config_dir, load_config
+
+UNRESPONSIVE = "unresponsive"
+
+# Mount points whose disk_usage call is still stuck, with the thread stuck in it
+_stuck_probes = {}
+_stuck_lock = threading.Lock()
+
+
+def collect_system():
+    return {
+        "OS": f"{platform.system()} {platform.release()}",
+        "Version": platform.version(),
+        "Architecture": platform.machine(),
+        "Processor": platform.processor(),  # Runs a subprocess on some platforms
+        "Computer Name": platform.node()
+    }
+
+
+def collect_hardware():
+    memory = psutil.virtual_memory()
+    return {
+        "CPU Cores": psutil.cpu_count(logical=False),
+        "CPU Threads": psutil.cpu_count(logical=True),
+        "RAM": f"{round(memory.total / (1024**3), 2)} GB",
+        "RAM Available": f"{round(memory.available / (1024**3), 2)} GB",
+    }
+
+
+def collect_python():
+    return {
+        "Python Version": platform.python_version(),
+        "Python Implementation": platform.python_implementation(),
+        "Python Path": sys.executable
+    }
+
+
+def probe_mount(mountpoint, results):
+    """disk_usage for one mount point, run on a thread of its own since it can block forever"""
+    try:
+        results[mountpoint] = psutil.disk_usage(mountpoint)
+    except OSError:
+        results[mountpoint] = None  # Unreadable; left out
+    finally:
+        with _stuck_lock:
+            _stuck_probes.pop(mountpoint, None)
+
+
+def collect_storage(timeout=None, exclude_fstypes=None):
+    """Usage of every mounted disk, without letting a hung mount block
+
+    A stale NFS, SMB or FUSE mount can make statvfs hang indefinitely, so
+    each mount is probed on a daemon thread and all of them share one
+    deadline; mounts that have not answered by then are reported as
+    unresponsive. A mount still stuck from an earlier probe is not probed
+    again until that call returns, so threads do not pile up on it.
+    Filesystem types listed in storage_exclude_fstypes are skipped.
+    """
+    config = load_config()
+    if timeout is None:
+        timeout = config.get("storage_probe_timeout", 2.0)
+    if exclude_fstypes is None:
+        exclude_fstypes = config.get("storage_exclude_fstypes", [])
+    exclude_fstypes = {fstype.lower() for fstype in exclude_fstypes}
+
+    disks = [disk for disk in psutil.disk_partitions() if disk.fstype.lower() not in exclude_fstypes]
+    results = {}
+    threads = []
+    for disk in disks:
+        with _stuck_lock:
+            if disk.mountpoint in _stuck_probes:
+                continue
+            thread = threading.Thread(target=probe_mount, args=(disk.mountpoint, results), daemon=True,
+                                      name=f"disk-usage {disk.mountpoint}")
+            _stuck_probes[disk.mountpoint] = thread
+        thread.start()
+        threads.append(thread)
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    disk_info = {}
+    for disk in disks:
+        key = f"Disk {disk.device}"
+        if disk.mountpoint not in results:
+            disk_info[key] = f"{UNRESPONSIVE} ({disk.fstype} at {disk.mountpoint})"
+            continue
+        usage = results[disk.mountpoint]
+        if usage is not None:
+            disk_info[key] = f"{round(usage.total / (1024**3), 2)} GB (Used: {usage.percent}%)"
+    return disk_info
+
+
+def collect_network():
+    network_info = {}
+    for interface, addresses in psutil.net_if_addrs().items():
+        for address in addresses:
+            if address.family == socket.AF_INET:
+                network_info[interface] = address.address
+    return network_info
+
+
+# Profile categories in display order, each with the function that collects it
+CATEGORIES = [
+    ("System", collect_system),
+    ("Hardware", collect_hardware),
+    ("Python Environment", collect_python),
+    ("Storage", collect_storage),
+    ("Network", collect_network),
+]
+CATEGORY_NAMES = [name for name, _ in CATEGORIES]
+
+# Categories whose values change while the machine is up (RAM available, disk usage);
+# the rest only change with a reboot, a kernel update or another interpreter
+VOLATILE_CATEGORIES = ["Hardware", "Storage"]
+
+
+def profile_fingerprint():
+    """Cheap facts that change whenever the stable part of the profile may have"""
+    try:
+        executable_mtime = os.stat(sys.executable).st_mtime
+    except OSError:
+        executable_mtime = None
+    return {
+        "boot_time": int(psutil.boot_time()),
+        "kernel": platform.release(),
+        "executable": sys.executable,
+        "executable_mtime": executable_mtime,
+    }
+
+
+def profile_cache_path():
+    return os.path.join(get_config_dir(), "system_profile.json")
+
+
+def load_cached_profile():
+    """The profile saved by the last run, or None if there is none or the fingerprint no longer matches"""
+    try:
+        with open(profile_cache_path(), 'r') as f:
+            cached = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"Error loading cached system profile: {e}")
+        return None
+    if not isinstance(cached, dict) or cached.get("fingerprint") != profile_fingerprint():
+        return None
+    profile = cached.get("profile")
+    return profile if isinstance(profile, dict) else None
+
+
+def save_cached_profile(profile):
+    """Save the profile with the current fingerprint, replacing the file in one step"""
+    path = profile_cache_path()
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump({"fingerprint": profile_fingerprint(), "profile": profile}, f, indent=2)
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Error saving cached system profile: {e}")
+
+
+class CategoryTask(QRunnable):
+    """Collects one profile category on a pool thread"""
+    def __init__(self, collector, name, function):
+        super().__init__()
+        self.collector = collector
+        self.name = name
+        self.function = function
+
+    def run(self):
+        start = time.monotonic()
+        try:
+            items = self.function()
+        except Exception as e:
+            print(f"Error collecting {self.name} information: {e}")
+            items = {}
+        self.collector.category_ready.emit(self.name, items, time.monotonic() - start)
+
+
+class SystemInfoCollector(QObject):
+    """Gathers the system profile in the background, one task per category
+
+    Slow categories (a hung network mount, many interfaces) only delay
+    themselves: each one is reported through category_ready as soon as it is
+    done, and finished follows once all of them are in.
+    """
+    category_ready = pyqtSignal(str, dict, float)  # Category, its items (empty if none), seconds taken
+    finished = pyqtSignal()
+
+    def __init__(self, categories=None):
+        super().__init__()
+        self.categories = categories or CATEGORIES
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(len(self.categories))
+        self.pending = set()
+        self.category_ready.connect(self.on_category_ready)
+
+    def start(self, names=None):
+        """Collect every category, or only those in names"""
+        categories = [(name, function) for name, function in self.categories if names is None or name in names]
+        self.pending = {name for name, _ in categories}
+        for name, function in categories:
+            self.pool.start(CategoryTask(self, name, function))
+
+    def collect(self, name):
+        """Collect one category again; it is reported through category_ready like the first time"""
+        for category, function in self.categories:
+            if category == name:
+                self.pool.start(CategoryTask(self, name, function))
+
+    def on_category_ready(self, name, items, elapsed):
+        self.pending.discard(name)
+        if not self.pending:
+            self.finished.emit()
+
+    def is_running(self):
+        return bool(self.pending)
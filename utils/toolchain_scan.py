@@ -0,0 +1,109 @@
+import asyncio
+import re
+import shlex
+import time
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils.async_runner import shared_runner
+from utils.command_line import find_executable
+from utils.command_worker import process_group_options, kill_process_group
+
+# Probe outcomes
+INSTALLED = "installed"
+MISSING = "missing"
+PROBE_TIMED_OUT = "timed out"
+PROBE_FAILED = "failed"
+
+VERSION_PATTERN = re.compile(r"\d+(?:\.\d+)+[\w.+-]*")
+
+
+def parse_version(output):
+    """The version number in a probe's output, or its first line if there is none"""
+    first_line = next((line.strip() for line in output.splitlines() if line.strip()), "")
+    match = VERSION_PATTERN.search(first_line) or VERSION_PATTERN.search(output)
+    return match.group() if match else first_line[:80]
+
+
+class ToolchainScan(QObject):
+    """Runs a set of version probes (node -v, docker --version, ...) concurrently
+
+    Each probe's program is looked up on the PATH first, so a missing tool
+    costs no process at all; the ones that are found are started directly,
+    at most max_parallel at a time on the shared event loop, and killed
+    with their process group after timeout seconds. The sweep therefore
+    takes about as long as its slowest probe rather than the sum of them.
+
+    probe_finished carries a dict per probe, in completion order, with the
+    name and probe it was given plus tool, status, version, output, path
+    and latency (seconds from start to exit).
+    """
+    probe_finished = pyqtSignal(dict)
+    scan_finished = pyqtSignal(float)  # Seconds the whole sweep took
+
+    def __init__(self, probes, max_parallel=16, timeout=10.0, runner=None):
+        super().__init__()
+        self.probes = probes  # (name, probe command) pairs
+        self.max_parallel = max_parallel
+        self.timeout = timeout
+        self.runner = runner or shared_runner()
+        self.future = None
+
+    def start(self):
+        """Submit the sweep to the event loop"""
+        self.future = self.runner.submit(self.run())
+
+    async def run(self):
+        start = time.monotonic()
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        await asyncio.gather(*(self.run_probe(name, probe, semaphore) for name, probe in self.probes))
+        self.scan_finished.emit(time.monotonic() - start)
+
+    async def run_probe(self, name, probe, semaphore):
+        argv = shlex.split(probe)
+        result = {"name": name, "probe": probe, "tool": argv[0], "status": MISSING,
+                  "version": "", "output": "", "path": "", "latency": 0.0}
+        start = time.monotonic()
+        path = find_executable(argv[0])
+        if path is None:
+            result["latency"] = time.monotonic() - start
+            self.probe_finished.emit(result)
+            return
+        result["path"] = path
+
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    path, *argv[1:],
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,  # Some tools print their version to stderr
+                    **process_group_options()
+                )
+            except OSError as e:
+                result["status"] = PROBE_FAILED
+                result["output"] = str(e)
+                self.probe_finished.emit(result)
+                return
+            try:
+                output, _ = await asyncio.wait_for(process.communicate(), self.timeout)
+                result["status"] = INSTALLED
+                result["output"] = output.decode("utf-8", errors="replace").strip()
+                result["version"] = parse_version(result["output"])
+            except asyncio.TimeoutError:
+                result["status"] = PROBE_TIMED_OUT
+            finally:
+                if process.returncode is None:
+                    # Timed out, or the sweep was cancelled: take everything the probe started with it
+                    kill_process_group(process, force=True)
+                    await process.wait()
+            result["latency"] = time.monotonic() - start
+        self.probe_finished.emit(result)
+
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
+
+    def stop(self):
+        """Cancel the sweep; running probes are killed"""
+        if self.future is not None:
+            self.future.cancel()